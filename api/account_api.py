@@ -1,9 +1,11 @@
 from flask import Blueprint, request, jsonify
 from loguru import logger
+import asyncio
 import json
 import base64
+import time
 from utils.account_manager import AccountManager
-from utils.cookies import test_cookie
+from utils.cookies import test_cookie, async_test_cookie
 
 account_bp = Blueprint('account', __name__)
 
@@ -251,7 +253,7 @@ def delete_account():
 
 
 @account_bp.route('/test', methods=['POST'])
-def test_account_cookie():
+async def test_account_cookie():
     """测试账号cookie是否有效"""
     try:
         # 安全解析请求数据
@@ -312,7 +314,7 @@ def test_account_cookie():
             }), 400
         
         # 使用解码后的cookie进行测试
-        is_valid = test_cookie(decoded_cookie)
+        is_valid = await async_test_cookie(decoded_cookie)
         
         return jsonify({
             'code': 0,
@@ -332,6 +334,72 @@ def test_account_cookie():
         }), 500
 
 
+async def _validate_account(manager, name, semaphore):
+    """检查单个账号的cookie并记录结果"""
+    async with semaphore:
+        cookie_dict = manager.peek_cookie_dict(name)
+        if cookie_dict is None:
+            return {'name': name, 'valid': False, 'status': '账号不存在', 'latencyMs': None}
+        started = time.monotonic()
+        is_valid = await async_test_cookie(cookie_dict)
+        latency = time.monotonic() - started
+    manager.record_validation(name, is_valid, latency)
+    return {
+        'name': name,
+        'valid': is_valid,
+        'status': '已登录' if is_valid else '未登录',
+        'latencyMs': round(latency * 1000)
+    }
+
+
+@account_bp.route('/test-all', methods=['POST'])
+async def test_all_accounts():
+    """并发测试所有账号的cookie，结果记录到账号上
+    
+    请求参数（均可选）:
+        names: 只测试这些账号
+        concurrency: 同时进行的测试数，默认8，最多32
+    """
+    try:
+        data, error_msg = _parse_request_data()
+        if error_msg or not data:
+            data = {}
+        
+        manager = AccountManager.get_instance()
+        names = data.get('names') or [account['name'] for account in manager.get_all_accounts()]
+        if isinstance(names, str):
+            names = [names]
+        try:
+            concurrency = min(32, max(1, int(data.get('concurrency', 8))))
+        except (TypeError, ValueError):
+            concurrency = 8
+        
+        started = time.monotonic()
+        semaphore = asyncio.Semaphore(concurrency)
+        results = await asyncio.gather(*(_validate_account(manager, name, semaphore) for name in names))
+        valid = sum(1 for result in results if result['valid'])
+        
+        return jsonify({
+            'code': 0,
+            'message': 'Cookie测试完成',
+            'data': {
+                'results': results,
+                'total': len(results),
+                'valid': valid,
+                'invalid': len(results) - valid,
+                'elapsedMs': round((time.monotonic() - started) * 1000)
+            }
+        })
+    
+    except Exception as e:
+        logger.error(f"批量测试cookie失败: {e}")
+        return jsonify({
+            'code': 1,
+            'message': f'批量测试cookie失败: {str(e)}',
+            'data': None
+        }), 500
+
+
 @account_bp.route('/get-cookie', methods=['POST'])
 def get_cookie():
     """获取可用的cookie"""
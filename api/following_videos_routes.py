@@ -4,51 +4,78 @@
 独立的API路由模块，保持代码模块化
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+import asyncio
 import time
-from utils.request import Request
+import ujson as json
 from utils.account_manager import AccountManager
+from utils.account_scheduler import AccountLoad
+from utils.async_request import AsyncRequest
+from utils.circuit_breaker import CircuitBreakerRegistry
+from utils.cookie_sweeper import CookieSweeper
+from utils.rate_limiter import RateLimiter
+from utils.response_cache import ResponseCache
+from utils.retry import RetryPolicy
+from utils.watched_store import WatchedStore
+from utils.crawler import (CrawlError, iter_following_list, iter_following_pages, aiter_following_list,
+                           trim_following_user, iter_user_post_pages, aiter_user_post_pages, merge_post_pages,
+                           trim_video)
+from .request_proxy import request_instance, async_request_instance
 
 # 创建蓝图
 following_videos_bp = Blueprint('following_videos', __name__)
 
-# 延迟初始化，避免启动时的重复日志输出
-def get_request_instance():
-    """获取Request实例，延迟初始化"""
-    if not hasattr(get_request_instance, '_instance'):
-        get_request_instance._instance = Request()
-    return get_request_instance._instance
-
-def get_request_instance_for_account(account_name: str = None):
-    """根据账号名获取Request实例"""
-    account_manager = AccountManager.get_instance()
-    cookie = account_manager.get_cookie(account_name)
-
-    if cookie:
-        # 使用指定账号的cookie创建Request实例
-        return Request(cookie=cookie)
-    else:
-        # 回退到默认实例
-        return get_request_instance()
-
-# 为了保持向后兼容，创建一个属性访问器
-class RequestProxy:
-    def __getattr__(self, name):
-        # 检查是否有user_account参数
-        user_account = request.args.get('user_account') if request else None
-        if user_account:
-            # 使用指定账号的Request实例
-            instance = get_request_instance_for_account(user_account)
-        else:
-            # 使用默认实例
-            instance = get_request_instance()
-        return getattr(instance, name)
 
-request_instance = RequestProxy()
+def _format_following_user(user: dict, user_videos: dict, watched_ids: set, error: str = None) -> dict:
+    """把关注用户和其视频列表整理为返回给前端的结构"""
+    videos = []
+    if user_videos and user_videos.get('status_code') == 0:
+        aweme_list = user_videos.get('aweme_list', [])
+
+        for aweme in aweme_list[:5]:  # 每个用户最多5个视频
+            video_info = {
+                'videoId': aweme.get('aweme_id', ''),
+                'title': aweme.get('desc', ''),
+                'duration': aweme.get('duration', 0),
+                'cover': aweme.get('video', {}).get('cover', {}).get('url_list', [''])[0] if aweme.get('video', {}).get('cover', {}).get('url_list') else '',
+                'viewed': aweme.get('aweme_id', '') in watched_ids,
+                'createTime': aweme.get('create_time', 0) * 1000,  # 转换为毫秒
+                'author': {
+                    'nickname': user.get('nickname', ''),
+                    'avatar': user.get('avatar_thumb', {}).get('url_list', [''])[0] if user.get('avatar_thumb', {}).get('url_list') else ''
+                },
+                'statistics': {
+                    'digg_count': aweme.get('statistics', {}).get('digg_count', 0),
+                    'comment_count': aweme.get('statistics', {}).get('comment_count', 0),
+                    'share_count': aweme.get('statistics', {}).get('share_count', 0)
+                }
+            }
+            videos.append(video_info)
+
+    # 构建用户信息
+    return {
+        'secUid': user.get('sec_uid', ''),
+        'uid': user.get('uid', ''),
+        'nickname': user.get('nickname', ''),
+        'avatar': user.get('avatar_thumb', {}).get('url_list', [''])[0] if user.get('avatar_thumb', {}).get('url_list') else '',
+        'totalVideos': user.get('aweme_count', 0),
+        'unwatchedCount': sum(1 for video in videos if not video['viewed']),
+        'videos': videos,
+        'error': error
+    }
+
 
 @following_videos_bp.route('/api/following-users-videos', methods=['GET'])
-def get_following_users_videos():
-    """获取关注用户的视频数据 - 使用真实API"""
+async def get_following_users_videos():
+    """获取关注用户的视频数据 - 使用真实API
+
+    可选参数：
+        limit: 最多获取多少个关注用户的视频，默认不限制
+        concurrency: 同时进行的视频列表请求数，默认8，最多32。实际速度还受每个账号的限速约束，
+            默认每个账号突发10个、之后每秒4个作品列表请求，关注用户较多时增加账号或调大timeout
+        timeout: 整个请求的截止时间（秒），默认20，范围1~60，包括获取关注列表的时间，
+            超时未完成的用户会在errors中报告
+    """
     try:
         user_account = request.args.get('user_account')
 
@@ -60,12 +87,25 @@ def get_following_users_videos():
                 'msg': 'user_account is required'
             })
 
+        limit = request.args.get('limit', type=int)
+        concurrency = min(32, max(1, request.args.get('concurrency', 8, type=int)))
+        timeout = min(60.0, max(1.0, request.args.get('timeout', 20, type=float)))
+        # 截止时间从请求开始计算，获取用户信息和关注列表也在截止时间内
+        deadline = time.monotonic() + timeout
+
+        def remaining() -> float:
+            return max(0, deadline - time.monotonic())
+
         print(f"获取用户 {user_account} 的关注用户视频数据")
 
         # 1. 获取用户自己的信息
         user_profile_url = '/aweme/v1/web/user/profile/self/'
         user_profile_params = {}
-        user_profile = request_instance.getJSON(user_profile_url, user_profile_params)
+        try:
+            user_profile = await asyncio.wait_for(
+                async_request_instance.getJSON(user_profile_url, user_profile_params), remaining())
+        except asyncio.TimeoutError:
+            user_profile = None
 
         if not user_profile or user_profile.get('status_code') != 0:
             return jsonify({
@@ -78,43 +118,34 @@ def get_following_users_videos():
         user_id = user_profile.get('user', {}).get('uid')
         sec_user_id = user_profile.get('user', {}).get('sec_uid')
 
-        # 2. 获取关注列表
-        following_url = '/aweme/v1/web/user/following/list/'
-        following_params = {
-            'user_id': user_id,
-            'sec_user_id': sec_user_id,
-            'count': '20',
-            'offset': '0',
-            'max_time': '0',
-            'min_time': '0',
-            'source_type': '1',
-            'gps_access': '0',
-            'address_book_access': '0',
-            'is_top': '1',
-        }
-
-        following_list = request_instance.getJSON(following_url, following_params)
-        
-        if not following_list or following_list.get('status_code') != 0:
-            return jsonify({
-                'success': False,
-                'code': 500,
-                'data': None,
-                'msg': 'Failed to get following list'
-            })
-
-        # 3. 为每个关注用户获取视频列表
-        following_users_with_videos = []
-        followings = following_list.get('followings', [])
-
-        for user in followings[:10]:  # 限制前10个用户，避免请求过多
-            user_sec_uid = user.get('sec_uid', '')
-            user_uid = user.get('uid', '')
-
-            if not user_sec_uid:
-                continue
-
-            # 获取用户视频列表
+        # 2. 分页获取关注列表，达到limit后不再请求后续页
+        followings = []
+
+        async def collect_followings():
+            async for user in aiter_following_list(async_request_instance, user_id, sec_user_id):
+                if not user.get('sec_uid'):
+                    continue
+                followings.append(user)
+                if limit and len(followings) >= limit:
+                    break
+
+        try:
+            await asyncio.wait_for(collect_followings(), remaining())
+        except (CrawlError, asyncio.TimeoutError) as e:
+            # 第一页就失败时直接返回错误，后续页失败或超时时使用已获取的部分
+            if not followings:
+                return jsonify({
+                    'success': False,
+                    'code': 500,
+                    'data': None,
+                    'msg': 'Failed to get following list'
+                })
+            print(f"获取关注列表中断: {str(e) or type(e).__name__}")
+
+        # 3. 并发获取每个关注用户的视频列表，同时进行的请求数受semaphore限制
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch_user_videos(user_sec_uid):
             user_videos_url = '/aweme/v1/web/aweme/post/'
             user_videos_params = {
                 'sec_user_id': user_sec_uid,
@@ -129,50 +160,56 @@ def get_following_users_videos():
                 'count_query': '1',
                 'publish_video_strategy_type': '2'
             }
+            async with semaphore:
+                return await async_request_instance.getJSON(user_videos_url, user_videos_params)
+
+        tasks = [asyncio.ensure_future(fetch_user_videos(user['sec_uid'])) for user in followings]
+        pending = set()
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=remaining())
+            for task in pending:
+                task.cancel()
+
+        # 4. 按关注列表的顺序组装结果，失败的用户单独报告
+        results = []
+        for user, task in zip(followings, tasks):
+            user_videos = None
+            if task in pending:
+                error = 'timeout'
+            elif task.exception() is not None:
+                error = str(task.exception()) or type(task.exception()).__name__
+            else:
+                user_videos = task.result()
+                if not user_videos:
+                    error = 'empty response'
+                elif user_videos.get('status_code') != 0:
+                    error = f"status_code: {user_videos.get('status_code')}"
+                else:
+                    error = None
+            results.append((user, user_videos, error))
+
+        # 一次查询出所有返回视频的已看状态
+        video_ids = [aweme.get('aweme_id') for _, user_videos, _ in results if user_videos
+                     for aweme in (user_videos.get('aweme_list') or [])[:5]]
+        watched_ids = await asyncio.to_thread(WatchedStore.get_instance().get_watched_ids, user_account, video_ids)
 
-            user_videos = request_instance.getJSON(user_videos_url, user_videos_params)
-
-            videos = []
-            if user_videos and user_videos.get('status_code') == 0:
-                aweme_list = user_videos.get('aweme_list', [])
-
-                for aweme in aweme_list[:5]:  # 每个用户最多5个视频
-                    video_info = {
-                        'videoId': aweme.get('aweme_id', ''),
-                        'title': aweme.get('desc', ''),
-                        'duration': aweme.get('duration', 0),
-                        'cover': aweme.get('video', {}).get('cover', {}).get('url_list', [''])[0] if aweme.get('video', {}).get('cover', {}).get('url_list') else '',
-                        'viewed': False,  # 默认未看
-                        'createTime': aweme.get('create_time', 0) * 1000,  # 转换为毫秒
-                        'author': {
-                            'nickname': user.get('nickname', ''),
-                            'avatar': user.get('avatar_thumb', {}).get('url_list', [''])[0] if user.get('avatar_thumb', {}).get('url_list') else ''
-                        },
-                        'statistics': {
-                            'digg_count': aweme.get('statistics', {}).get('digg_count', 0),
-                            'comment_count': aweme.get('statistics', {}).get('comment_count', 0),
-                            'share_count': aweme.get('statistics', {}).get('share_count', 0)
-                        }
-                    }
-                    videos.append(video_info)
-
-            # 构建用户信息
-            user_info = {
-                'secUid': user_sec_uid,
-                'uid': user_uid,
-                'nickname': user.get('nickname', ''),
-                'avatar': user.get('avatar_thumb', {}).get('url_list', [''])[0] if user.get('avatar_thumb', {}).get('url_list') else '',
-                'totalVideos': user.get('aweme_count', 0),
-                'unwatchedCount': len(videos),  # 假设所有视频都未看
-                'videos': videos
-            }
-
+        following_users_with_videos = []
+        errors = []
+        for user, user_videos, error in results:
+            user_info = _format_following_user(user, user_videos, watched_ids, error)
             following_users_with_videos.append(user_info)
+            if error:
+                errors.append({
+                    'secUid': user_info['secUid'],
+                    'nickname': user_info['nickname'],
+                    'error': error
+                })
 
         return jsonify({
             'success': True,
             'code': 200,
             'data': following_users_with_videos,
+            'errors': errors,
             'msg': 'success'
         })
 
@@ -198,7 +235,17 @@ def get_system_status():
             'lastUpdateTime': int(time.time() * 1000),
             'lastFollowingUpdate': int(time.time() * 1000) - 1800000,
             'updateFrequency': 10,
-            'followingUpdateFrequency': 30
+            'followingUpdateFrequency': 30,
+            'responseCache': ResponseCache.get_instance().stats(),
+            'singleFlight': AsyncRequest.flight_stats(),
+            'rateLimit': RateLimiter.get_instance().stats(),
+            'retry': RetryPolicy.get_instance().stats(),
+            'circuitBreakers': CircuitBreakerRegistry.get_instance().stats(),
+            'accountLoad': {
+                'scheduler': AccountManager.get_instance().scheduler_name,
+                'accounts': AccountLoad.get_instance().stats()
+            },
+            'cookieSweeper': CookieSweeper.get_instance().stats()
         },
         'msg': 'success'
     })
@@ -225,11 +272,8 @@ def mark_video_watched():
                 'msg': 'video_id is required'
             })
 
-        # 记录视频已看状态（这里可以扩展为数据库存储）
-        print(f"用户 {user_account} 标记视频已看: {video_id}")
-
-        # TODO: 这里可以添加数据库存储逻辑
-        # 例如：save_watched_video(user_account, video_id, timestamp)
+        # 记录视频已看状态
+        watched_time = WatchedStore.get_instance().mark_watched(user_account, video_id)
 
         return jsonify({
             'success': True,
@@ -237,7 +281,7 @@ def mark_video_watched():
             'data': {
                 'video_id': video_id,
                 'user_account': user_account,
-                'watched_time': int(time.time() * 1000)
+                'watched_time': watched_time
             },
             'msg': 'Video marked as watched'
         })
@@ -280,14 +324,11 @@ def mark_multiple_videos_watched():
                 'msg': 'video_ids is required'
             })
 
-        # 批量记录视频已看状态
+        # 批量记录视频已看状态，一个事务内写入
         print(f"用户 {user_account} 批量标记视频已看: {len(video_ids)} 个视频")
-
-        # TODO: 这里可以添加数据库批量存储逻辑
-        # 例如：batch_save_watched_videos(user_account, video_ids, timestamp)
+        current_time = WatchedStore.get_instance().mark_many_watched(user_account, video_ids)
 
         watched_videos = []
-        current_time = int(time.time() * 1000)
 
         for video_id in video_ids:
             watched_videos.append({
@@ -316,8 +357,13 @@ def mark_multiple_videos_watched():
         })
 
 @following_videos_bp.route('/api/user-unwatched-videos', methods=['GET'])
-def get_user_unwatched_videos():
-    """获取指定用户的所有未观看视频 - 使用真实API"""
+async def get_user_unwatched_videos():
+    """获取指定用户的所有未观看视频 - 使用真实API
+
+    可选参数：
+        unwatched_only: 为1时只返回未看过的视频
+        max_pages: 获取的视频列表页数，默认1，最多50，返回中的hasMore和maxCursor可以用来继续翻页
+    """
     try:
         sec_uid = request.args.get('sec_uid')
 
@@ -329,9 +375,11 @@ def get_user_unwatched_videos():
                 'msg': 'sec_uid is required'
             })
 
+        max_pages = min(50, max(1, request.args.get('max_pages', 1, type=int)))
+
         print(f"获取用户 {sec_uid} 的所有视频")
 
-        # 1. 先获取用户信息
+        # 1. 用户信息和视频列表互不依赖，并发请求
         user_info_url = '/aweme/v1/web/user/profile/other/'
         user_info_params = {
             'sec_user_id': sec_uid,
@@ -340,7 +388,20 @@ def get_user_unwatched_videos():
             'personal_center_strategy': '1'
         }
 
-        user_info = request_instance.getJSON(user_info_url, user_info_params)
+        async def fetch_user_videos():
+            pages = []
+            try:
+                async for page in aiter_user_post_pages(async_request_instance, sec_uid, 20, max_pages):
+                    pages.append(page)
+            except CrawlError as e:
+                # 后续页失败时使用已获取的部分
+                print(f"获取视频列表中断: {str(e)}")
+            return merge_post_pages(pages) if pages else None
+
+        user_info, user_videos = await asyncio.gather(
+            async_request_instance.getJSON(user_info_url, user_info_params),
+            fetch_user_videos()
+        )
 
         if not user_info or user_info.get('status_code') != 0:
             return jsonify({
@@ -352,24 +413,7 @@ def get_user_unwatched_videos():
 
         user_data = user_info.get('user', {})
 
-        # 2. 获取用户的视频列表
-        user_videos_url = '/aweme/v1/web/aweme/post/'
-        user_videos_params = {
-            'sec_user_id': sec_uid,
-            'count': '20',
-            'max_cursor': '0',
-            'locate_query': 'false',
-            'show_live_replay_strategy': '1',
-            'need_time_list': '1',
-            'time_list_query': '0',
-            'whale_cut_token': '',
-            'cut_version': '1',
-            'count_query': '1',
-            'publish_video_strategy_type': '2'
-        }
-
-        user_videos = request_instance.getJSON(user_videos_url, user_videos_params)
-
+        # 2. 检查视频列表
         if not user_videos or user_videos.get('status_code') != 0:
             return jsonify({
                 'success': False,
@@ -378,9 +422,18 @@ def get_user_unwatched_videos():
                 'msg': 'Failed to get user videos'
             })
 
-        # 3. 处理视频数据
-        videos = []
+        # 3. 处理视频数据，已看状态从本地存储中查询
+        user_account = request.args.get('user_account')
         aweme_list = user_videos.get('aweme_list', [])
+        store = WatchedStore.get_instance()
+        if request.args.get('unwatched_only') in ('1', 'true'):
+            aweme_list = await asyncio.to_thread(store.filter_unwatched, user_account, aweme_list)
+            watched_ids = set()
+        else:
+            watched_ids = await asyncio.to_thread(
+                store.get_watched_ids, user_account, [aweme.get('aweme_id') for aweme in aweme_list])
+
+        videos = []
 
         for aweme in aweme_list:
             video_info = {
@@ -388,7 +441,7 @@ def get_user_unwatched_videos():
                 'title': aweme.get('desc', ''),
                 'duration': aweme.get('duration', 0),
                 'cover': aweme.get('video', {}).get('cover', {}).get('url_list', [''])[0] if aweme.get('video', {}).get('cover', {}).get('url_list') else '',
-                'viewed': False,  # 默认未看，实际应该从数据库查询
+                'viewed': aweme.get('aweme_id', '') in watched_ids,
                 'createTime': aweme.get('create_time', 0) * 1000,  # 转换为毫秒
                 'author': {
                     'nickname': user_data.get('nickname', ''),
@@ -411,7 +464,9 @@ def get_user_unwatched_videos():
                 'avatar': user_data.get('avatar_thumb', {}).get('url_list', [''])[0] if user_data.get('avatar_thumb', {}).get('url_list') else ''
             },
             'videos': videos,
-            'totalVideos': user_data.get('aweme_count', len(videos))
+            'totalVideos': user_data.get('aweme_count', len(videos)),
+            'hasMore': bool(user_videos.get('has_more', False)),
+            'maxCursor': user_videos.get('max_cursor', 0)
         }
 
         return jsonify({
@@ -479,24 +534,17 @@ def update_following_list():
                 'msg': 'Failed to get user_id from profile'
             })
 
-        # 获取关注列表
-        following_url = '/aweme/v1/web/user/following/list/'
-        following_params = {
-            'user_id': user_id,
-            'sec_user_id': sec_user_id,
-            'count': '20',
-            'offset': '0',
-            'max_time': '0',
-            'min_time': '0',
-            'source_type': '1',
-            'gps_access': '0',
-            'address_book_access': '0',
-            'is_top': '1',
-        }
-
-        following_list = request_instance.getJSON(following_url, following_params)
-
-        if not following_list or following_list.get('status_code') != 0:
+        # 分页获取完整的关注列表
+        following_users = []
+        total_count = None
+        try:
+            for page in iter_following_pages(request_instance, user_id, sec_user_id):
+                if total_count is None:
+                    total_count = page.get('total')
+                # 提取关注用户的基本信息
+                following_users.extend(trim_following_user(user) for user in page.get('followings') or [])
+        except CrawlError as e:
+            print(f"获取关注列表失败: {str(e)}")
             return jsonify({
                 'success': False,
                 'code': 500,
@@ -504,24 +552,9 @@ def update_following_list():
                 'msg': 'Failed to get following list'
             })
 
-        # 处理关注列表数据
-        followings = following_list.get('followings', [])
-        updated_count = len(followings)
-
-        # 提取关注用户的基本信息
-        following_users = []
-        for user in followings:
-            following_users.append({
-                'sec_uid': user.get('sec_uid', ''),
-                'uid': user.get('uid', ''),
-                'nickname': user.get('nickname', ''),
-                'avatar': user.get('avatar_thumb', {}).get('url_list', [''])[0] if user.get('avatar_thumb', {}).get('url_list') else '',
-                'unique_id': user.get('unique_id', ''),
-                'signature': user.get('signature', ''),
-                'aweme_count': user.get('aweme_count', 0),
-                'follower_count': user.get('follower_count', 0),
-                'following_count': user.get('following_count', 0)
-            })
+        updated_count = len(following_users)
+        if total_count is None:
+            total_count = updated_count
 
         return jsonify({
             'success': True,
@@ -531,7 +564,7 @@ def update_following_list():
                 'updated_count': updated_count,
                 'following_users': following_users,
                 'last_update_time': int(time.time() * 1000),
-                'total_count': following_list.get('total', updated_count)
+                'total_count': total_count
             },
             'msg': f'Successfully updated following list for {user_account}'
         })
@@ -545,6 +578,50 @@ def update_following_list():
             'msg': str(e)
         })
 
+@following_videos_bp.route('/api/following-list/stream', methods=['GET'])
+def stream_following_list():
+    """以NDJSON格式流式返回完整的关注列表
+
+    每行一个关注用户，边翻页边输出，不在内存中保存完整列表。
+    翻页失败时输出一行 {"error": "..."} 后结束
+    可选参数：
+        count: 每页数量，默认20
+        max_pages: 最多获取的页数，默认不限制
+    """
+    user_account = request.args.get('user_account')
+
+    if not user_account:
+        return jsonify({
+            'success': False,
+            'code': 400,
+            'data': None,
+            'msg': 'user_account is required'
+        })
+
+    count = request.args.get('count', 20, type=int)
+    max_pages = request.args.get('max_pages', type=int)
+
+    user_profile = request_instance.getJSON('/aweme/v1/web/user/profile/self/', {})
+    if not user_profile or user_profile.get('status_code') != 0:
+        return jsonify({
+            'success': False,
+            'code': 500,
+            'data': None,
+            'msg': 'Failed to get user profile'
+        })
+
+    user_id = user_profile.get('user', {}).get('uid')
+    sec_user_id = user_profile.get('user', {}).get('sec_uid')
+
+    def generate():
+        try:
+            for user in iter_following_list(request_instance, user_id, sec_user_id, count, max_pages):
+                yield json.dumps(trim_following_user(user), ensure_ascii=False) + '\n'
+        except CrawlError as e:
+            yield json.dumps({'error': str(e)}, ensure_ascii=False) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @following_videos_bp.route('/api/update-user-videos', methods=['POST'])
 def update_user_videos():
     """更新用户视频列表 - 使用真实API"""
@@ -577,27 +654,29 @@ def update_user_videos():
                 'msg': 'sec_uid is required'
             })
 
+        # max_pages大于1时继续向前翻页，最多50页
+        try:
+            max_pages = min(50, max(1, int(data.get('max_pages') or 1)))
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'code': 400,
+                'data': None,
+                'msg': 'max_pages must be an integer'
+            })
+
         print(f"更新用户 {user_account} 的视频列表，sec_uid: {sec_uid}")
 
         # 获取用户最新的视频列表
-        user_videos_url = '/aweme/v1/web/aweme/post/'
-        user_videos_params = {
-            'sec_user_id': sec_uid,
-            'count': '20',
-            'max_cursor': '0',
-            'locate_query': 'false',
-            'show_live_replay_strategy': '1',
-            'need_time_list': '1',
-            'time_list_query': '0',
-            'whale_cut_token': '',
-            'cut_version': '1',
-            'count_query': '1',
-            'publish_video_strategy_type': '2'
-        }
-
-        user_videos = request_instance.getJSON(user_videos_url, user_videos_params)
-
-        if not user_videos or user_videos.get('status_code') != 0:
+        videos = []
+        user_videos = None
+        try:
+            for user_videos in iter_user_post_pages(request_instance, sec_uid, 20, max_pages):
+                videos.extend(trim_video(aweme) for aweme in user_videos.get('aweme_list') or [])
+        except CrawlError as e:
+            print(f"获取视频列表中断: {str(e)}")
+
+        if user_videos is None:
             return jsonify({
                 'success': False,
                 'code': 500,
@@ -605,26 +684,7 @@ def update_user_videos():
                 'msg': 'Failed to get user videos'
             })
 
-        # 处理视频数据
-        aweme_list = user_videos.get('aweme_list', [])
-        new_videos_count = len(aweme_list)
-
-        # 提取视频基本信息
-        videos = []
-        for aweme in aweme_list:
-            video_info = {
-                'videoId': aweme.get('aweme_id', ''),
-                'title': aweme.get('desc', ''),
-                'duration': aweme.get('duration', 0),
-                'cover': aweme.get('video', {}).get('cover', {}).get('url_list', [''])[0] if aweme.get('video', {}).get('cover', {}).get('url_list') else '',
-                'createTime': aweme.get('create_time', 0) * 1000,
-                'statistics': {
-                    'digg_count': aweme.get('statistics', {}).get('digg_count', 0),
-                    'comment_count': aweme.get('statistics', {}).get('comment_count', 0),
-                    'share_count': aweme.get('statistics', {}).get('share_count', 0)
-                }
-            }
-            videos.append(video_info)
+        new_videos_count = len(videos)
 
         return jsonify({
             'success': True,
@@ -0,0 +1,69 @@
+"""
+各API模块共用的请求实例代理
+视图中通过 request_instance / async_request_instance 发送请求，
+带 user_account 参数时使用该账号的常驻实例，否则使用默认实例。
+async视图中方法都需要await：
+    data = await async_request_instance.getJSON(url, params)
+"""
+
+from flask import request
+
+from utils.async_request import AsyncRequest
+from utils.request import Request
+from utils.request_manager import RequestManager
+
+
+# 延迟初始化，避免启动时的重复日志输出
+def get_request_instance():
+    """获取Request实例，延迟初始化"""
+    if not hasattr(get_request_instance, '_instance'):
+        get_request_instance._instance = Request()
+    return get_request_instance._instance
+
+
+def get_request_instance_for_account(account_name: str = None):
+    """根据账号名获取Request实例，同一账号复用池中的实例"""
+    instance = RequestManager.get_account_request(account_name, Request)
+    # 账号不存在时回退到默认实例
+    return instance or get_request_instance()
+
+
+def get_async_request_instance():
+    """获取AsyncRequest实例，延迟初始化"""
+    if not hasattr(get_async_request_instance, '_instance'):
+        get_async_request_instance._instance = AsyncRequest()
+    return get_async_request_instance._instance
+
+
+def get_async_request_instance_for_account(account_name: str = None):
+    """根据账号名获取AsyncRequest实例，同一账号复用池中的实例"""
+    instance = RequestManager.get_account_request(account_name, AsyncRequest)
+    return instance or get_async_request_instance()
+
+
+# 为了保持向后兼容，创建一个属性访问器
+class RequestProxy:
+    def __getattr__(self, name):
+        # 检查是否有user_account参数
+        user_account = request.args.get('user_account') if request else None
+        if user_account:
+            # 使用指定账号的Request实例
+            instance = get_request_instance_for_account(user_account)
+        else:
+            # 使用默认实例
+            instance = get_request_instance()
+        return getattr(instance, name)
+
+
+class AsyncRequestProxy:
+    def __getattr__(self, name):
+        user_account = request.args.get('user_account') if request else None
+        if user_account:
+            instance = get_async_request_instance_for_account(user_account)
+        else:
+            instance = get_async_request_instance()
+        return getattr(instance, name)
+
+
+request_instance = RequestProxy()
+async_request_instance = AsyncRequestProxy()
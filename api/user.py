@@ -1,41 +1,9 @@
-from utils.request import Request
-from utils.account_manager import AccountManager
 from . import api
-from flask import request, jsonify
-
-# 延迟初始化，避免启动时的重复日志输出
-def get_request_instance():
-    """获取Request实例，延迟初始化"""
-    if not hasattr(get_request_instance, '_instance'):
-        get_request_instance._instance = Request()
-    return get_request_instance._instance
-
-def get_request_instance_for_account(account_name: str = None):
-    """根据账号名获取Request实例"""
-    account_manager = AccountManager.get_instance()
-    cookie = account_manager.get_cookie(account_name)
-
-    if cookie:
-        # 使用指定账号的cookie创建Request实例
-        return Request(cookie=cookie)
-    else:
-        # 回退到默认实例
-        return get_request_instance()
-
-# 为了保持向后兼容，创建一个属性访问器
-class RequestProxy:
-    def __getattr__(self, name):
-        # 检查是否有user_account参数
-        user_account = request.args.get('user_account') if request else None
-        if user_account:
-            # 使用指定账号的Request实例
-            instance = get_request_instance_for_account(user_account)
-        else:
-            # 使用默认实例
-            instance = get_request_instance()
-        return getattr(instance, name)
-
-request_instance = RequestProxy()
+from .request_proxy import request_instance, async_request_instance
+from flask import request, jsonify, Response, stream_with_context
+import ujson as json
+from utils.crawler import CrawlError, iter_user_post_pages, iter_user_posts, merge_post_pages, trim_video
+
 '''
 @desc: 获取用户个人的信息
 @url: '/aweme/v1/web/user/profile/self/'
@@ -62,7 +30,7 @@ def get_user_info_self():
 
 
 @api.route('/user/profile/other/')
-def get_user_info():
+async def get_user_info():
     sec_user_id = request.args.get('sec_user_id')
     url = '/aweme/v1/web/user/profile/other/'
     params = {
@@ -71,7 +39,7 @@ def get_user_info():
         'publish_video_strategy_type': '2',
         'personal_center_strategy': '1'
     }
-    user_info = request_instance.getJSON(url, params)
+    user_info = await async_request_instance.getJSON(url, params)
     if user_info:
         return jsonify(user_info)
     else:
@@ -114,14 +82,64 @@ def get_user_post():
     }
     if forward_end_cursor:
         params["forward_end_cursor"] = forward_end_cursor
+    # max_pages大于1时从max_cursor开始连续翻页，合并为一页返回，最多50页
+    max_pages = min(50, max(1, request.args.get('max_pages', 1, type=int)))
 
-    post_list = request_instance.getJSON(url, params)
+    if max_pages == 1:
+        post_list = request_instance.getJSON(url, params)
+    else:
+        # 定位、时间列表等调用方传入的参数只用于第一页，之后按max_cursor翻页
+        first_params = {key: value for key, value in (
+            ('locate_item_id', locate_item_id),
+            ('locate_query', locate_query),
+            ('need_time_list', need_time_list),
+            ('forward_end_cursor', forward_end_cursor)
+        ) if value is not None}
+        pages = []
+        try:
+            for page in iter_user_post_pages(request_instance, sec_user_id, request.args.get('count', 20, type=int),
+                                             max_pages, max_cursor or 0, first_params):
+                pages.append(page)
+        except CrawlError as e:
+            # 中途失败时返回已获取的部分，max_cursor可以用来继续
+            print(f"获取作品列表中断: {str(e)}")
+        post_list = merge_post_pages(pages) if pages else None
     if post_list:
         return jsonify(post_list)
     else:
         return jsonify({'error': 'Failed to retrieve post_list; Check you Cookie and Referer!'}), 403
 
 
+"""
+@desc: 以NDJSON格式流式返回用户的全部作品
+@url：/aweme/v1/web/aweme/post/
+@param: sec_user_id 用户id
+@param: count 每页数量，默认20
+@param: max_pages 最多获取的页数，默认获取到最早的作品
+@param: max_cursor 开始的游标，默认从最新的作品开始
+每行一个作品，边翻页边输出，不在内存中保存完整列表。翻页失败时输出一行 {"error": "..."} 后结束
+"""
+
+
+@api.route('/aweme/post/stream/')
+def stream_user_posts():
+    sec_user_id = request.args.get('sec_user_id')
+    if not sec_user_id:
+        return jsonify({'error': 'sec_user_id is required'}), 400
+    count = request.args.get('count', 20, type=int)
+    max_pages = request.args.get('max_pages', type=int)
+    max_cursor = request.args.get('max_cursor', 0, type=int)
+
+    def generate():
+        try:
+            for aweme in iter_user_posts(request_instance, sec_user_id, count, max_pages, max_cursor):
+                yield json.dumps(trim_video(aweme), ensure_ascii=False) + '\n'
+        except CrawlError as e:
+            yield json.dumps({'error': str(e)}, ensure_ascii=False) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
 """
 @desc: 获取用户喜欢的列表
 @url: /aweme/v1/web/aweme/favorite/
@@ -1,41 +1,7 @@
 from . import api
 from flask import jsonify, request
-from utils.request import Request
-from utils.account_manager import AccountManager
-
-# 延迟初始化，避免启动时的重复日志输出
-def get_request_instance():
-    """获取Request实例，延迟初始化"""
-    if not hasattr(get_request_instance, '_instance'):
-        get_request_instance._instance = Request()
-    return get_request_instance._instance
-
-def get_request_instance_for_account(account_name: str = None):
-    """根据账号名获取Request实例"""
-    account_manager = AccountManager.get_instance()
-    cookie = account_manager.get_cookie(account_name)
-
-    if cookie:
-        # 使用指定账号的cookie创建Request实例
-        return Request(cookie=cookie)
-    else:
-        # 回退到默认实例
-        return get_request_instance()
-
-# 为了保持向后兼容，创建一个属性访问器
-class RequestProxy:
-    def __getattr__(self, name):
-        # 检查是否有user_account参数
-        user_account = request.args.get('user_account') if request else None
-        if user_account:
-            # 使用指定账号的Request实例
-            instance = get_request_instance_for_account(user_account)
-        else:
-            # 使用默认实例
-            instance = get_request_instance()
-        return getattr(instance, name)
-
-request_instance = RequestProxy()
+from .request_proxy import request_instance, async_request_instance
+
 """
 @desc: 获取视频详细信息
 @url: /aweme/v1/web/aweme/detail
@@ -44,13 +10,13 @@ request_instance = RequestProxy()
 
 
 @api.route('/aweme/detail/')
-def get_detail():
+async def get_detail():
     aweme_id = request.args.get('aweme_id')
     if not aweme_id:
         return jsonify({'error': 'Missing aweme_id parameter'}), 400
     params = {"aweme_id": aweme_id}
     url = '/aweme/v1/web/aweme/detail/'
-    aweme_detail = request_instance.getJSON(url, params)  # 直接调用 getJSON 方法
+    aweme_detail = await async_request_instance.getJSON(url, params)
     if aweme_detail:
         return jsonify(aweme_detail)
     else:
@@ -98,7 +64,7 @@ def get_related():
 
 
 @api.route('/comment/list/')
-def get_comment_list():
+async def get_comment_list():
     aweme_id = request.args.get('aweme_id')
     cursor = request.args.get('cursor')
     count = request.args.get('count')
@@ -108,7 +74,7 @@ def get_comment_list():
         "count": count
     }
     url = '/aweme/v1/web/comment/list/'
-    comment_list = request_instance.getJSON(url, params)
+    comment_list = await async_request_instance.getJSON(url, params)
     if comment_list:
         return jsonify(comment_list)
     else:
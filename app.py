@@ -6,8 +6,25 @@ from api.account_api import account_bp
 from api.following_videos_routes import following_videos_bp
 from flask_cors import CORS
 from utils.account_manager import AccountManager
+from utils.account_scheduler import SCHEDULERS
+from utils.watched_store import WatchedStore
+from utils.async_runner import run_coroutine
+from utils.cookie_sweeper import CookieSweeper
+from utils.rate_limiter import RateLimiter
+from utils.response_cache import ResponseCache
+from utils.sign_pool import SignWorkerPool
+from utils.webid_cache import WebidCache
 
-app = Flask(__name__)
+
+class DouyinFlask(Flask):
+    def async_to_sync(self, func):
+        """async视图统一提交到后台事件循环执行，在请求之间复用AsyncClient的连接池"""
+        def wrapper(*args, **kwargs):
+            return run_coroutine(func(*args, **kwargs))
+        return wrapper
+
+
+app = DouyinFlask(__name__)
 app.register_blueprint(api_blueprint, url_prefix='/aweme/v1/web')
 app.register_blueprint(account_bp, url_prefix='/api/v1/account')
 app.register_blueprint(following_videos_bp)  # 注册关注用户视频管理蓝图
@@ -24,13 +41,72 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Douyin API Server')
     parser.add_argument('--data-path', type=str, default='data',
                        help='Data directory path for storing cookies and other data')
+    parser.add_argument('--sign-workers', type=int, default=None,
+                       help='Number of persistent node processes used for signing')
+    parser.add_argument('--sign-timeout', type=float, default=None,
+                       help='Timeout in seconds for a single sign call')
+    parser.add_argument('--cache-size', type=int, default=None,
+                       help='Max number of cached upstream responses, 0 disables the cache')
+    parser.add_argument('--account-rate', type=float, default=None,
+                       help='Max upstream requests per second for each account, 0 disables rate limiting')
+    parser.add_argument('--scheduler', choices=list(SCHEDULERS), default=None,
+                       help='How accounts are picked when none is specified (default lru)')
+    parser.add_argument('--cookie-sweep-interval', type=float, default=None,
+                       help='Seconds between background cookie checks of the same account, 0 disables')
+    parser.add_argument('--server', choices=['dev', 'asgi'], default='dev',
+                       help='dev: Flask development server; asgi: uvicorn with worker processes')
+    parser.add_argument('--port', type=int, default=3010,
+                       help='Port to listen on')
+    parser.add_argument('--workers', type=int, default=1,
+                       help='Number of uvicorn worker processes (asgi mode); account state is per process, see asgi.py')
+    parser.add_argument('--threads', type=int, default=64,
+                       help='Number of threads per worker running Flask views (asgi mode)')
     args = parser.parse_args()
 
-    # 初始化账号管理器
-    AccountManager.initialize(args.data_path)
+    if args.server == 'asgi':
+        import uvicorn
+
+        # worker进程各自导入asgi模块，配置通过环境变量传递
+        os.environ['DATA_PATH'] = args.data_path
+        os.environ['ASGI_THREADS'] = str(args.threads)
+        if args.sign_workers is not None:
+            os.environ['DOUYIN_SIGN_WORKERS'] = str(args.sign_workers)
+        if args.sign_timeout is not None:
+            os.environ['DOUYIN_SIGN_TIMEOUT'] = str(args.sign_timeout)
+        if args.cache_size is not None:
+            os.environ['DOUYIN_CACHE_SIZE'] = str(args.cache_size)
+        if args.account_rate is not None:
+            os.environ['DOUYIN_ACCOUNT_RATE'] = str(args.account_rate)
+        if args.scheduler is not None:
+            os.environ['DOUYIN_ACCOUNT_SCHEDULER'] = args.scheduler
+        if args.cookie_sweep_interval is not None:
+            os.environ['DOUYIN_COOKIE_SWEEP_INTERVAL'] = str(args.cookie_sweep_interval)
+
+        if args.workers > 1:
+            # 账号列表、限速、缓存等状态不在进程之间共享，见asgi.py
+            print(f"⚠️ {args.workers} 个worker进程各自保存账号列表并写回cookies.json，"
+                  f"在一个进程中添加或删除的账号可能被其他进程覆盖，每个账号的限速也会乘以进程数，建议使用 --workers 1")
+        print(f"🚀 Douyin API 服务已启动 (ASGI, {args.workers} workers)")
+        print(f"📍 服务地址: http://localhost:{args.port}")
+        uvicorn.run('asgi:application', host='0.0.0.0', port=args.port, workers=args.workers)
+    else:
+        # 初始化账号管理器
+        AccountManager.initialize(args.data_path, scheduler=args.scheduler)
+        # 初始化已看视频存储
+        WatchedStore.initialize(args.data_path)
+        # 初始化webid缓存
+        WebidCache.initialize(args.data_path)
+        # 配置签名进程池
+        SignWorkerPool.initialize(args.sign_workers, args.sign_timeout)
+        # 配置响应缓存
+        ResponseCache.initialize(args.cache_size)
+        # 配置上游请求限速
+        RateLimiter.initialize(args.account_rate)
+        # 启动账号cookie定期检查
+        CookieSweeper.initialize(args.cookie_sweep_interval)
 
-    print("🚀 Douyin API 服务已启动")
-    print("📍 服务地址: http://localhost:3010")
-    print("✨ 新功能: 关注用户视频管理")
+        print("🚀 Douyin API 服务已启动")
+        print(f"📍 服务地址: http://localhost:{args.port}")
+        print("✨ 新功能: 关注用户视频管理")
 
-    app.run(host='0.0.0.0', port=3010)
+        app.run(host='0.0.0.0', port=args.port)
@@ -0,0 +1,36 @@
+"""
+ASGI入口
+    uvicorn asgi:application --host 0.0.0.0 --port 3010
+或者
+    python app.py --server asgi --threads 64
+
+Flask应用通过a2wsgi在线程池中执行，async视图统一在后台事件循环中等待上游请求。
+每个worker进程独立加载本模块，配置通过环境变量传递：
+    DATA_PATH     数据目录，默认 data
+    ASGI_THREADS  每个进程执行Flask视图的线程数，默认 64
+
+建议只启动一个worker，通过ASGI_THREADS扩展并发。以下状态都保存在各自进程的内存中，进程之间不共享：
+    账号列表      启动时从cookies.json读取，各进程独立修改并整体写回，会互相覆盖对方添加、删除的账号
+    限速          每个进程各有一套令牌桶，账号的实际请求速率是配置值乘以进程数
+    响应缓存      各进程分别缓存，相同请求在每个进程中各请求一次上游
+    webid缓存     各进程分别读写webid.json，只是缓存，覆盖后重新抓取即可
+    熔断器、账号负载统计、重试预算、cookie定期检查都按进程统计，每个进程都会检查一遍所有账号
+已观看记录保存在sqlite中，多个进程可以同时读写
+"""
+
+import os
+
+from a2wsgi import WSGIMiddleware
+
+from app import app
+from utils.account_manager import AccountManager
+from utils.cookie_sweeper import CookieSweeper
+from utils.watched_store import WatchedStore
+from utils.webid_cache import WebidCache
+
+AccountManager.initialize(os.environ.get('DATA_PATH', 'data'))
+WatchedStore.initialize(os.environ.get('DATA_PATH', 'data'))
+WebidCache.initialize(os.environ.get('DATA_PATH', 'data'))
+CookieSweeper.initialize()
+
+application = WSGIMiddleware(app, workers=int(os.environ.get('ASGI_THREADS', 64)))
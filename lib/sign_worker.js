@@ -0,0 +1,36 @@
+// 常驻签名进程：只加载一次douyin.js，然后从stdin按行读取JSON任务并把结果按行写回stdout
+// 任务格式: {"id": 1, "fn": "sign_datail", "args": ["query", "UA"]}
+// 返回格式: {"id": 1, "result": "..."} 或 {"id": 1, "error": "..."}
+const fs = require('fs');
+const vm = require('vm');
+const readline = require('readline');
+
+const jsPath = process.argv[2];
+vm.runInThisContext(fs.readFileSync(jsPath, 'utf-8'), {filename: jsPath});
+
+const rl = readline.createInterface({input: process.stdin, terminal: false});
+rl.on('line', function (line) {
+    if (!line) {
+        return;
+    }
+    let job;
+    try {
+        job = JSON.parse(line);
+    } catch (e) {
+        return;
+    }
+    let reply;
+    try {
+        const fn = globalThis[job.fn];
+        if (typeof fn !== 'function') {
+            throw new Error('unknown function: ' + job.fn);
+        }
+        reply = {id: job.id, result: fn.apply(null, job.args || [])};
+    } catch (e) {
+        reply = {id: job.id, error: String(e && e.message ? e.message : e)};
+    }
+    process.stdout.write(JSON.stringify(reply) + '\n');
+});
+rl.on('close', function () {
+    process.exit(0);
+});
@@ -0,0 +1,73 @@
+"""
+账号选择性能测试
+对比按lastUsed线性查找最小值和堆选择的耗时，账号数从10增加到10000
+
+    python tests/benchmark_account_selection.py
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loguru import logger
+
+from utils.account_manager import AccountManager
+
+SIZES = [10, 100, 1000, 10000]
+ROUNDS = 20000
+
+
+def build_manager(data_path: str, size: int) -> AccountManager:
+    manager = AccountManager(data_path, flush_interval=0)
+    now = int(time.time())
+    manager.accounts = [{
+        'name': f'account_{i}',
+        'cookie': f'sessionid={i}',
+        'description': '',
+        'lastUsed': now - i,
+        'createTime': now,
+        'updateTime': now
+    } for i in range(size)]
+    manager._rebuild_index()
+    return manager
+
+
+def linear_pick(manager: AccountManager):
+    """原实现：每次线性查找lastUsed最小的账号"""
+    account = min(manager.accounts, key=lambda x: x['lastUsed'])
+    account['lastUsed'] = int(time.time())
+    return account['cookie']
+
+
+def bench(fn, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def main():
+    logger.remove()
+    print(f'{"账号数":>8} {"线性(us)":>10} {"堆(us)":>10} {"按名称(us)":>12}')
+    for size in SIZES:
+        data_path = tempfile.mkdtemp()
+        try:
+            rounds = min(ROUNDS, 2000000 // size)
+            manager = build_manager(data_path, size)
+            linear = bench(lambda: linear_pick(manager), rounds)
+
+            manager = build_manager(data_path, size)
+            heap = bench(manager.get_cookie, ROUNDS)
+            named = bench(lambda: manager.get_cookie(f'account_{size // 2}'), ROUNDS)
+            manager.close()
+            print(f'{size:>8} {linear:>10.2f} {heap:>10.2f} {named:>12.2f}')
+        finally:
+            shutil.rmtree(data_path, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
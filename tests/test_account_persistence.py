@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import ujson as json
+
+from utils.account_manager import AccountManager
+
+
+class TestAccountWriteBehind(unittest.TestCase):
+    def setUp(self):
+        self.data_path = tempfile.mkdtemp()
+        self.manager = AccountManager(self.data_path, flush_interval=0.1)
+        self.manager.add_account('a', 'sessionid=1')
+        self.manager.add_account('b', 'sessionid=2')
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.data_path, ignore_errors=True)
+
+    def read_file(self):
+        with open(self.manager.cookies_file, 'r', encoding='utf-8') as f:
+            return {account['name']: account for account in json.load(f)}
+
+    def test_get_cookie_does_not_write(self):
+        with mock.patch.object(self.manager, '_save_cookies', wraps=self.manager._save_cookies) as save:
+            for _ in range(100):
+                self.manager.get_cookie()
+            save.assert_not_called()
+            # 后台线程按间隔批量写入一次
+            time.sleep(0.3)
+            self.assertEqual(save.call_count, 1)
+        self.assertGreater(self.read_file()['a']['lastUsed'], 0)
+
+    def test_close_flushes(self):
+        manager = AccountManager(self.data_path, flush_interval=0)
+        manager.get_cookie('b')
+        self.assertEqual(self.read_file()['b']['lastUsed'], 0)
+        manager.close()
+        self.assertGreater(self.read_file()['b']['lastUsed'], 0)
+
+    def test_structural_changes_saved_immediately(self):
+        self.manager.update_account('a', description='x')
+        self.manager.delete_account('b')
+        accounts = self.read_file()
+        self.assertEqual(accounts['a']['description'], 'x')
+        self.assertNotIn('b', accounts)
+        # 原子替换，不留下临时文件
+        self.assertEqual(os.listdir(self.data_path), ['cookies.json'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import base64
+import shutil
+import tempfile
+import threading
+import unittest
+from collections import Counter
+from unittest import mock
+
+import httpx
+
+from utils.account_manager import AccountManager
+from utils.account_scheduler import AccountLoad, create_scheduler
+from utils.circuit_breaker import CircuitBreakerRegistry
+from utils.rate_limiter import RateLimiter
+from utils.request import Request
+from utils.response_cache import ResponseCache
+
+
+def encode(cookie):
+    return base64.b64encode(cookie.encode()).decode()
+
+
+class TestAccountScheduler(unittest.TestCase):
+    def setUp(self):
+        self.data_path = tempfile.mkdtemp()
+        AccountLoad._instance = None
+        CircuitBreakerRegistry.initialize()
+
+    def tearDown(self):
+        AccountManager.get_instance().close()
+        shutil.rmtree(self.data_path, ignore_errors=True)
+        AccountLoad._instance = None
+
+    def manager(self, scheduler, accounts=('a', 'b', 'c')):
+        manager = AccountManager.initialize(self.data_path, flush_interval=0, scheduler=scheduler)
+        for name in accounts:
+            manager.add_account(name, encode(f'ttwid={name}'))
+        return manager
+
+    def pick(self, manager, n):
+        return [manager.get_cookie_entry()['name'] for _ in range(n)]
+
+    def test_unknown_scheduler(self):
+        with self.assertRaises(ValueError):
+            create_scheduler('random')
+
+    def test_round_robin(self):
+        manager = self.manager('round_robin')
+        self.assertEqual(self.pick(manager, 6), ['a', 'b', 'c', 'a', 'b', 'c'])
+
+    def test_weighted_prefers_logged_in(self):
+        manager = self.manager('weighted', accounts=('guest',))
+        manager.add_account('user', encode('sessionid=1; ttwid=user'))
+        picks = self.pick(manager, 8)
+        self.assertEqual(Counter(picks), {'user': 6, 'guest': 2})
+        # 平滑加权，游客账号不会连续被跳过太多次
+        self.assertIn('guest', picks[:4])
+
+    def test_least_inflight(self):
+        manager = self.manager('least_inflight')
+        load = AccountLoad.get_instance()
+        load.begin('a')
+        load.begin('a')
+        load.begin('b')
+        self.assertEqual(self.pick(manager, 1), ['c'])
+
+    def test_least_inflight_burst(self):
+        # 连续选择账号，前面的请求都还没有结束
+        manager = self.manager('least_inflight')
+        picks = [manager.get_cookie_entry(track_load=True)['name'] for _ in range(9)]
+        self.assertEqual(Counter(picks), {'a': 3, 'b': 3, 'c': 3})
+        self.assertEqual(AccountLoad.get_instance().in_flight('a'), 3)
+
+    def test_latency_avoids_slow_account(self):
+        manager = self.manager('latency', accounts=('fast', 'slow'))
+        load = AccountLoad.get_instance()
+        with mock.patch('utils.account_scheduler.time.monotonic', side_effect=[0, 0.05, 0, 2.0]):
+            load.end('fast', load.begin('fast'))
+            load.end('slow', load.begin('slow'))
+        self.assertEqual(Counter(self.pick(manager, 5)), {'fast': 5})
+        self.assertEqual(load.stats()['slow']['latencyMs'], 2000.0)
+
+    def test_skips_open_accounts(self):
+        manager = self.manager('round_robin')
+        with mock.patch.object(CircuitBreakerRegistry, 'is_available', side_effect=lambda name: name != 'b'):
+            self.assertEqual(self.pick(manager, 4), ['a', 'c', 'a', 'c'])
+
+
+class TestRequestLoadTracking(unittest.TestCase):
+    def setUp(self):
+        self.data_path = tempfile.mkdtemp()
+        self.manager = AccountManager.initialize(self.data_path, flush_interval=0, scheduler='least_inflight')
+        for name in ('a', 'b'):
+            self.manager.add_account(name, encode(f'ttwid={name}'))
+        AccountLoad._instance = None
+        CircuitBreakerRegistry.initialize()
+        ResponseCache.initialize(0)
+        RateLimiter.initialize(0)
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.data_path, ignore_errors=True)
+        RateLimiter.initialize()
+        AccountLoad._instance = None
+
+    def test_in_flight_spreads_concurrent_requests(self):
+        # 所有请求同时开始，在上游等待，直到全部请求都已发出
+        barrier = threading.Barrier(8, timeout=5)
+        used = []
+
+        def handler(request: httpx.Request):
+            used.append(request.headers['cookie'].split('=')[1])
+            barrier.wait()
+            return httpx.Response(200, json={'status_code': 0})
+
+        request = Request(use_rotating_cookies=True)
+        request.WEBID = '1'
+
+        def fetch(i):
+            request.getJSON('/aweme/v1/web/aweme/detail/', {'aweme_id': i})
+
+        with mock.patch.object(Request, 'client', httpx.Client(transport=httpx.MockTransport(handler))):
+            threads = [threading.Thread(target=fetch, args=(i,)) for i in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(5)
+
+        self.assertEqual(Counter(used), {'a': 4, 'b': 4})
+        stats = AccountLoad.get_instance().stats()
+        self.assertEqual({name: s['inFlight'] for name, s in stats.items()}, {'a': 0, 'b': 0})
+        self.assertEqual(sum(s['requests'] for s in stats.values()), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import shutil
+import tempfile
+import unittest
+
+from utils.account_manager import AccountManager
+
+
+class TestAccountSelection(unittest.TestCase):
+    def setUp(self):
+        self.data_path = tempfile.mkdtemp()
+        self.manager = AccountManager(self.data_path, flush_interval=0)
+        for name in ['a', 'b', 'c']:
+            self.manager.add_account(name, f'cookie_{name}')
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.data_path, ignore_errors=True)
+
+    def test_round_robin(self):
+        # lastUsed相同时按使用先后轮换
+        picks = [self.manager.get_cookie() for _ in range(6)]
+        self.assertEqual(picks, ['cookie_a', 'cookie_b', 'cookie_c'] * 2)
+
+    def test_named_use_moves_to_back(self):
+        self.manager.get_cookie('a')
+        self.assertEqual([self.manager.get_cookie() for _ in range(3)], ['cookie_b', 'cookie_c', 'cookie_a'])
+
+    def test_add_and_delete(self):
+        self.manager.get_cookie()
+        self.manager.delete_account('b')
+        self.manager.add_account('d', 'cookie_d')
+        self.assertIsNone(self.manager.get_account_by_name('b'))
+        self.assertEqual(self.manager.get_account_by_name('d')['cookie'], 'cookie_d')
+        picks = {self.manager.get_cookie() for _ in range(3)}
+        self.assertEqual(picks, {'cookie_a', 'cookie_c', 'cookie_d'})
+
+    def test_reload_keeps_order(self):
+        self.manager.get_cookie('a')
+        self.manager.get_cookie('b')
+        self.manager.flush()
+
+        # 重新加载后从文件中的lastUsed重建堆，从未使用的c排在最前
+        manager = AccountManager(self.data_path, flush_interval=0)
+        self.assertEqual(manager.get_cookie(), 'cookie_c')
+        manager.close()
+
+    def test_heap_stays_bounded(self):
+        for _ in range(1000):
+            self.manager.get_cookie('a')
+        self.assertLess(len(self.manager._heap), 2 * 3 + 64 + 1)
+        self.assertEqual(self.manager.get_cookie(), 'cookie_b')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import asyncio
+import base64
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import httpx
+
+from utils.account_manager import AccountManager
+from utils.async_request import AsyncRequest
+from utils.async_runner import BackgroundLoop
+from utils.circuit_breaker import OPEN, CircuitBreakerRegistry
+from utils.rate_limiter import RateLimiter
+from utils.response_cache import ResponseCache
+
+ACCOUNT_COUNT = 10
+UPSTREAM_LATENCY = 0.2
+
+
+class TestBulkValidation(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from app import app
+        cls.client = app.test_client()
+
+    def setUp(self):
+        self.data_path = tempfile.mkdtemp()
+        self.manager = AccountManager.initialize(self.data_path, flush_interval=0)
+        for i in range(ACCOUNT_COUNT):
+            # 奇数账号的cookie已过期
+            cookie = f'sessionid={"expired" if i % 2 else "ok"}{i}'
+            self.manager.add_account(f'account{i}', base64.b64encode(cookie.encode()).decode())
+        ResponseCache.initialize(0)
+        RateLimiter.initialize(0)
+        self.registry = CircuitBreakerRegistry.initialize()
+        patcher = mock.patch.object(CircuitBreakerRegistry, '_ensure_prober')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        loop = BackgroundLoop.get_instance().loop
+        AsyncRequest._clients[loop] = httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.data_path, ignore_errors=True)
+        RateLimiter.initialize()
+        CircuitBreakerRegistry.initialize()
+
+    async def handler(self, request: httpx.Request):
+        if request.url.path == '/':
+            return httpx.Response(200, text='xx\\"user_unique_id\\":\\"7362810250930783783\\"xx')
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(UPSTREAM_LATENCY)
+        finally:
+            self.in_flight -= 1
+        if 'sessionid=ok' in request.headers['cookie']:
+            return httpx.Response(200, json={'status_code': 0, 'user': {'uid': '1'}})
+        return httpx.Response(200, json={'status_code': 8})
+
+    def test_all_accounts(self):
+        response = self.client.post('/api/v1/account/test-all', json={'concurrency': 5})
+        data = response.get_json()['data']
+
+        self.assertEqual([result['name'] for result in data['results']], [f'account{i}' for i in range(ACCOUNT_COUNT)])
+        self.assertEqual((data['total'], data['valid'], data['invalid']), (10, 5, 5))
+        self.assertEqual([result['valid'] for result in data['results']], [i % 2 == 0 for i in range(ACCOUNT_COUNT)])
+        self.assertGreaterEqual(data['results'][0]['latencyMs'], UPSTREAM_LATENCY * 1000)
+        # 并发测试，但不超过并发上限
+        self.assertEqual(self.max_in_flight, 5)
+        self.assertLess(data['elapsedMs'], ACCOUNT_COUNT * UPSTREAM_LATENCY * 1000 / 2)
+
+        # 结果记录到账号上，测试不更新使用时间
+        account = self.manager.get_account_by_name('account1')
+        self.assertFalse(account['valid'])
+        self.assertGreater(account['lastValidated'], 0)
+        self.assertEqual(account['lastUsed'], 0)
+        self.assertTrue(self.manager.get_account_by_name('account0')['valid'])
+
+        # 测试未通过的账号立即停止参与自动选择
+        self.assertEqual(self.registry.state('account1'), OPEN)
+        names = {self.manager.get_cookie_entry()['name'] for _ in range(10)}
+        self.assertEqual(names, {f'account{i}' for i in range(0, ACCOUNT_COUNT, 2)})
+
+    def test_selected_and_missing_accounts(self):
+        response = self.client.post('/api/v1/account/test-all', json={'names': ['account0', 'missing']})
+        results = response.get_json()['data']['results']
+        self.assertEqual([(result['name'], result['valid']) for result in results],
+                         [('account0', True), ('missing', False)])
+        self.assertIsNone(results[1]['latencyMs'])
+
+
+if __name__ == '__main__':
+    unittest.main()
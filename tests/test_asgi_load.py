@@ -0,0 +1,96 @@
+"""
+ASGI模式压测
+上游使用模拟的httpx传输层，每个请求固定延迟，对比串行和并发时的吞吐量
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import httpx
+
+UPSTREAM_LATENCY = 0.05
+TOTAL_REQUESTS = 200
+CONCURRENCY = 50
+
+
+async def upstream_handler(request: httpx.Request):
+    """模拟抖音接口，固定延迟后返回"""
+    await asyncio.sleep(UPSTREAM_LATENCY)
+    if request.url.path == '/':
+        return httpx.Response(200, text='xx\\"user_unique_id\\":\\"7362810250930783783\\"xx')
+    return httpx.Response(200, json={'status_code': 0, 'aweme_id': request.url.params.get('aweme_id')})
+
+
+class TestAsgiLoad(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.data_path = tempfile.mkdtemp()
+        # asgi模块通过环境变量读取配置，结束后恢复，不影响之后的测试
+        cls.saved_environ = {name: os.environ.get(name) for name in ('DATA_PATH', 'ASGI_THREADS')}
+        os.environ['DATA_PATH'] = cls.data_path
+        os.environ['ASGI_THREADS'] = str(CONCURRENCY)
+
+        from asgi import application
+        from utils.async_request import AsyncRequest
+        from utils.async_runner import BackgroundLoop
+        from utils.rate_limiter import RateLimiter
+        from utils.response_cache import ResponseCache
+
+        cls.application = application
+        cls.loop = BackgroundLoop.get_instance().loop
+        # 压测的是上游请求的并发能力，关闭响应缓存和限速
+        ResponseCache.initialize(0)
+        RateLimiter.initialize(0)
+        # async视图都运行在后台事件循环上，把模拟上游注册为该循环的AsyncClient
+        AsyncRequest._clients[cls.loop] = httpx.AsyncClient(transport=httpx.MockTransport(upstream_handler))
+
+    @classmethod
+    def tearDownClass(cls):
+        from utils.async_request import AsyncRequest
+        from utils.cookie_sweeper import CookieSweeper
+        from utils.rate_limiter import RateLimiter
+        from utils.response_cache import ResponseCache
+
+        for name, value in cls.saved_environ.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        # 恢复默认的响应缓存和限速，移除模拟上游，停止asgi模块启动的cookie检查
+        ResponseCache.initialize()
+        RateLimiter.initialize()
+        AsyncRequest._clients.pop(cls.loop, None)
+        CookieSweeper.get_instance().close()
+        shutil.rmtree(cls.data_path, ignore_errors=True)
+
+    async def _run_load(self, total: int, concurrency: int) -> float:
+        """发送total个请求，最多concurrency个同时进行，返回每秒请求数"""
+        semaphore = asyncio.Semaphore(concurrency)
+        transport = httpx.ASGITransport(app=self.application)
+
+        async with httpx.AsyncClient(transport=transport, base_url='http://testserver') as client:
+            async def fetch(i):
+                async with semaphore:
+                    response = await client.get('/aweme/v1/web/aweme/detail/', params={'aweme_id': str(i)})
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(response.json()['aweme_id'], str(i))
+
+            start = time.perf_counter()
+            await asyncio.gather(*[fetch(i) for i in range(total)])
+            return total / (time.perf_counter() - start)
+
+    def test_throughput(self):
+        serial = asyncio.run(self._run_load(20, 1))
+        concurrent = asyncio.run(self._run_load(TOTAL_REQUESTS, CONCURRENCY))
+        print(f'\n上游延迟 {UPSTREAM_LATENCY * 1000:.0f}ms: 串行 {serial:.1f} req/s, '
+              f'并发{CONCURRENCY} {concurrent:.1f} req/s')
+        # 上游请求在后台事件循环中并发等待，吞吐量应明显高于串行
+        self.assertGreater(concurrent, serial * 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
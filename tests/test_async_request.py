@@ -0,0 +1,138 @@
+import asyncio
+import base64
+import shutil
+import tempfile
+import time
+import unittest
+from collections import Counter
+
+import httpx
+
+from utils.account_manager import AccountManager
+from utils.async_request import AsyncRequest
+from utils.rate_limiter import RateLimiter
+from utils.response_cache import ResponseCache
+from utils.webid_cache import WebidCache
+
+
+def make_request(handler) -> AsyncRequest:
+    """创建使用模拟上游的AsyncRequest，跳过cookie加载"""
+    req = AsyncRequest(cookie='test', use_rotating_cookies=False)
+    req.COOKIES = {'msToken': 'token', 's_v_web_id': 'verify'}
+    req._cookies_loaded = True
+    AsyncRequest._clients[asyncio.get_running_loop()] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return req
+
+
+class TestAsyncRequest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        # 关闭响应缓存，每次调用都请求上游
+        ResponseCache.initialize(0)
+        # 测试的是并发和重试，不限速
+        RateLimiter.initialize(0)
+        WebidCache.initialize()
+
+    async def asyncTearDown(self):
+        await AsyncRequest.close_client()
+
+    async def test_get_json(self):
+        seen = []
+
+        async def handler(request: httpx.Request):
+            if request.url.path == '/':
+                return httpx.Response(200, text='xx\\"user_unique_id\\":\\"7362810250930783783\\"xx')
+            seen.append(request)
+            return httpx.Response(200, json={'status_code': 0, 'aweme_id': request.url.params['aweme_id']})
+
+        req = make_request(handler)
+        result = await req.getJSON('/aweme/v1/web/comment/list/', {'aweme_id': '123'})
+        self.assertEqual(result, {'status_code': 0, 'aweme_id': '123'})
+        # 首次请求不等待抓取首页，先使用随机webid，真实webid在后台获取
+        random_webid = seen[0].url.params['webid']
+        self.assertEqual(len(random_webid), 19)
+        await asyncio.gather(*AsyncRequest._webid_tasks)
+        self.assertEqual(await req.get_webid(), '7362810250930783783')
+
+        await req.getJSON('/aweme/v1/web/comment/list/', {'aweme_id': '123'})
+        params = seen[1].url.params
+        self.assertEqual(params['webid'], '7362810250930783783')
+        self.assertEqual(params['msToken'], 'token')
+        self.assertEqual(len(params['a_bogus']), 164)
+        self.assertEqual(seen[0].headers['referer'], 'https://www.douyin.com/video/123')
+
+    async def test_retry(self):
+        calls = []
+
+        async def handler(request: httpx.Request):
+            calls.append(request)
+            if len(calls) < 3:
+                return httpx.Response(500)
+            return httpx.Response(200, json={'status_code': 0})
+
+        req = make_request(handler)
+        req.WEBID = '1'
+        self.assertEqual(await req.getJSON('/aweme/v1/web/aweme/detail/', {}, delay=0.01), {'status_code': 0})
+        self.assertEqual(len(calls), 3)
+
+        calls.clear()
+        self.assertEqual(await req.getJSON('/aweme/v1/web/aweme/detail/', {}, max_retries=2, delay=0.01), {})
+
+    async def test_concurrent_requests(self):
+        async def handler(request: httpx.Request):
+            await asyncio.sleep(0.2)
+            return httpx.Response(200, json={'status_code': 0})
+
+        req = make_request(handler)
+        req.WEBID = '1'
+        start = time.time()
+        results = await asyncio.gather(*[
+            req.getJSON('/aweme/v1/web/aweme/detail/', {'aweme_id': str(i)}) for i in range(100)
+        ])
+        self.assertEqual(len(results), 100)
+        self.assertTrue(all(result == {'status_code': 0} for result in results))
+        # 100个请求并发挂起，总耗时远小于串行的20秒
+        self.assertLess(time.time() - start, 5)
+
+
+
+class TestAsyncRotation(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.data_path = tempfile.mkdtemp()
+        self.manager = AccountManager.initialize(self.data_path, flush_interval=0)
+        self.names = [f'account{i}' for i in range(4)]
+        for name in self.names:
+            cookie = f'sessionid={name}; msToken=token-{name}; s_v_web_id=verify-{name}'
+            self.manager.add_account(name, base64.b64encode(cookie.encode()).decode())
+        ResponseCache.initialize(0)
+        RateLimiter.initialize(0)
+
+    async def asyncTearDown(self):
+        await AsyncRequest.close_client()
+        self.manager.close()
+        shutil.rmtree(self.data_path, ignore_errors=True)
+        RateLimiter.initialize()
+
+    async def test_shared_rotating_instance(self):
+        sent = []
+
+        async def handler(request: httpx.Request):
+            cookies = dict(item.split('=', 1) for item in request.headers['cookie'].split('; '))
+            sent.append((cookies['sessionid'], request.url.params['msToken'], request.url.params['verifyFp']))
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={'status_code': 0})
+
+        # 与request_proxy中的默认实例一样，所有协程共用一个轮换cookie的实例
+        req = AsyncRequest()
+        req.WEBID = '1'
+        AsyncRequest._clients[asyncio.get_running_loop()] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        await asyncio.gather(*(req.getJSON('/aweme/v1/web/aweme/detail/', {'aweme_id': i}) for i in range(200)))
+
+        self.assertEqual(len(sent), 200)
+        for name, ms_token, verify in sent:
+            self.assertEqual((ms_token, verify), (f'token-{name}', f'verify-{name}'))
+        # 同一批并发请求轮流使用所有账号
+        self.assertEqual(Counter(name for name, _, _ in sent), {name: 50 for name in self.names})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import asyncio
+import base64
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import httpx
+
+from utils.account_manager import AccountManager
+from utils.account_scheduler import AccountLoad
+from utils.async_request import AsyncRequest
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreakerRegistry
+from utils.rate_limiter import RateLimiter
+from utils.request import Request
+from utils.response_cache import ResponseCache
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.probes = []
+        self.healthy = False
+        self.registry = CircuitBreakerRegistry.initialize(
+            failure_threshold=0.5, window=10, min_requests=4, open_seconds=0, probe=self.probe)
+
+    def tearDown(self):
+        CircuitBreakerRegistry.initialize()
+
+    def probe(self, name):
+        self.probes.append(name)
+        return self.healthy
+
+    def test_opens_on_failure_rate(self):
+        for success in (True, False, True, False):
+            self.registry.record('a', success)
+        # 失败率达到50%且请求数足够，熔断
+        self.assertEqual(self.registry.state('a'), OPEN)
+        self.assertFalse(self.registry.is_available('a'))
+        self.assertEqual(self.registry.stats()['open'], ['a'])
+
+    def test_not_opened_below_min_requests(self):
+        for _ in range(3):
+            self.registry.record('a', False)
+        self.assertTrue(self.registry.is_available('a'))
+
+    def test_probe(self):
+        with mock.patch.object(CircuitBreakerRegistry, '_ensure_prober'):
+            for _ in range(4):
+                self.registry.record('a', False)
+
+        self.registry.probe_due()
+        self.assertEqual(self.probes, ['a'])
+        self.assertEqual(self.registry.state('a'), OPEN)
+
+        self.healthy = True
+        self.registry.probe_due()
+        self.assertEqual(self.registry.state('a'), CLOSED)
+        # 恢复后重新统计
+        self.registry.record('a', False)
+        self.assertTrue(self.registry.is_available('a'))
+
+    def test_half_open_ignores_results(self):
+        with mock.patch.object(CircuitBreakerRegistry, '_ensure_prober'):
+            for _ in range(4):
+                self.registry.record('a', False)
+        self.registry._breakers['a'].state = HALF_OPEN
+        self.registry.record('a', True)
+        self.assertEqual(self.registry.state('a'), HALF_OPEN)
+
+
+class TestRotationSkipsOpenAccounts(unittest.TestCase):
+    def setUp(self):
+        self.data_path = tempfile.mkdtemp()
+        self.manager = AccountManager.initialize(self.data_path, flush_interval=0)
+        for name in ('good', 'bad'):
+            self.manager.add_account(name, base64.b64encode(f'sessionid={name}'.encode()).decode())
+        self.registry = CircuitBreakerRegistry.initialize(min_requests=3, open_seconds=3600)
+        ResponseCache.initialize(0)
+        RateLimiter.initialize(0)
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.data_path, ignore_errors=True)
+        CircuitBreakerRegistry.initialize()
+        RateLimiter.initialize()
+
+    def test_expired_cookie_is_benched(self):
+        used = []
+
+        def handler(request: httpx.Request):
+            account = request.headers['cookie'].split('=')[1]
+            used.append(account)
+            # 过期的cookie返回未登录
+            return httpx.Response(200, json={'status_code': 8 if account == 'bad' else 0})
+
+        request = Request(use_rotating_cookies=True)
+        request.WEBID = '1'
+        with mock.patch.object(Request, 'client', httpx.Client(transport=httpx.MockTransport(handler))):
+            for i in range(20):
+                request.getJSON('/aweme/v1/web/aweme/detail/', {'aweme_id': i})
+
+        # 失败3次后不再使用bad
+        self.assertEqual(used.count('bad'), 3)
+        self.assertEqual(self.registry.stats()['open'], ['bad'])
+
+        # 更新cookie后重新参与轮换
+        self.manager.update_account('bad', cookie='sessionid=bad2')
+        self.assertTrue(self.registry.is_available('bad'))
+
+    def test_cancelled_requests_are_not_failures(self):
+        async def handler(request: httpx.Request):
+            await asyncio.sleep(1)
+            return httpx.Response(200, json={'status_code': 0})
+
+        async def run():
+            AsyncRequest._clients[asyncio.get_running_loop()] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            request = AsyncRequest(use_rotating_cookies=True)
+            request.WEBID = '1'
+            try:
+                for i in range(10):
+                    # 调用方超时放弃请求，例如关注用户视频接口的截止时间
+                    with self.assertRaises(asyncio.TimeoutError):
+                        await asyncio.wait_for(request.getJSON('/aweme/v1/web/aweme/detail/', {'aweme_id': i}), 0.01)
+                await asyncio.sleep(0.05)
+            finally:
+                await AsyncRequest.close_client()
+
+        AccountLoad._instance = None
+        asyncio.run(run())
+        self.assertEqual(self.registry.stats()['open'], [])
+        self.assertEqual({name: s['inFlight'] for name, s in AccountLoad.get_instance().stats().items()},
+                         {'good': 0, 'bad': 0})
+
+    def test_all_open_falls_back(self):
+        # 所有账号都被熔断时仍然按最近最少使用返回账号
+        with mock.patch.object(CircuitBreakerRegistry, 'is_available', return_value=False):
+            self.assertIsNotNone(self.manager.get_cookie())
+            self.assertIsNotNone(self.manager.get_cookie())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import base64
+import shutil
+import sys
+import tempfile
+import unittest
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import httpx
+
+from utils.account_manager import AccountManager
+from utils.account_scheduler import AccountLoad
+from utils.rate_limiter import RateLimiter
+from utils.request import Request
+from utils.response_cache import ResponseCache
+
+COOKIE = 'msToken=token; s_v_web_id=verify; dy_swidth=1920; device_web_cpu_core=8; sessionid=1'
+
+
+class TestCookieEntry(unittest.TestCase):
+    def setUp(self):
+        self.data_path = tempfile.mkdtemp()
+        self.manager = AccountManager.initialize(self.data_path, flush_interval=0)
+        self.manager.add_account('a', base64.b64encode(COOKIE.encode()).decode())
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.data_path, ignore_errors=True)
+
+    def test_entry_cached_and_invalidated(self):
+        entry = self.manager.get_cookie_entry('a')
+        self.assertEqual(entry['name'], 'a')
+        self.assertEqual(entry['cookies']['sessionid'], '1')
+        self.assertEqual(entry['params'], {
+            'msToken': 'token', 'screen_width': '1920', 'screen_height': 1440, 'cpu_core_num': '8',
+            'device_memory': 8, 'verifyFp': 'verify', 'fp': 'verify'
+        })
+        self.assertIs(self.manager.get_cookie_entry('a'), entry)
+        # get_cookie_dict返回副本
+        self.manager.get_cookie_dict('a')['sessionid'] = 'x'
+        self.assertEqual(entry['cookies']['sessionid'], '1')
+
+        self.manager.update_account('a', cookie='sessionid=2')
+        self.assertEqual(self.manager.get_cookie_entry('a')['cookies'], {'sessionid': '2'})
+
+        self.manager.delete_account('a')
+        self.assertIsNone(self.manager.get_cookie_entry('a'))
+
+    def test_request_hot_path_does_not_parse(self):
+        request = Request()
+        with mock.patch.object(AccountManager, '_cookies_str_to_dict', wraps=self.manager._cookies_str_to_dict) as parse:
+            for _ in range(5):
+                entry = request._call_entry()
+                params = request._apply_params({}, '1', entry)
+            self.assertEqual(parse.call_count, 1)
+
+        self.assertEqual(entry['name'], 'a')
+        self.assertEqual(params['msToken'], 'token')
+        self.assertEqual(params['verifyFp'], 'verify')
+        self.assertEqual(params['screen_width'], '1920')
+        self.assertEqual(params['webid'], '1')
+
+    def test_cookies_assigned_directly(self):
+        # 直接设置COOKIES时设备参数随之更新
+        request = Request(cookie='test', use_rotating_cookies=False)
+        request.COOKIES = {'s_v_web_id': 'v1'}
+        request._cookies_loaded = True
+        self.assertEqual(request._apply_params({}, '1')['fp'], 'v1')
+        request.COOKIES = {'s_v_web_id': 'v2'}
+        self.assertEqual(request._apply_params({}, '1')['fp'], 'v2')
+
+
+class TestConcurrentRotation(unittest.TestCase):
+    def setUp(self):
+        self.data_path = tempfile.mkdtemp()
+        self.manager = AccountManager.initialize(self.data_path, flush_interval=0)
+        self.names = [f'account{i}' for i in range(5)]
+        for name in self.names:
+            cookie = f'sessionid={name}; msToken=token-{name}; s_v_web_id=verify-{name}'
+            self.manager.add_account(name, base64.b64encode(cookie.encode()).decode())
+        AccountLoad._instance = None
+        ResponseCache.initialize(0)
+        RateLimiter.initialize(0)
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.data_path, ignore_errors=True)
+        RateLimiter.initialize()
+        AccountLoad._instance = None
+
+    def test_shared_rotating_instance(self):
+        sent = []
+
+        def handler(request: httpx.Request):
+            cookies = dict(item.split('=', 1) for item in request.headers['cookie'].split('; '))
+            name = cookies['sessionid']
+            sent.append((name, request.url.params['msToken'], request.url.params['verifyFp']))
+            return httpx.Response(200, json={'status_code': 0})
+
+        # 多个线程共用同一个轮换cookie的实例，缩短线程切换间隔让交错更容易出现
+        request = Request()
+        request.WEBID = '1'
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, interval)
+        with mock.patch.object(Request, 'client', httpx.Client(transport=httpx.MockTransport(handler))):
+            with ThreadPoolExecutor(16) as executor:
+                list(executor.map(lambda i: request.getJSON('/aweme/v1/web/aweme/detail/', {'aweme_id': i}),
+                                  range(400)))
+
+        self.assertEqual(len(sent), 400)
+        # 每个请求的cookie和设备参数来自同一个账号
+        for name, ms_token, verify in sent:
+            self.assertEqual((ms_token, verify), (f'token-{name}', f'verify-{name}'))
+        # 负载按实际发送请求的账号记录
+        used = Counter(name for name, _, _ in sent)
+        stats = AccountLoad.get_instance().stats()
+        self.assertEqual({name: stats[name]['requests'] for name in used}, dict(used))
+        self.assertEqual(set(used), set(self.names))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import base64
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from utils.account_manager import AccountManager
+from utils.circuit_breaker import OPEN, CircuitBreakerRegistry
+from utils.cookie_sweeper import CookieSweeper
+
+
+class TestCookieSweeper(unittest.TestCase):
+    def setUp(self):
+        self.data_path = tempfile.mkdtemp()
+        self.manager = AccountManager.initialize(self.data_path, flush_interval=0)
+        for name in ('a', 'b', 'c'):
+            self.manager.add_account(name, base64.b64encode(f'sessionid={name}'.encode()).decode())
+        self.registry = CircuitBreakerRegistry.initialize(open_seconds=3600)
+        self.sweeper = CookieSweeper(interval=3600, spacing=0)
+        self.checked = []
+        patcher = mock.patch('utils.cookie_sweeper.test_cookie', side_effect=self.check)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.data_path, ignore_errors=True)
+        CircuitBreakerRegistry.initialize()
+
+    def check(self, cookie_dict):
+        self.checked.append(cookie_dict['sessionid'])
+        return cookie_dict['sessionid'] != 'b'
+
+    def test_sweeps_each_account_once_per_interval(self):
+        for _ in range(5):
+            self.sweeper.sweep_once()
+        self.assertEqual(self.checked, ['a', 'b', 'c'])
+        self.assertIsNone(self.sweeper.sweep_once())
+        self.assertEqual(self.sweeper.stats()['checked'], 3)
+        # 检查不更新使用时间
+        self.assertEqual(self.manager.get_account_by_name('a')['lastUsed'], 0)
+
+    def test_status_in_account_list(self):
+        before = self.manager.get_all_accounts()
+        self.assertEqual([(a['valid'], a['lastValidated']) for a in before], [(None, 0)] * 3)
+
+        for _ in range(3):
+            self.sweeper.sweep_once()
+        accounts = {account['name']: account for account in self.manager.get_all_accounts()}
+        self.assertEqual({name: account['valid'] for name, account in accounts.items()},
+                         {'a': True, 'b': False, 'c': True})
+        self.assertGreater(accounts['b']['lastValidated'], 0)
+        self.assertIsNotNone(accounts['b']['validateLatency'])
+
+        # 更换cookie后重新检查
+        self.manager.update_account('b', cookie=base64.b64encode(b'sessionid=d').decode())
+        self.assertIsNone(self.manager.get_account_by_name('b').get('valid'))
+        self.assertEqual(self.sweeper.sweep_once(), 'b')
+
+    def test_invalid_account_is_benched(self):
+        with mock.patch.object(CircuitBreakerRegistry, '_ensure_prober'):
+            for _ in range(3):
+                self.sweeper.sweep_once()
+        self.assertEqual(self.registry.state('b'), OPEN)
+        self.assertEqual(self.sweeper.stats()['invalid'], 1)
+        # 自动选择账号时跳过
+        names = {self.manager.get_cookie_entry()['name'] for _ in range(4)}
+        self.assertEqual(names, {'a', 'c'})
+
+    def test_invalid_account_stays_benched_after_restart(self):
+        with mock.patch.object(CircuitBreakerRegistry, '_ensure_prober'):
+            for _ in range(3):
+                self.sweeper.sweep_once()
+            self.manager.close()
+            self.registry = CircuitBreakerRegistry.initialize(open_seconds=3600)
+            self.manager = AccountManager.initialize(self.data_path, flush_interval=0)
+        self.assertFalse(self.manager.get_account_by_name('b')['valid'])
+        self.assertEqual(self.registry.state('b'), OPEN)
+        names = {self.manager.get_cookie_entry()['name'] for _ in range(4)}
+        self.assertEqual(names, {'a', 'c'})
+
+    def test_disabled(self):
+        sweeper = CookieSweeper(interval=0)
+        sweeper.start()
+        self.assertFalse(sweeper.stats()['running'])
+
+
+if __name__ == '__main__':
+    unittest.main()
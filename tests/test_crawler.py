@@ -0,0 +1,241 @@
+import asyncio
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import httpx
+import ujson as json
+
+from utils.account_manager import AccountManager
+from utils.crawler import (CrawlError, iter_following_list, iter_following_pages, aiter_following_list,
+                           iter_user_posts, aiter_user_post_pages, merge_post_pages, trim_video)
+from utils.request import Request
+
+TOTAL = 45
+POSTS = 55
+
+
+def following_page(params: dict, fail_at: int = None) -> dict:
+    """模拟关注列表接口，共TOTAL个用户"""
+    offset = int(params['offset'])
+    count = int(params['count'])
+    if offset == fail_at:
+        return {'status_code': 2}
+    followings = [{'sec_uid': f'user{i}', 'uid': str(i), 'nickname': f'n{i}'}
+                  for i in range(offset, min(offset + count, TOTAL))]
+    return {
+        'status_code': 0,
+        'followings': followings,
+        'offset': offset + len(followings),
+        'has_more': offset + len(followings) < TOTAL,
+        'total': TOTAL
+    }
+
+
+def post_page(params: dict, fail_at: int = None) -> dict:
+    """模拟作品列表接口，共POSTS个作品，按时间倒序，max_cursor为已返回的最早作品的时间"""
+    max_cursor = int(params['max_cursor']) or POSTS
+    count = int(params['count'])
+    if max_cursor == fail_at:
+        return {'status_code': 2}
+    awemes = [{'aweme_id': str(i), 'desc': f'v{i}', 'create_time': i}
+              for i in range(max_cursor - 1, max(max_cursor - 1 - count, -1), -1)]
+    return {
+        'status_code': 0,
+        'aweme_list': awemes,
+        'max_cursor': awemes[-1]['create_time'] if awemes else 0,
+        'has_more': bool(awemes) and awemes[-1]['create_time'] > 0
+    }
+
+
+class FakeRequest:
+    def __init__(self, fail_at: int = None):
+        self.fail_at = fail_at
+        self.calls = []
+
+    def getJSON(self, uri, params):
+        self.calls.append(dict(params))
+        if uri.endswith('/aweme/post/'):
+            return post_page(params, self.fail_at)
+        return following_page(params, self.fail_at)
+
+
+class FakeAsyncRequest(FakeRequest):
+    async def getJSON(self, uri, params):
+        await asyncio.sleep(0)
+        return FakeRequest.getJSON(self, uri, params)
+
+
+class TestCrawler(unittest.TestCase):
+    def test_iter_following_list(self):
+        request = FakeRequest()
+        users = list(iter_following_list(request, '1', 'self', count=20))
+        self.assertEqual([user['sec_uid'] for user in users], [f'user{i}' for i in range(TOTAL)])
+        self.assertEqual([call['offset'] for call in request.calls], ['0', '20', '40'])
+
+    def test_lazy_and_max_pages(self):
+        request = FakeRequest()
+        iterator = iter_following_list(request, '1', 'self', count=10)
+        next(iterator)
+        # 只消费了第一条，不会提前请求后续页
+        self.assertEqual(len(request.calls), 1)
+
+        pages = list(iter_following_pages(FakeRequest(), '1', 'self', count=10, max_pages=2))
+        self.assertEqual(len(pages), 2)
+
+    def test_failure(self):
+        users = []
+        with self.assertRaises(CrawlError):
+            for user in iter_following_list(FakeRequest(fail_at=20), '1', 'self', count=20):
+                users.append(user)
+        self.assertEqual(len(users), 20)
+
+    def test_async_iter(self):
+        async def collect():
+            return [user async for user in aiter_following_list(FakeAsyncRequest(), '1', 'self', count=20)]
+
+        users = asyncio.run(collect())
+        self.assertEqual(len(users), TOTAL)
+
+    def test_iter_user_posts(self):
+        request = FakeRequest()
+        posts = list(iter_user_posts(request, 'user', count=20))
+        self.assertEqual([post['aweme_id'] for post in posts], [str(i) for i in range(POSTS - 1, -1, -1)])
+        self.assertEqual([call['max_cursor'] for call in request.calls], ['0', '35', '15'])
+        self.assertEqual([call['need_time_list'] for call in request.calls], ['1', '0', '0'])
+
+        # 从上次中断的位置继续
+        posts = list(iter_user_posts(FakeRequest(), 'user', count=20, max_cursor=15))
+        self.assertEqual(len(posts), 15)
+
+    def test_async_user_post_pages(self):
+        async def collect():
+            return [page async for page in aiter_user_post_pages(FakeAsyncRequest(), 'user', count=20, max_pages=2)]
+
+        merged = merge_post_pages(asyncio.run(collect()))
+        self.assertEqual([post['aweme_id'] for post in merged['aweme_list']], [str(i) for i in range(POSTS - 1, 14, -1)])
+        # 游标取最后一页，可以继续翻页
+        self.assertEqual((merged['max_cursor'], merged['has_more']), (15, True))
+
+    def test_first_page_params(self):
+        request = FakeRequest()
+        list(iter_user_posts(request, 'user', count=20, first_params={'locate_item_id': '40', 'need_time_list': '0'}))
+        self.assertEqual([call.get('locate_item_id') for call in request.calls], ['40', None, None])
+        self.assertEqual([call['need_time_list'] for call in request.calls], ['0', '0', '0'])
+
+    def test_user_posts_stop_on_stuck_cursor(self):
+        request = FakeRequest()
+        request.getJSON = lambda uri, params: {
+            'status_code': 0, 'aweme_list': [{'aweme_id': '1'}], 'max_cursor': 10, 'has_more': True}
+        self.assertEqual(len(list(iter_user_posts(request, 'user', max_cursor=10))), 1)
+
+    def test_trim_video(self):
+        video = trim_video({'aweme_id': '1', 'desc': 'title', 'create_time': 2,
+                            'video': {'cover': {'url_list': ['cover']}}})
+        self.assertEqual((video['videoId'], video['cover'], video['createTime']), ('1', 'cover', 2000))
+
+
+class TestFollowingListStream(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.data_path = tempfile.mkdtemp()
+        AccountManager.initialize(cls.data_path)
+
+        from app import app
+        cls.client = app.test_client()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.data_path, ignore_errors=True)
+
+    def handler(self, request: httpx.Request):
+        path = request.url.path
+        if path == '/':
+            return httpx.Response(200, text='xx\\"user_unique_id\\":\\"7362810250930783783\\"xx')
+        if path.endswith('/user/profile/self/'):
+            return httpx.Response(200, json={'status_code': 0, 'user': {'uid': '1', 'sec_uid': 'self'}})
+        return httpx.Response(200, json=following_page(dict(request.url.params), fail_at=40))
+
+    def test_stream(self):
+        client = httpx.Client(transport=httpx.MockTransport(self.handler))
+        with mock.patch.object(Request, 'client', client):
+            response = self.client.get('/api/following-list/stream', query_string={'user_account': 'test'})
+            lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual([line['sec_uid'] for line in lines[:-1]], [f'user{i}' for i in range(40)])
+        self.assertIn('error', lines[-1])
+
+
+class TestUserPostStream(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.data_path = tempfile.mkdtemp()
+        AccountManager.initialize(cls.data_path)
+
+        from app import app
+        cls.client = app.test_client()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.data_path, ignore_errors=True)
+
+    def handler(self, request: httpx.Request):
+        if request.url.path == '/':
+            return httpx.Response(200, text='xx\\"user_unique_id\\":\\"7362810250930783783\\"xx')
+        return httpx.Response(200, json=post_page(dict(request.url.params), fail_at=15))
+
+    def test_stream(self):
+        client = httpx.Client(transport=httpx.MockTransport(self.handler))
+        with mock.patch.object(Request, 'client', client):
+            response = self.client.get('/aweme/v1/web/aweme/post/stream/', query_string={'sec_user_id': 'user'})
+            lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual([line['videoId'] for line in lines[:-1]], [str(i) for i in range(POSTS - 1, 14, -1)])
+        self.assertIn('max_cursor: 15', lines[-1]['error'])
+
+    def test_post_max_pages(self):
+        client = httpx.Client(transport=httpx.MockTransport(self.handler))
+        with mock.patch.object(Request, 'client', client):
+            two = self.client.get('/aweme/v1/web/aweme/post/', query_string={
+                'sec_user_id': 'user', 'count': 10, 'max_pages': 2}).get_json()
+            # 第三页失败时返回已获取的部分
+            partial = self.client.get('/aweme/v1/web/aweme/post/', query_string={
+                'sec_user_id': 'user', 'count': 20, 'max_pages': 5}).get_json()
+
+        self.assertEqual([post['aweme_id'] for post in two['aweme_list']], [str(i) for i in range(POSTS - 1, 34, -1)])
+        self.assertEqual((two['max_cursor'], two['has_more']), (35, True))
+        self.assertEqual(len(partial['aweme_list']), 40)
+        self.assertEqual(partial['max_cursor'], 15)
+
+        # 调用方的定位参数带到第一页
+        sent = []
+
+        def handler(request: httpx.Request):
+            sent.append(dict(request.url.params))
+            return self.handler(request)
+
+        with mock.patch.object(Request, 'client', httpx.Client(transport=httpx.MockTransport(handler))):
+            self.client.get('/aweme/v1/web/aweme/post/', query_string={
+                'sec_user_id': 'user', 'count': 10, 'max_pages': 2, 'locate_item_id': '7', 'forward_end_cursor': '9'})
+        posts = [params for params in sent if 'sec_user_id' in params]
+        self.assertEqual([(params.get('locate_item_id'), params.get('forward_end_cursor')) for params in posts],
+                         [('7', '9'), (None, None)])
+
+    def test_update_user_videos_max_pages(self):
+        url = '/api/update-user-videos?user_account=test'
+        result = self.client.post(url, json={'sec_uid': 'user', 'max_pages': 'abc'}).get_json()
+        self.assertEqual(result['code'], 400)
+
+        with mock.patch('api.following_videos_routes.iter_user_post_pages', return_value=iter([])) as pages:
+            self.client.post(url, json={'sec_uid': 'user', 'max_pages': 1000})
+        self.assertEqual(pages.call_args[0][3], 50)
+
+    def test_requires_sec_user_id(self):
+        self.assertEqual(self.client.get('/aweme/v1/web/aweme/post/stream/').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import asyncio
+import shutil
+import tempfile
+import time
+import unittest
+
+import httpx
+
+from utils.account_manager import AccountManager
+from utils.async_request import AsyncRequest
+from utils.async_runner import BackgroundLoop
+from utils.rate_limiter import RateLimiter
+from utils.watched_store import WatchedStore
+
+FOLLOWING_COUNT = 20
+UPSTREAM_LATENCY = 0.2
+
+
+class TestFollowingUsersVideosFanout(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.data_path = tempfile.mkdtemp()
+        AccountManager.initialize(cls.data_path)
+        # 测试的是并发拉取，不限速
+        RateLimiter.initialize(0)
+        WatchedStore.initialize(cls.data_path).mark_watched('test', 'user1')
+
+        from app import app
+        cls.client = app.test_client()
+
+    @classmethod
+    def tearDownClass(cls):
+        WatchedStore.get_instance().close()
+        RateLimiter.initialize()
+        shutil.rmtree(cls.data_path, ignore_errors=True)
+
+    def setUp(self):
+        self.endless_followings = False
+        self.in_flight = 0
+        self.max_in_flight = 0
+        loop = BackgroundLoop.get_instance().loop
+        AsyncRequest._clients[loop] = httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+
+    async def handler(self, request: httpx.Request):
+        path = request.url.path
+        if path == '/':
+            return httpx.Response(200, text='xx\\"user_unique_id\\":\\"7362810250930783783\\"xx')
+        if path.endswith('/user/profile/self/'):
+            return httpx.Response(200, json={'status_code': 0, 'user': {'uid': '1', 'sec_uid': 'self'}})
+        if path.endswith('/user/following/list/') and self.endless_followings:
+            # 每页一个用户，翻页很慢
+            offset = int(request.url.params['offset'])
+            await asyncio.sleep(UPSTREAM_LATENCY)
+            return httpx.Response(200, json={'status_code': 0, 'has_more': offset < 50, 'offset': offset + 1,
+                                             'followings': [{'sec_uid': f'user{offset}', 'nickname': f'n{offset}'}]})
+        if path.endswith('/user/following/list/'):
+            followings = [{'sec_uid': f'user{i}', 'uid': str(i), 'nickname': f'n{i}'} for i in range(FOLLOWING_COUNT)]
+            return httpx.Response(200, json={'status_code': 0, 'followings': followings})
+
+        sec_uid = request.url.params['sec_user_id']
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if sec_uid == 'user3':
+                return httpx.Response(200, json={'status_code': 8})
+            await asyncio.sleep(10 if sec_uid == 'user5' else UPSTREAM_LATENCY)
+            return httpx.Response(200, json={'status_code': 0, 'aweme_list': [{'aweme_id': sec_uid}]})
+        finally:
+            self.in_flight -= 1
+
+    def test_fanout(self):
+        start = time.time()
+        response = self.client.get('/api/following-users-videos', query_string={
+            'user_account': 'test', 'concurrency': 5, 'timeout': 2
+        })
+        elapsed = time.time() - start
+        result = response.get_json()
+
+        self.assertTrue(result['success'])
+        # 结果按关注列表顺序返回
+        self.assertEqual([user['secUid'] for user in result['data']], [f'user{i}' for i in range(FOLLOWING_COUNT)])
+        self.assertEqual(result['data'][0]['videos'][0]['videoId'], 'user0')
+        self.assertFalse(result['data'][0]['videos'][0]['viewed'])
+        self.assertTrue(result['data'][1]['videos'][0]['viewed'])
+        self.assertEqual(result['data'][1]['unwatchedCount'], 0)
+        # 单个用户失败或超时不影响其他用户
+        self.assertEqual(result['errors'], [
+            {'secUid': 'user3', 'nickname': 'n3', 'error': 'status_code: 8'},
+            {'secUid': 'user5', 'nickname': 'n5', 'error': 'timeout'},
+        ])
+        self.assertEqual(result['data'][5]['videos'], [])
+        self.assertLessEqual(self.max_in_flight, 5)
+        # 串行需要 20 * 0.2 秒以上，这里受截止时间限制
+        self.assertLess(elapsed, 3)
+        # 超时的用户不再继续请求上游
+        time.sleep(0.1)
+        self.assertEqual(self.in_flight, 0)
+
+    def test_default_rate_limit(self):
+        # 使用默认限速，所有请求都来自同一个账号
+        RateLimiter.initialize()
+        self.addCleanup(RateLimiter.initialize, 0)
+        start = time.time()
+        response = self.client.get('/api/following-users-videos', query_string={
+            'user_account': 'test', 'timeout': 6
+        })
+        elapsed = time.time() - start
+        errors = response.get_json()['errors']
+
+        # 除了本身失败和很慢的用户，其余用户都在截止时间内完成
+        self.assertEqual([error['secUid'] for error in errors], ['user3', 'user5'])
+        self.assertLess(elapsed, 7)
+
+    def test_limit(self):
+        response = self.client.get('/api/following-users-videos', query_string={
+            'user_account': 'test', 'limit': 3
+        })
+        result = response.get_json()
+        self.assertEqual([user['secUid'] for user in result['data']], ['user0', 'user1', 'user2'])
+        self.assertEqual(result['errors'], [])
+
+    def test_deadline_covers_following_list(self):
+        self.endless_followings = True
+        start = time.time()
+        response = self.client.get('/api/following-users-videos', query_string={
+            'user_account': 'test', 'timeout': 1, 'concurrency': 1000
+        })
+        elapsed = time.time() - start
+        result = response.get_json()
+
+        self.assertTrue(result['success'])
+        # 截止时间到达时停止翻页，返回已获取的部分
+        self.assertLess(elapsed, 2)
+        self.assertGreater(len(result['data']), 0)
+        self.assertLess(len(result['data']), 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
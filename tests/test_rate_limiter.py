@@ -0,0 +1,101 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+import httpx
+
+from utils.rate_limiter import RateLimiter, TokenBucket
+from utils.request import Request
+from utils.response_cache import ResponseCache
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_queue(self):
+        bucket = TokenBucket(rate=10, burst=2)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        # 预支的令牌按顺序排队，每个多等待 1/rate 秒
+        self.assertAlmostEqual(bucket.reserve(), 0.1, delta=0.01)
+        self.assertAlmostEqual(bucket.reserve(), 0.2, delta=0.01)
+
+    def test_refill(self):
+        bucket = TokenBucket(rate=100, burst=1)
+        bucket.reserve()
+        time.sleep(0.02)
+        self.assertEqual(bucket.reserve(), 0)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_account_and_uri_buckets(self):
+        limiter = RateLimiter(account_rate=100, account_burst=10, uri_limits={'/post/': (10, 1)})
+        self.assertEqual(limiter.reserve('a', '/post/'), 0)
+        # 接口桶已空，账号桶还有令牌
+        self.assertGreater(limiter.reserve('a', '/post/'), 0)
+        self.assertEqual(limiter.reserve('a', '/detail/'), 0)
+        # 不同账号互不影响
+        self.assertEqual(limiter.reserve('b', '/post/'), 0)
+        stats = limiter.stats()
+        self.assertEqual((stats['acquired'], stats['delayed'], stats['buckets']), (4, 1, 4))
+
+    def test_disabled(self):
+        limiter = RateLimiter(account_rate=0)
+        for _ in range(100):
+            self.assertEqual(limiter.reserve('a', '/aweme/v1/web/aweme/post/'), 0)
+        self.assertEqual(limiter.stats()['buckets'], 0)
+
+    def test_async_acquire(self):
+        limiter = RateLimiter(account_rate=50, account_burst=1, uri_limits={})
+
+        async def run():
+            start = time.perf_counter()
+            await asyncio.gather(*[limiter.async_acquire('a', '/x/') for _ in range(6)])
+            return time.perf_counter() - start
+
+        self.assertGreaterEqual(asyncio.run(run()), 0.09)
+
+    def test_cancelled_acquire_refunds(self):
+        limiter = RateLimiter(account_rate=100, account_burst=1, uri_limits={'/post/': (1, 1)})
+
+        async def run():
+            waiters = [asyncio.ensure_future(limiter.async_acquire('a', '/post/')) for _ in range(6)]
+            await asyncio.sleep(0.01)
+            for waiter in waiters:
+                waiter.cancel()
+            await asyncio.gather(*waiters, return_exceptions=True)
+
+        asyncio.run(run())
+        # 只有第一个请求用掉了令牌，被取消的请求不再占用之后的额度
+        self.assertGreater(limiter.reserve('a', '/post/'), 0.9)
+        self.assertLess(limiter.reserve('a', '/post/'), 2.1)
+
+
+class TestRequestRateLimit(unittest.TestCase):
+    def setUp(self):
+        ResponseCache.initialize(0)
+        RateLimiter.initialize(account_rate=20, account_burst=1, uri_limits={})
+
+    def tearDown(self):
+        RateLimiter.initialize()
+
+    def test_requests_are_spaced(self):
+        times = []
+
+        def handler(request: httpx.Request):
+            times.append(time.perf_counter())
+            return httpx.Response(200, json={'status_code': 0})
+
+        request = Request(cookie='test', use_rotating_cookies=False)
+        request.COOKIES = {'msToken': 'token'}
+        request._cookies_loaded = True
+        request.WEBID = '1'
+        with mock.patch.object(Request, 'client', httpx.Client(transport=httpx.MockTransport(handler))):
+            for i in range(5):
+                request.getJSON('/aweme/v1/web/aweme/detail/', {'aweme_id': i})
+
+        self.assertGreaterEqual(times[-1] - times[0], 0.19)
+        self.assertEqual(RateLimiter.get_instance().stats()['delayed'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import httpx
+
+from utils.rate_limiter import RateLimiter
+from utils.request import REFERER_TEMPLATES, Request, register_referer
+from utils.response_cache import ResponseCache
+
+UA = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+
+class TestRequestHeaders(unittest.TestCase):
+    def setUp(self):
+        ResponseCache.initialize(0)
+        RateLimiter.initialize(0)
+
+    def tearDown(self):
+        RateLimiter.initialize()
+
+    def test_base_headers_are_read_only(self):
+        with self.assertRaises(TypeError):
+            Request.HEADERS['referer'] = 'x'
+        with self.assertRaises(TypeError):
+            Request.PARAMS['aid'] = 'x'
+
+    def test_ua_does_not_change_class_values(self):
+        request = Request(cookie='test', UA=UA)
+        self.assertEqual(request.HEADERS['User-Agent'], UA)
+        self.assertEqual(request.PARAMS['browser_version'], '120.0.0.0')
+        self.assertNotEqual(Request.HEADERS['User-Agent'], UA)
+        self.assertEqual(Request.PARAMS['browser_version'], '126.0.0.0')
+        self.assertEqual(Request(cookie='test').HEADERS['User-Agent'], Request.HEADERS['User-Agent'])
+
+    def test_referer_templates(self):
+        self.assertEqual(Request._referer_for('/aweme/v1/web/comment/list/reply/', {'item_id': 7}),
+                         'https://www.douyin.com/video/7')
+        # 缺少参数时与原来的f-string行为一致
+        self.assertEqual(Request._referer_for('/aweme/v1/web/aweme/post/', {}), 'https://www.douyin.com/user/None?')
+        self.assertEqual(Request._referer_for('/aweme/v1/web/mix/list/', {}), 'https://www.douyin.com/user/')
+        self.assertIsNone(Request._referer_for('/aweme/v1/web/test/', {}))
+
+        register_referer('/aweme/v1/web/test/', 'https://www.douyin.com/note/{aweme_id}')
+        try:
+            self.assertEqual(Request._referer_for('/aweme/v1/web/test/', {'aweme_id': '1'}),
+                             'https://www.douyin.com/note/1')
+        finally:
+            REFERER_TEMPLATES.pop('/aweme/v1/web/test/')
+
+    def test_concurrent_requests_use_own_headers(self):
+        def handler(request: httpx.Request):
+            return httpx.Response(200, json={
+                'status_code': 0,
+                'referer': request.headers.get('referer'),
+                'content_type': request.headers.get('content-type'),
+            })
+
+        request = Request(cookie='test', use_rotating_cookies=False)
+        request.COOKIES = {'msToken': 'token'}
+        request._cookies_loaded = True
+        request.WEBID = '1'
+
+        def call(i):
+            if i % 3 == 0:
+                return 'post', request.getJSON('/aweme/v1/web/commit/item/digg/', {'n': i}, data={'type': 1})
+            if i % 3 == 1:
+                return f'https://www.douyin.com/video/{i}', request.getJSON(
+                    '/aweme/v1/web/comment/list/', {'aweme_id': i})
+            return Request.HEADERS['referer'], request.getJSON('/aweme/v1/web/aweme/detail/', {'aweme_id': i})
+
+        with mock.patch.object(Request, 'client', httpx.Client(transport=httpx.MockTransport(handler))):
+            with ThreadPoolExecutor(16) as executor:
+                results = list(executor.map(call, range(90)))
+
+        for expected, result in results:
+            if expected == 'post':
+                self.assertEqual(result['content_type'], 'application/x-www-form-urlencoded')
+            else:
+                self.assertEqual(result['referer'], expected)
+                self.assertNotEqual(result['content_type'], 'application/x-www-form-urlencoded')
+        self.assertNotIn('Content-Type', Request.HEADERS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import base64
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import httpx
+
+from utils.account_manager import AccountManager
+from utils.account_scheduler import AccountLoad
+from utils.async_request import AsyncRequest
+from utils.circuit_breaker import CircuitBreakerRegistry
+from utils.cookies import get_cookie_entry
+from utils.rate_limiter import RateLimiter
+from utils.request import Request
+from utils.request_manager import RequestManager
+from utils.response_cache import ResponseCache
+
+
+def encode(cookie: str) -> str:
+    return base64.b64encode(cookie.encode()).decode()
+
+
+class TestRequestPool(unittest.TestCase):
+    def setUp(self):
+        self.data_path = tempfile.mkdtemp()
+        self.manager = AccountManager.initialize(self.data_path, flush_interval=0)
+        for name in ('a', 'b', 'c'):
+            self.manager.add_account(name, encode(f'sessionid={name}'))
+        RequestManager.clear_instances()
+        # 不写入仓库中的config/cookie.json
+        patcher = mock.patch('utils.cookies.save_cookie')
+        self.save_cookie = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        RequestManager.clear_instances()
+        self.manager.close()
+        shutil.rmtree(self.data_path, ignore_errors=True)
+
+    def test_reuse_keeps_state(self):
+        request = RequestManager.get_account_request('a')
+        request.WEBID = '123'
+        again = RequestManager.get_account_request('a')
+        self.assertIs(again, request)
+        self.assertEqual(again.WEBID, '123')
+        # 同步和异步实例分别缓存
+        self.assertIsInstance(RequestManager.get_account_request('a', AsyncRequest), AsyncRequest)
+        self.assertEqual(RequestManager.pool_size(), 2)
+        self.assertIsNone(RequestManager.get_account_request('missing'))
+
+    def test_rebuild_on_cookie_change(self):
+        request = RequestManager.get_account_request('a')
+        self.manager.update_account('a', cookie='sessionid=new')
+        rebuilt = RequestManager.get_account_request('a')
+        self.assertIsNot(rebuilt, request)
+        self.assertEqual(rebuilt._cookie, 'sessionid=new')
+
+    def test_lru_bound(self):
+        with mock.patch.object(RequestManager, 'max_pool_size', 2):
+            a = RequestManager.get_account_request('a')
+            RequestManager.get_account_request('b')
+            RequestManager.get_account_request('a')
+            RequestManager.get_account_request('c')
+            self.assertEqual(RequestManager.pool_size(), 2)
+            # b最久未使用被淘汰，a仍然保留
+            self.assertIs(RequestManager.get_account_request('a'), a)
+            self.assertNotIn((Request, 'b'), RequestManager._account_pool)
+
+    def test_idle_eviction(self):
+        with mock.patch('utils.request_manager.time.monotonic', return_value=1000.0):
+            a = RequestManager.get_account_request('a')
+        with mock.patch('utils.request_manager.time.monotonic', return_value=1000.0 + RequestManager.idle_timeout):
+            self.assertIsNot(RequestManager.get_account_request('a'), a)
+            self.assertEqual(RequestManager.pool_size(), 1)
+
+    def test_pooled_instance_uses_manager_entry(self):
+        # 原始格式（非base64）的cookie与轮换时一样能解析，也不会写入config目录
+        self.manager.add_account('raw', 'sessionid=raw; ttwid=t')
+        request = RequestManager.get_account_request('raw')
+        self.assertIs(request._instance_entry(), self.manager.peek_cookie_entry('raw'))
+        self.assertEqual(request.COOKIES, {'sessionid': 'raw', 'ttwid': 't'})
+        RequestManager.get_account_request('a', AsyncRequest)._instance_entry()
+        self.save_cookie.assert_not_called()
+
+    def test_proxy_uses_pool(self):
+        from api.request_proxy import get_request_instance, get_request_instance_for_account
+        self.assertIs(get_request_instance_for_account('a'), get_request_instance_for_account('a'))
+        self.assertIs(get_request_instance_for_account('missing'), get_request_instance())
+
+    def test_pooled_instance_uses_account_name(self):
+        AccountLoad._instance = None
+        CircuitBreakerRegistry.initialize()
+        ResponseCache.initialize(0)
+        RateLimiter.initialize(0)
+        self.addCleanup(RateLimiter.initialize)
+        request = RequestManager.get_account_request('a')
+        request.WEBID = '1'
+
+        def handler(r: httpx.Request):
+            return httpx.Response(200, json={'status_code': 0})
+
+        with mock.patch.object(Request, 'client', httpx.Client(transport=httpx.MockTransport(handler))), \
+                mock.patch.object(RateLimiter, 'acquire') as acquire:
+            request.getJSON('/aweme/v1/web/aweme/detail/', {'aweme_id': '1'})
+        # 与轮换选到这个账号时共用限速桶、webid缓存键和健康统计
+        self.assertEqual(acquire.call_args[0][0], 'a')
+        rotating = Request(use_rotating_cookies=True)
+        self.assertEqual(request._webid_key(), rotating._webid_key(get_cookie_entry(name='a')))
+        self.assertEqual(AccountLoad.get_instance().stats()['a']['requests'], 1)
+        self.assertEqual(request.COOKIES, {'sessionid': 'a'})
+        self.save_cookie.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
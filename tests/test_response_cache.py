@@ -0,0 +1,96 @@
+import time
+import unittest
+from unittest import mock
+
+import httpx
+
+from utils.request import Request
+from utils.response_cache import ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_ttl_and_stats(self):
+        cache = ResponseCache(max_size=10, ttls={'/a': 0.05})
+        self.assertEqual(cache.ttl_for('/a'), 0.05)
+        self.assertIsNone(cache.ttl_for('/b'))
+
+        key = cache.make_key('/a', {'y': 2, 'x': 1}, 'acc')
+        self.assertEqual(key, cache.make_key('/a', {'x': '1', 'y': '2'}, 'acc'))
+        self.assertNotEqual(key, cache.make_key('/a', {'x': 1, 'y': 2}, 'other'))
+
+        self.assertIsNone(cache.get(key))
+        cache.set(key, {'status_code': 0}, 0.05)
+        self.assertEqual(cache.get(key), {'status_code': 0})
+        time.sleep(0.06)
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(cache.stats(), {
+            'size': 0, 'maxSize': 10, 'hits': 1, 'misses': 2, 'evictions': 0, 'hitRate': 0.3333
+        })
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(max_size=2)
+        cache.set('a', 1, 60)
+        cache.set('b', 2, 60)
+        cache.get('a')
+        cache.set('c', 3, 60)
+        # b最久未使用，被淘汰
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_returns_copies(self):
+        cache = ResponseCache(max_size=2)
+        cache.set('a', {'list': [1]}, 60)
+        cache.get('a')['list'].append(2)
+        self.assertEqual(cache.get('a'), {'list': [1]})
+
+    def test_disabled(self):
+        cache = ResponseCache(max_size=0)
+        self.assertIsNone(cache.ttl_for('/aweme/v1/web/aweme/detail/'))
+
+
+class TestRequestCache(unittest.TestCase):
+    def setUp(self):
+        ResponseCache.initialize(16)
+        self.calls = []
+        self.client = httpx.Client(transport=httpx.MockTransport(self.handler))
+        self.request = Request(cookie='test', use_rotating_cookies=False)
+        self.request.COOKIES = {'msToken': 'token'}
+        self.request._cookies_loaded = True
+        self.request.WEBID = '1'
+
+    def handler(self, request: httpx.Request):
+        self.calls.append(request)
+        if request.url.params.get('aweme_id') == 'bad':
+            return httpx.Response(200, json={'status_code': 2})
+        return httpx.Response(200, json={'status_code': 0, 'n': len(self.calls)})
+
+    def get(self, uri, params, **kwargs):
+        with mock.patch.object(Request, 'client', self.client):
+            return self.request.getJSON(uri, params, **kwargs)
+
+    def test_cached_get_skips_sign_and_network(self):
+        uri = '/aweme/v1/web/aweme/detail/'
+        first = self.get(uri, {'aweme_id': '1'})
+        with mock.patch.object(Request, 'get_sign') as get_sign:
+            second = self.get(uri, {'aweme_id': '1'})
+            get_sign.assert_not_called()
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.calls), 1)
+
+        self.get(uri, {'aweme_id': '2'})
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(ResponseCache.get_instance().stats()['hits'], 1)
+
+    def test_not_cached(self):
+        # 未配置的接口、POST请求和失败的响应都不缓存
+        for _ in range(2):
+            self.get('/aweme/v1/web/comment/list/', {'aweme_id': '1'})
+            self.get('/aweme/v1/web/aweme/detail/', {'aweme_id': '1'}, data={'a': 1})
+            self.get('/aweme/v1/web/aweme/detail/', {'aweme_id': 'bad'})
+        self.assertEqual(len(self.calls), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
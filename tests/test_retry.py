@@ -0,0 +1,114 @@
+import unittest
+from unittest import mock
+
+import httpx
+
+from utils.rate_limiter import RateLimiter
+from utils.request import Request
+from utils.response_cache import ResponseCache
+from utils.retry import RetryPolicy
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_backoff_is_jittered_and_capped(self):
+        policy = RetryPolicy(max_delay=5)
+        for attempt in range(10):
+            wait = policy.backoff(attempt, 1)
+            self.assertGreaterEqual(wait, 0)
+            self.assertLessEqual(wait, min(5, 2 ** attempt))
+
+    def test_attempt_limit_and_status(self):
+        policy = RetryPolicy()
+        self.assertIsNotNone(policy.next_delay(0, 3, 0.01, 'ConnectError'))
+        self.assertIsNone(policy.next_delay(2, 3, 0.01, 'ConnectError'))
+        self.assertIsNotNone(policy.delay_for_status(0, 3, 0.01, 503))
+        self.assertIsNone(policy.delay_for_status(0, 3, 0.01, 403))
+        self.assertIsNone(policy.delay_for_status(0, 3, 0.01, 200))
+        self.assertEqual(policy.stats()['reasons'], {'ConnectError': 1, '503': 1})
+
+    def test_budget(self):
+        policy = RetryPolicy(budget_ratio=0.5, min_per_second=0, max_budget=2)
+        self.assertIsNotNone(policy.next_delay(0, 3, 0, 500))
+        self.assertIsNotNone(policy.next_delay(0, 3, 0, 500))
+        # 预算用完后不再重试
+        self.assertIsNone(policy.next_delay(0, 3, 0, 500))
+        # 每两个新请求恢复一次重试
+        policy.begin()
+        policy.begin()
+        self.assertIsNotNone(policy.next_delay(0, 3, 0, 500))
+        stats = policy.stats()
+        self.assertEqual((stats['requests'], stats['retries'], stats['exhausted']), (2, 3, 1))
+
+
+class TestRequestRetry(unittest.TestCase):
+    def setUp(self):
+        ResponseCache.initialize(0)
+        RateLimiter.initialize(0)
+        self.policy = RetryPolicy.initialize(budget_ratio=0, min_per_second=0, max_budget=3)
+        self.request = Request(cookie='test', use_rotating_cookies=False)
+        self.request.COOKIES = {'msToken': 'token'}
+        self.request._cookies_loaded = True
+        self.request.WEBID = '1'
+
+    def tearDown(self):
+        RateLimiter.initialize()
+        RetryPolicy.initialize()
+
+    def get(self, handler, **kwargs):
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+        with mock.patch.object(Request, 'client', client):
+            return self.request.getJSON('/aweme/v1/web/aweme/detail/', {}, delay=0.01, **kwargs)
+
+    def test_empty_body_not_retried(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(200, text='')
+
+        self.assertEqual(self.get(handler), {})
+        self.assertEqual(len(calls), 1)
+
+    def test_retryable_status_within_budget(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(503)
+
+        self.assertEqual(self.get(handler), {})
+        self.assertEqual(len(calls), 3)
+        # 预算只剩1次重试
+        calls.clear()
+        self.assertEqual(self.get(handler), {})
+        self.assertEqual(len(calls), 2)
+        stats = self.policy.stats()
+        self.assertEqual((stats['retries'], stats['exhausted']), (3, 1))
+
+    def test_network_error_retried(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                raise httpx.ConnectError('boom')
+            return httpx.Response(200, json={'status_code': 0})
+
+        self.assertEqual(self.get(handler), {'status_code': 0})
+        self.assertEqual(self.policy.stats()['reasons'], {'ConnectError': 1})
+
+    def test_custom_policy(self):
+        self.request.retry_policy = RetryPolicy(retryable_status=frozenset({403}))
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(403)
+
+        self.get(handler, max_retries=2)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.policy.stats()['retries'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from utils.sign_pool import SignWorkerPool, SignError, SignTimeoutError
+
+UA = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
+QUERY = 'device_platform=webapp&aid=6383&channel=channel_pc_web&aweme_id=7457492400135621915'
+
+
+@unittest.skipUnless(shutil.which('node'), 'node is not installed')
+class TestSignWorkerPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = SignWorkerPool(size=2, timeout=5)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_sign(self):
+        a_bogus = self.pool.sign('sign_datail', QUERY, UA)
+        self.assertTrue(a_bogus.endswith('='))
+        self.assertEqual(len(a_bogus), 164)
+        reply = self.pool.sign('sign_reply', QUERY, UA)
+        self.assertEqual(len(reply), 164)
+
+    def test_unknown_function(self):
+        with self.assertRaises(SignError):
+            self.pool.call('not_exists', QUERY)
+        # 出错后进程仍然可用
+        self.assertTrue(self.pool.sign('sign_datail', QUERY, UA))
+
+    def test_restart_crashed_worker(self):
+        for worker in self.pool._workers:
+            worker.proc.kill()
+            worker.proc.wait()
+        self.assertTrue(self.pool.sign('sign_datail', QUERY, UA))
+        self.assertTrue(self.pool.sign('sign_datail', QUERY, UA))
+
+    def test_timeout(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            js_path = os.path.join(tmp, 'hang.js')
+            with open(js_path, 'w', encoding='utf-8') as f:
+                f.write('function hang() { while (true) {} }\nfunction ok() { return "ok"; }\n')
+            pool = SignWorkerPool(size=1, timeout=0.5, js_path=js_path)
+            try:
+                start = time.time()
+                with self.assertRaises(SignTimeoutError):
+                    pool.call('hang')
+                self.assertLess(time.time() - start, 3)
+                # 卡住的进程会被重启
+                self.assertEqual(pool.call('ok'), 'ok')
+            finally:
+                pool.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from utils.request import Request
+
+UA = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+
+def make_request(cookies: dict, UA='') -> Request:
+    request = Request(cookie='test', UA=UA, use_rotating_cookies=False)
+    request.COOKIES = cookies
+    request._cookies_loaded = True
+    return request
+
+
+class TestSignQuery(unittest.TestCase):
+    def assert_same_query(self, request: Request, params: dict):
+        signed, query = request._apply_and_encode(dict(params), '7362810250930783783')
+        self.assertEqual(query, request._encode_query(signed))
+        self.assertEqual(list(signed)[:len(params)], list(params))
+
+    def test_matches_full_encoding(self):
+        cases = [
+            {},
+            {'aweme_id': '1', 'cursor': 0, 'keyword': '中文 &='},
+            # 覆盖公共参数时退回完整编码
+            {'aweme_id': '1', 'screen_width': 100},
+            {'msToken': 'x'},
+        ]
+        requests = [
+            make_request({'msToken': 'token', 's_v_web_id': 'verify', 'dy_swidth': '1920'}),
+            make_request({'s_v_web_id': 'verify'}, UA=UA),
+            make_request({}),
+        ]
+        for request in requests:
+            for params in cases:
+                self.assert_same_query(request, params)
+
+    def test_segments_follow_cookies(self):
+        request = make_request({'s_v_web_id': 'a'})
+        self.assertIn('verifyFp=a', request._apply_and_encode({}, '1')[1])
+        # 更换cookie(例如轮换账号)后使用新的设备参数
+        request.COOKIES = {'s_v_web_id': 'b', 'dy_swidth': '1280'}
+        query = request._apply_and_encode({}, '1')[1]
+        self.assertIn('verifyFp=b', query)
+        self.assertIn('screen_width=1280', query)
+
+        # 相同UA和设备参数的实例共用编码结果
+        other = make_request({'s_v_web_id': 'b', 'dy_swidth': '1280'})
+        self.assertIs(other._query_segments(other._instance_entry()),
+                      request._query_segments(request._instance_entry()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest import mock
+
+import httpx
+
+from utils.async_request import AsyncRequest
+from utils.request import Request
+from utils.response_cache import ResponseCache
+from utils.single_flight import SingleFlight, AsyncSingleFlight
+
+URI = '/aweme/v1/web/comment/list/'
+
+
+def make_request(cls):
+    req = cls(cookie='test', use_rotating_cookies=False)
+    req.COOKIES = {'msToken': 'token'}
+    req._cookies_loaded = True
+    req.WEBID = '1'
+    return req
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_coalesce(self):
+        flight = SingleFlight()
+        calls = []
+        results = []
+
+        def slow(value):
+            calls.append(value)
+            time.sleep(0.2)
+            return {'value': value}
+
+        def worker():
+            results.append(flight.do('key', slow, 1))
+
+        threads = [threading.Thread(target=worker) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result == ({'value': 1}, True) for result in results))
+        self.assertEqual(flight.stats(), {'inFlight': 0, 'executed': 1, 'shared': 9})
+
+        # 调用结束后再次调用会重新执行
+        self.assertEqual(flight.do('key', slow, 2), ({'value': 2}, False))
+
+    def test_error(self):
+        flight = SingleFlight()
+
+        def fail():
+            raise ValueError('boom')
+
+        with self.assertRaises(ValueError):
+            flight.do('key', fail)
+        self.assertEqual(flight.stats()['inFlight'], 0)
+
+    def test_request_get_json(self):
+        ResponseCache.initialize(0)
+        calls = []
+
+        def handler(request: httpx.Request):
+            calls.append(request)
+            time.sleep(0.2)
+            return httpx.Response(200, json={'status_code': 0, 'comments': []})
+
+        req = make_request(Request)
+        results = []
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+        with mock.patch.object(Request, 'client', client):
+            threads = [threading.Thread(target=lambda: results.append(req.getJSON(URI, {'aweme_id': '1'})))
+                       for _ in range(10)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 10)
+        # 共享的结果每个调用方各自一份
+        self.assertEqual(len({id(result) for result in results}), 10)
+
+
+class TestAsyncSingleFlight(unittest.IsolatedAsyncioTestCase):
+    async def asyncTearDown(self):
+        await AsyncRequest.close_client()
+
+    async def test_cancel_one_waiter(self):
+        flight = AsyncSingleFlight()
+
+        async def slow():
+            await asyncio.sleep(0.1)
+            return 1
+
+        first = asyncio.ensure_future(flight.do('key', slow))
+        second = asyncio.ensure_future(flight.do('key', slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        self.assertEqual(await second, (1, True))
+        self.assertEqual(flight.stats(), {'inFlight': 0, 'executed': 1, 'shared': 1, 'cancelled': 0})
+
+    async def test_cancel_all_waiters(self):
+        flight = AsyncSingleFlight()
+        finished = []
+
+        async def slow():
+            await asyncio.sleep(0.1)
+            finished.append(1)
+            return 1
+
+        waiters = [asyncio.ensure_future(flight.do('key', slow)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        # 没有等待者后实际请求也被取消，相同key的新调用重新执行
+        self.assertEqual(await flight.do('key', slow), (1, False))
+        await asyncio.sleep(0.15)
+        self.assertEqual(finished, [1])
+        self.assertEqual(flight.stats(), {'inFlight': 0, 'executed': 2, 'shared': 1, 'cancelled': 1})
+
+    async def test_async_get_json(self):
+        ResponseCache.initialize(0)
+        calls = []
+
+        async def handler(request: httpx.Request):
+            calls.append(request)
+            await asyncio.sleep(0.2)
+            return httpx.Response(200, json={'status_code': 0, 'aweme_id': request.url.params['aweme_id']})
+
+        AsyncRequest._clients[asyncio.get_running_loop()] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        req = make_request(AsyncRequest)
+        results = await asyncio.gather(*[req.getJSON(URI, {'aweme_id': str(i % 2)}) for i in range(50)])
+
+        # 两组不同的参数各请求一次
+        self.assertEqual(len(calls), 2)
+        self.assertEqual([result['aweme_id'] for result in results], [str(i % 2) for i in range(50)])
+
+
+if __name__ == '__main__':
+    unittest.main()
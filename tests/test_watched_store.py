@@ -0,0 +1,69 @@
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from utils.watched_store import WatchedStore
+
+
+class TestWatchedStore(unittest.TestCase):
+    def setUp(self):
+        self.data_path = tempfile.mkdtemp()
+        self.store = WatchedStore(self.data_path)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.data_path, ignore_errors=True)
+
+    def test_mark_and_filter(self):
+        self.store.mark_watched('a', '1')
+        self.store.mark_many_watched('a', ['2', '3'])
+        self.store.mark_watched('b', '4')
+
+        self.assertTrue(self.store.is_watched('a', '1'))
+        self.assertFalse(self.store.is_watched('b', '1'))
+        self.assertEqual(self.store.get_watched_ids('a', ['1', '3', '4', '5']), {'1', '3'})
+
+        aweme_list = [{'aweme_id': str(i)} for i in range(1, 7)]
+        unwatched = self.store.filter_unwatched('a', aweme_list)
+        self.assertEqual([aweme['aweme_id'] for aweme in unwatched], ['4', '5', '6'])
+
+        self.assertEqual(self.store.count('a'), 3)
+        self.assertEqual(self.store.count(), 4)
+
+    def test_default_account_and_remark(self):
+        first = self.store.mark_watched(None, '1', watched_time=1000)
+        second = self.store.mark_watched(None, '1', watched_time=2000)
+        self.assertEqual((first, second), (1000, 2000))
+        self.assertEqual(self.store.count(''), 1)
+        self.assertEqual(self.store.get_watched_ids(None, ['1']), {'1'})
+
+    def test_large_batch(self):
+        video_ids = [str(i) for i in range(20000)]
+        start = time.perf_counter()
+        self.store.mark_many_watched('a', video_ids)
+        write_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        watched = self.store.get_watched_ids('a', [str(i) for i in range(19900, 20100)])
+        read_time = time.perf_counter() - start
+
+        self.assertEqual(len(watched), 100)
+        print(f'\n写入20000条 {write_time * 1000:.1f}ms, 查询200条 {read_time * 1000:.2f}ms')
+
+    def test_threads(self):
+        def worker(n):
+            self.store.mark_many_watched('a', [f'{n}-{i}' for i in range(100)])
+            self.store.get_watched_ids('a', [f'{n}-{i}' for i in range(100)])
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.store.count('a'), 800)
+
+
+if __name__ == '__main__':
+    unittest.main()
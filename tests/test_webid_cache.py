@@ -0,0 +1,114 @@
+import base64
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import httpx
+
+from utils.account_manager import AccountManager
+from utils.cookies import get_cookie_entry
+from utils.request import Request
+from utils.webid_cache import WebidCache
+
+HOMEPAGE = 'xx\\"user_unique_id\\":\\"7362810250930783783\\"xx'
+
+
+class TestWebidCache(unittest.TestCase):
+    def setUp(self):
+        self.data_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_path, ignore_errors=True)
+
+    def wait_refreshed(self, cache, key, timeout=2):
+        deadline = time.time() + timeout
+        while key in cache._pending and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_miss_returns_random_and_refreshes(self):
+        cache = WebidCache(self.data_path, ttl=100)
+        fetched = threading.Event()
+
+        def fetcher():
+            fetched.wait(2)
+            return '123'
+
+        webid, stale = cache.lookup('a')
+        self.assertTrue(stale)
+        cache.refresh('a', fetcher)
+        # 抓取完成前返回同一个随机webid，不再重复刷新
+        self.assertEqual(cache.lookup('a'), (webid, False))
+        fetched.set()
+        self.wait_refreshed(cache, 'a')
+        self.assertEqual(cache.lookup('a'), ('123', False))
+
+        # 重启后从文件中读取
+        self.assertEqual(WebidCache(self.data_path, ttl=100).lookup('a'), ('123', False))
+
+    def test_refresh_before_expire(self):
+        cache = WebidCache(self.data_path, ttl=100)
+        cache.finish('a', '123')
+        with mock.patch('utils.webid_cache.time.time', return_value=time.time() + 81):
+            self.assertEqual(cache.lookup('a'), ('123', True))
+
+    def test_failed_fetch_retries_later(self):
+        cache = WebidCache(ttl=100, retry_interval=60)
+        webid, _ = cache.lookup('a')
+        cache.refresh('a', lambda: '')
+        self.wait_refreshed(cache, 'a')
+        self.assertEqual(cache.lookup('a'), (webid, False))
+        with mock.patch('utils.webid_cache.time.time', return_value=time.time() + 61):
+            self.assertTrue(cache.lookup('a')[1])
+
+    def test_request_does_not_block(self):
+        WebidCache.initialize(self.data_path)
+        request = Request(cookie='test', use_rotating_cookies=False)
+        request._cookies_loaded = True
+        released = threading.Event()
+
+        def get_html(*args, **kwargs):
+            released.wait(2)
+            return HOMEPAGE
+
+        with mock.patch.object(Request, 'getHTML', side_effect=get_html):
+            start = time.time()
+            first = request.get_webid()
+            self.assertLess(time.time() - start, 0.5)
+            self.assertNotEqual(first, '7362810250930783783')
+            released.set()
+            cache = WebidCache.get_instance()
+            self.wait_refreshed(cache, request._webid_key())
+        self.assertEqual(request.get_webid(), '7362810250930783783')
+        # 同一账号和UA的其他实例共用缓存
+        self.assertEqual(Request(cookie='test').get_webid(), '7362810250930783783')
+        self.assertNotEqual(Request(cookie='other')._webid_key(), request._webid_key())
+
+    def test_rotating_refresh_uses_account_cookie(self):
+        WebidCache.initialize(self.data_path)
+        manager = AccountManager.initialize(self.data_path, flush_interval=0)
+        self.addCleanup(manager.close)
+        for name, uid in (('a', '111'), ('b', '222')):
+            manager.add_account(name, base64.b64encode(f'ttwid={uid}'.encode()).decode())
+
+        def handler(request: httpx.Request):
+            uid = request.headers['cookie'].split('=')[1]
+            return httpx.Response(200, text=f'xx\\"user_unique_id\\":\\"{uid}\\"xx')
+
+        request = Request(use_rotating_cookies=True)
+        cache = WebidCache.get_instance()
+        entries = {name: get_cookie_entry(name=name) for name in ('a', 'b')}
+        with mock.patch.object(Request, 'client', httpx.Client(transport=httpx.MockTransport(handler))):
+            # b最近使用过，轮换时会选到a
+            for name in ('b', 'a'):
+                request.get_webid(entries[name])
+                self.wait_refreshed(cache, request._webid_key(entries[name]))
+        # 每个账号的webid都用自己的cookie抓取
+        self.assertEqual({name: request.get_webid(entry) for name, entry in entries.items()},
+                         {'a': '111', 'b': '222'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,350 @@
+"""
+a_bogus签名的纯Python实现
+与 lib/douyin.js 中的 sign_datail / sign_reply 逐字节一致，不需要node运行时
+字符串按js的方式处理：每个字符对应一个字符编码，rc4的输出可能包含大于255的编码
+"""
+
+import functools
+import hashlib
+import os
+import random
+import struct
+import time
+
+ALPHABETS = {
+    's0': 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=',
+    's1': 'Dkdpgh4ZKsQB80/Mfvw36XI1R25+WUAlEi7NLboqYTOPuzmFjJnryx9HVGcaStCe=',
+    's2': 'Dkdpgh4ZKsQB80/Mfvw36XI1R25-WUAlEi7NLboqYTOPuzmFjJnryx9HVGcaStCe=',
+    's3': 'ckdp1h4ZKsUB80/Mfvw36XIgR25+WQAlEi7NLboqYTOPuzmFjJnryx9HVGDaStCe',
+    's4': 'Dkdpgh2ZmsQB80/MfvV36XI1R45-WUAlEixNLwoqYTOPuzKFjJnry79HbGcaStCe',
+}
+WINDOW_ENV_STR = '1536|747|1536|834|0|30|0|0|1536|834|1536|864|1525|747|24|24|Win32'
+ARGUMENTS_DETAIL = (0, 1, 14)
+ARGUMENTS_REPLY = (0, 1, 8)
+PAGE_ID = 6241
+AID = 6383
+
+_MASK = 0xFFFFFFFF
+
+
+@functools.lru_cache(maxsize=64)
+def _rc4_key_schedule(key: str) -> tuple:
+    """rc4的密钥调度只和key有关，缓存后每次加密只需复制一份S盒"""
+    s = list(range(256))
+    j = 0
+    key_codes = [ord(c) for c in key]
+    key_length = len(key_codes)
+    for i in range(256):
+        j = (j + s[i] + key_codes[i % key_length]) % 256
+        s[i], s[j] = s[j], s[i]
+    return tuple(s)
+
+
+def rc4_encrypt(plaintext: str, key: str) -> str:
+    s = list(_rc4_key_schedule(key))
+    i = j = 0
+    cipher = []
+    for char in plaintext:
+        i = (i + 1) % 256
+        j = (j + s[i]) % 256
+        s[i], s[j] = s[j], s[i]
+        cipher.append(chr(s[(s[i] + s[j]) % 256] ^ ord(char)))
+    return ''.join(cipher)
+
+
+def _rotl(x: int, n: int) -> int:
+    n %= 32
+    return ((x << n) | (x >> (32 - n))) & _MASK
+
+
+_IV = (0x7380166F, 0x4914B2B9, 0x172442D7, 0xDA8A0600, 0xA96F30BC, 0x163138AA, 0xE38DEE4D, 0xB0FB0E4E)
+_T = tuple(_rotl(0x79CC4519 if j < 16 else 0x7A879D8A, j) for j in range(64))
+
+
+class SM3:
+    """SM3的纯Python实现，接口与hashlib对象一致（update / digest / copy）"""
+
+    def __init__(self, data: bytes = b''):
+        self._reg = list(_IV)
+        self._chunk = b''
+        self._size = 0
+        if data:
+            self.update(data)
+
+    def update(self, data: bytes):
+        self._size += len(data)
+        chunk = self._chunk + data
+        offset = 0
+        while len(chunk) - offset >= 64:
+            self._compress(chunk[offset:offset + 64])
+            offset += 64
+        self._chunk = chunk[offset:]
+
+    def copy(self) -> 'SM3':
+        other = SM3.__new__(SM3)
+        other._reg = list(self._reg)
+        other._chunk = self._chunk
+        other._size = self._size
+        return other
+
+    def digest(self) -> bytes:
+        other = self.copy()
+        length = other._size * 8
+        padding = b'\x80' + b'\x00' * ((55 - other._size) % 64) + struct.pack('>Q', length)
+        other.update(padding)
+        return struct.pack('>8I', *other._reg)
+
+    def _compress(self, block: bytes):
+        w = list(struct.unpack('>16I', block))
+        for j in range(16, 68):
+            x = w[j - 16] ^ w[j - 9] ^ _rotl(w[j - 3], 15)
+            w.append(x ^ _rotl(x, 15) ^ _rotl(x, 23) ^ _rotl(w[j - 13], 7) ^ w[j - 6])
+        w1 = [w[j] ^ w[j + 4] for j in range(64)]
+
+        a, b, c, d, e, f, g, h = self._reg
+        for j in range(64):
+            a12 = _rotl(a, 12)
+            ss1 = _rotl((a12 + e + _T[j]) & _MASK, 7)
+            ss2 = ss1 ^ a12
+            if j < 16:
+                ff = a ^ b ^ c
+                gg = e ^ f ^ g
+            else:
+                ff = (a & b) | (a & c) | (b & c)
+                gg = (e & f) | (~e & _MASK & g)
+            tt1 = (ff + d + ss2 + w1[j]) & _MASK
+            tt2 = (gg + h + ss1 + w[j]) & _MASK
+            d, c, b, a = c, _rotl(b, 9), a, tt1
+            h, g, f, e = g, _rotl(f, 19), e, tt2 ^ _rotl(tt2, 9) ^ _rotl(tt2, 17)
+
+        self._reg = [x ^ y for x, y in zip(self._reg, (a, b, c, d, e, f, g, h))]
+
+
+def new_sm3(data: bytes = b''):
+    """优先使用OpenSSL提供的sm3，不可用时退回纯Python实现"""
+    try:
+        return hashlib.new('sm3', data)
+    except ValueError:
+        return SM3(data)
+
+
+def _to_bytes(data) -> bytes:
+    # js的SM3.write对字符串先做UTF-8编码，对数组直接取字节
+    if isinstance(data, str):
+        return data.encode('utf-8')
+    return bytes(data)
+
+
+def sm3_sum(data) -> list:
+    """对应js中的 new SM3().sum(data)，返回32个字节的列表"""
+    return list(new_sm3(_to_bytes(data)).digest())
+
+
+def result_encrypt(long_str: str, num: str) -> str:
+    table = ALPHABETS[num]
+    codes = [ord(c) for c in long_str]
+    # js越界的charCodeAt为NaN，参与位运算后为0
+    codes += [0, 0]
+    result = []
+    for i in range((len(long_str) * 4 + 2) // 3):
+        r = i // 4 * 3
+        long_int = (codes[r] << 16) | (codes[r + 1] << 8) | codes[r + 2]
+        key = i % 4
+        if key == 0:
+            result.append(table[(long_int & 16515072) >> 18])
+        elif key == 1:
+            result.append(table[(long_int & 258048) >> 12])
+        elif key == 2:
+            result.append(table[(long_int & 4032) >> 6])
+        else:
+            result.append(table[long_int & 63])
+    return ''.join(result)
+
+
+def gener_random(random_value: float, option) -> list:
+    r = int(random_value)
+    return [
+        (r & 255 & 170) | option[0] & 85,
+        (r & 255 & 85) | option[0] & 170,
+        (r >> 8 & 255 & 170) | option[1] & 85,
+        (r >> 8 & 255 & 85) | option[1] & 170,
+    ]
+
+
+def generate_random_str(randoms=None) -> str:
+    """randoms为3个[0, 1)之间的随机数，对应js中的三次Math.random()"""
+    if randoms is None:
+        randoms = [random.random() for _ in range(3)]
+    random_str_list = []
+    random_str_list += gener_random(randoms[0] * 10000, [3, 45])
+    random_str_list += gener_random(randoms[1] * 10000, [1, 0])
+    random_str_list += gener_random(randoms[2] * 10000, [1, 5])
+    return ''.join(map(chr, random_str_list))
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def ua_key(arguments) -> str:
+    """对UA做rc4时使用的key，对应js中的 String.fromCharCode(0.00390625, 1, Arguments[2])"""
+    return chr(0) + chr(1) + chr(arguments[2] & 0xFFFF)
+
+
+@functools.lru_cache(maxsize=256)
+def _ua_hash(user_agent: str, key: str) -> tuple:
+    return tuple(sm3_sum(result_encrypt(rc4_encrypt(user_agent, key), 's3')))
+
+
+def ua_hash(user_agent: str, arguments) -> list:
+    """UA部分的哈希只和UA以及Arguments[2]有关，按(UA, key)缓存"""
+    return list(_ua_hash(user_agent, ua_key(arguments)))
+
+
+@functools.lru_cache(maxsize=16)
+def _suffix_hash(suffix: str) -> tuple:
+    return tuple(sm3_sum(sm3_sum(suffix)))
+
+
+def build_bb(url_search_params_list: list, cus: list, ua: list, window_env_str: str,
+             arguments, start_time: int, end_time: int) -> str:
+    """按js中b对象的规则拼出待rc4加密的字符串"""
+    b = {8: 3, 10: end_time, 16: start_time, 18: 44}
+
+    b[20] = (b[16] >> 24) & 255
+    b[21] = (b[16] >> 16) & 255
+    b[22] = (b[16] >> 8) & 255
+    b[23] = b[16] & 255
+    b[24] = int(b[16] / 4294967296)
+    b[25] = int(b[16] / 1099511627776)
+
+    b[26] = (arguments[0] >> 24) & 255
+    b[27] = (arguments[0] >> 16) & 255
+    b[28] = (arguments[0] >> 8) & 255
+    b[29] = arguments[0] & 255
+
+    b[30] = int(arguments[1] / 256) & 255
+    b[31] = (arguments[1] % 256) & 255
+    b[32] = (arguments[1] >> 24) & 255
+    b[33] = (arguments[1] >> 16) & 255
+
+    b[34] = (arguments[2] >> 24) & 255
+    b[35] = (arguments[2] >> 16) & 255
+    b[36] = (arguments[2] >> 8) & 255
+    b[37] = arguments[2] & 255
+
+    b[38] = url_search_params_list[21]
+    b[39] = url_search_params_list[22]
+    b[40] = cus[21]
+    b[41] = cus[22]
+    b[42] = ua[23]
+    b[43] = ua[24]
+
+    b[44] = (b[10] >> 24) & 255
+    b[45] = (b[10] >> 16) & 255
+    b[46] = (b[10] >> 8) & 255
+    b[47] = b[10] & 255
+    b[48] = b[8]
+    b[49] = int(b[10] / 4294967296)
+    b[50] = int(b[10] / 1099511627776)
+
+    b[51] = PAGE_ID
+    b[52] = (PAGE_ID >> 24) & 255
+    b[53] = (PAGE_ID >> 16) & 255
+    b[54] = (PAGE_ID >> 8) & 255
+    b[55] = PAGE_ID & 255
+
+    b[56] = AID
+    b[57] = AID & 255
+    b[58] = (AID >> 8) & 255
+    b[59] = (AID >> 16) & 255
+    b[60] = (AID >> 24) & 255
+
+    window_env_list = [ord(c) for c in window_env_str]
+    b[64] = len(window_env_list)
+    b[65] = b[64] & 255
+    b[66] = (b[64] >> 8) & 255
+
+    b[69] = 0
+    b[70] = b[69] & 255
+    b[71] = (b[69] >> 8) & 255
+
+    b[72] = 0
+    for index in (18, 20, 26, 30, 38, 40, 42, 21, 27, 31, 35, 39, 41, 43, 22, 28, 32, 36, 23, 29, 33, 37,
+                  44, 45, 46, 47, 48, 49, 50, 24, 25, 52, 53, 54, 55, 57, 58, 59, 60, 65, 66, 70, 71):
+        b[72] ^= b[index]
+
+    bb = [b[index] for index in (
+        18, 20, 52, 26, 30, 34, 58, 38, 40, 53, 42, 21, 27, 54, 55, 31,
+        35, 57, 39, 41, 43, 22, 28, 32, 60, 36, 23, 29, 33, 37, 44, 45,
+        59, 46, 47, 48, 49, 50, 24, 25, 65, 66, 70, 71)]
+    bb += window_env_list
+    bb.append(b[72])
+    return rc4_encrypt(''.join(map(chr, bb)), chr(121))
+
+
+def generate_rc4_bb_str(url_search_params: str, user_agent: str, window_env_str: str, suffix: str = 'cus',
+                        arguments=ARGUMENTS_DETAIL, timestamps=None) -> str:
+    """timestamps为(开始时间, 结束时间)的毫秒时间戳，对应js中的两次Date.now()"""
+    start_time = timestamps[0] if timestamps else _now_ms()
+    url_search_params_list = sm3_sum(sm3_sum(url_search_params + suffix))
+    cus = _suffix_hash(suffix)
+    ua = ua_hash(user_agent, arguments)
+    end_time = timestamps[1] if timestamps else _now_ms()
+    return build_bb(url_search_params_list, cus, ua, window_env_str, arguments, start_time, end_time)
+
+
+def sign(url_search_params: str, user_agent: str, arguments, randoms=None, timestamps=None) -> str:
+    result_str = generate_random_str(randoms) + generate_rc4_bb_str(
+        url_search_params,
+        user_agent,
+        WINDOW_ENV_STR,
+        'cus',
+        arguments,
+        timestamps,
+    )
+    return result_encrypt(result_str, 's4') + '='
+
+
+def sign_datail(params: str, user_agent: str, randoms=None, timestamps=None) -> str:
+    return sign(params, user_agent, ARGUMENTS_DETAIL, randoms, timestamps)
+
+
+def sign_reply(params: str, user_agent: str, randoms=None, timestamps=None) -> str:
+    return sign(params, user_agent, ARGUMENTS_REPLY, randoms, timestamps)
+
+
+def sign_many(queries: list, user_agent: str, arguments=ARGUMENTS_DETAIL, randoms=None, timestamps=None) -> list:
+    """批量签名
+
+    同一批次共用UA与后缀的哈希、rc4的密钥调度以及开始/结束时间，
+    并把所有query公共前缀中完整的64字节分组只压缩一次，之后每个query从该中间状态继续计算。
+
+    Args:
+        queries: 待签名的query字符串列表
+        randoms: 与queries等长的列表，每项为3个随机数，用于测试
+        timestamps: 整个批次共用的(开始时间, 结束时间)
+    """
+    if not queries:
+        return []
+    start_time = timestamps[0] if timestamps else _now_ms()
+    cus = _suffix_hash('cus')
+    ua = ua_hash(user_agent, arguments)
+
+    encoded = [query.encode('utf-8') for query in queries]
+    prefix_length = len(os.path.commonprefix(encoded)) // 64 * 64
+    base = new_sm3(encoded[0][:prefix_length])
+    first_hashes = []
+    for data in encoded:
+        h = base.copy()
+        h.update(data[prefix_length:] + b'cus')
+        first_hashes.append(h.digest())
+    end_time = timestamps[1] if timestamps else _now_ms()
+
+    result = []
+    for index, first_hash in enumerate(first_hashes):
+        url_search_params_list = sm3_sum(first_hash)
+        bb_str = build_bb(url_search_params_list, cus, ua, WINDOW_ENV_STR, arguments, start_time, end_time)
+        random_str = generate_random_str(randoms[index] if randoms else None)
+        result.append(result_encrypt(random_str + bb_str, 's4') + '=')
+    return result
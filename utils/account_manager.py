@@ -1,36 +1,69 @@
 import os
 import time
+import atexit
 import base64
+import heapq
+import itertools
+import threading
 import ujson as json
 from typing import Dict, List, Optional
 from loguru import logger
 from utils.util import save_json
+from utils.cookies import cookie_params
+from utils.account_scheduler import AccountLoad, create_scheduler
+from utils.circuit_breaker import CircuitBreakerRegistry
 
 
 class AccountManager:
-    """账号管理器，管理多个douyin账号的cookies"""
+    """账号管理器，管理多个douyin账号的cookies
+
+    账号数据常驻内存。增删改账号时立即写入文件；
+    每次取用账号只更新内存中的lastUsed，由后台线程定期批量写入，退出时再写入一次
+    """
     
     _instance = None
     _data_path = None
+    _flush_interval = None
+    _scheduler = None
     
-    def __init__(self, data_path: str = 'data'):
+    def __init__(self, data_path: str = 'data', flush_interval: float = None, scheduler: str = None):
+        """
+        Args:
+            data_path: 数据目录
+            flush_interval: lastUsed写入文件的间隔（秒），默认读取环境变量 DOUYIN_ACCOUNT_FLUSH_INTERVAL，否则为5
+            scheduler: 自动选择账号的调度策略，见utils.account_scheduler，默认读取环境变量 DOUYIN_ACCOUNT_SCHEDULER，否则为lru
+        """
         self.data_path = data_path
         self.cookies_file = os.path.join(data_path, 'cookies.json')
+        if flush_interval is None:
+            flush_interval = float(os.environ.get('DOUYIN_ACCOUNT_FLUSH_INTERVAL', 5))
+        self.flush_interval = flush_interval
+        self.scheduler_name = scheduler or os.environ.get('DOUYIN_ACCOUNT_SCHEDULER', 'lru')
+        self.scheduler = create_scheduler(self.scheduler_name)
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._stop_event = threading.Event()
         self._ensure_data_dir()
         self._load_cookies()
+        self._start_flusher()
     
     @classmethod
-    def initialize(cls, data_path: str = 'data'):
+    def initialize(cls, data_path: str = 'data', flush_interval: float = None, scheduler: str = None):
         """初始化单例实例"""
-        cls._instance = cls(data_path)
+        if cls._instance is not None:
+            cls._instance.close()
+        cls._instance = cls(data_path, flush_interval, scheduler)
         cls._data_path = data_path
+        cls._flush_interval = flush_interval
+        cls._scheduler = scheduler
         return cls._instance
     
     @classmethod
     def get_instance(cls) -> 'AccountManager':
         """获取单例实例"""
         if cls._instance is None:
-            cls._instance = cls(cls._data_path or 'data')
+            cls._instance = cls(cls._data_path or 'data', cls._flush_interval, cls._scheduler)
         return cls._instance
     
     def _ensure_data_dir(self):
@@ -51,14 +84,110 @@ class AccountManager:
             self.accounts = []
             self._save_cookies()
             logger.info("未找到cookies文件，创建空的账号列表")
+        self._rebuild_index()
+        # 上次检查未通过的账号重启后继续暂停使用，由熔断器的后台检查恢复
+        breakers = CircuitBreakerRegistry.get_instance()
+        for account in self.accounts:
+            if account.get('valid') is False:
+                breakers.trip(account['name'])
+    
+    def _rebuild_index(self):
+        """重建账号名索引和按lastUsed排序的堆
+
+        堆中的元素为 [lastUsed, 序号, 账号名]，账号每次使用后压入新元素，
+        旧元素通过序号判断是否过期，在弹出时跳过（延迟删除）
+        """
+        with self._lock:
+            self._by_name = {account['name']: account for account in self.accounts}
+            self._entries = {}  # 账号名 -> 解析好的cookie条目
+            self._counter = itertools.count()
+            self._heap_seq = {}
+            self._heap = []
+            for account in self._by_name.values():
+                seq = next(self._counter)
+                self._heap_seq[account['name']] = seq
+                self._heap.append([account['lastUsed'], seq, account['name']])
+            heapq.heapify(self._heap)
+    
+    def _push(self, account: Dict):
+        """为账号压入新的堆元素，之前的元素随之过期"""
+        seq = next(self._counter)
+        self._heap_seq[account['name']] = seq
+        heapq.heappush(self._heap, [account['lastUsed'], seq, account['name']])
+        # 过期元素太多时重建，避免按名称频繁使用的账号让堆无限增长
+        if len(self._heap) > 2 * len(self._by_name) + 64:
+            self._heap = [[a['lastUsed'], self._heap_seq[a['name']], a['name']] for a in self._by_name.values()]
+            heapq.heapify(self._heap)
+    
+    def _pop_least_recently_used(self) -> Optional[Dict]:
+        """取出lastUsed最小的账号，调用方负责更新使用时间并重新压入"""
+        while self._heap:
+            _, seq, name = heapq.heappop(self._heap)
+            if self._heap_seq.get(name) == seq:
+                return self._by_name[name]
+        return None
+    
+    def _pop_available(self) -> Optional[Dict]:
+        """取出lastUsed最小且未被熔断的账号，所有账号都被熔断时仍返回lastUsed最小的账号"""
+        breakers = CircuitBreakerRegistry.get_instance()
+        skipped = []
+        account = self._pop_least_recently_used()
+        while account is not None and not breakers.is_available(account['name']):
+            skipped.append(account)
+            account = self._pop_least_recently_used()
+        if account is None and skipped:
+            account = skipped.pop(0)
+        # 跳过的账号按原来的使用时间放回
+        for skipped_account in skipped:
+            self._push(skipped_account)
+        return account
+    
+    def _touch(self, account: Dict):
+        """更新账号的使用时间，只修改内存，由后台线程批量写入文件"""
+        account['lastUsed'] = int(time.time())
+        self._push(account)
+        self._dirty = True
     
     def _save_cookies(self):
-        """保存cookies数据到文件"""
-        try:
-            with open(self.cookies_file, 'w', encoding='utf-8') as f:
-                json.dump(self.accounts, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logger.error(f"保存cookies文件失败: {e}")
+        """保存cookies数据到文件
+
+        先写入临时文件再原子替换，写入过程中崩溃不会留下不完整的cookies.json
+        """
+        with self._save_lock:
+            with self._lock:
+                content = json.dumps(self.accounts, ensure_ascii=False, indent=2)
+                self._dirty = False
+            tmp_file = f'{self.cookies_file}.{os.getpid()}.tmp'
+            try:
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                os.replace(tmp_file, self.cookies_file)
+            except Exception as e:
+                self._dirty = True
+                logger.error(f"保存cookies文件失败: {e}")
+    
+    def _start_flusher(self):
+        """启动后台写入线程，并在退出时写入剩余的修改"""
+        if self.flush_interval > 0:
+            thread = threading.Thread(target=self._flush_loop, name='account-flusher', daemon=True)
+            thread.start()
+        atexit.register(self.flush)
+    
+    def _flush_loop(self):
+        while not self._stop_event.wait(self.flush_interval):
+            self.flush()
+    
+    def flush(self):
+        """把内存中未写入的修改写入文件"""
+        # 数据目录已被删除时不再写入（例如测试结束后清理了目录）
+        if self._dirty and os.path.isdir(self.data_path):
+            self._save_cookies()
+    
+    def close(self):
+        """停止后台写入线程并写入剩余的修改"""
+        self._stop_event.set()
+        atexit.unregister(self.flush)
+        self.flush()
     
     def add_account(self, name: str, cookie: str, description: str = '') -> bool:
         """添加新账号"""
@@ -76,7 +205,10 @@ class AccountManager:
             'updateTime': int(time.time())
         }
         
-        self.accounts.append(account)
+        with self._lock:
+            self.accounts.append(account)
+            self._by_name[name] = account
+            self._push(account)
         self._save_cookies()
         logger.success(f"添加账号 '{name}' 成功")
         return True
@@ -90,6 +222,13 @@ class AccountManager:
         
         if cookie is not None:
             account['cookie'] = cookie
+            self._entries.pop(name, None)
+            # 更换cookie后重新统计
+            CircuitBreakerRegistry.get_instance().reset(name)
+            AccountLoad.get_instance().reset(name)
+            # 新的cookie尚未检查
+            for key in ('valid', 'lastValidated', 'validateLatency'):
+                account.pop(key, None)
         if description is not None:
             account['description'] = description
         
@@ -100,22 +239,25 @@ class AccountManager:
     
     def delete_account(self, name: str) -> bool:
         """删除账号"""
-        for i, account in enumerate(self.accounts):
-            if account['name'] == name:
-                del self.accounts[i]
-                self._save_cookies()
-                logger.success(f"删除账号 '{name}' 成功")
-                return True
+        with self._lock:
+            account = self._by_name.pop(name, None)
+            if account is not None:
+                self.accounts.remove(account)
+                # 堆中的元素在弹出时跳过
+                self._heap_seq.pop(name, None)
+                self._entries.pop(name, None)
+        if account is not None:
+            CircuitBreakerRegistry.get_instance().reset(name)
+            self._save_cookies()
+            logger.success(f"删除账号 '{name}' 成功")
+            return True
         
         logger.warning(f"账号 '{name}' 不存在")
         return False
     
     def get_account_by_name(self, name: str) -> Optional[Dict]:
         """根据名称获取账号"""
-        for account in self.accounts:
-            if account['name'] == name:
-                return account
-        return None
+        return self._by_name.get(name)
     
     def get_all_accounts(self) -> List[Dict]:
         """获取所有账号列表（不包含cookie详细信息）"""
@@ -124,9 +266,55 @@ class AccountManager:
             'description': account.get('description', ''),
             'lastUsed': account['lastUsed'],
             'createTime': account['createTime'],
-            'updateTime': account['updateTime']
+            'updateTime': account['updateTime'],
+            'valid': account.get('valid'),
+            'lastValidated': account.get('lastValidated', 0),
+            'validateLatency': account.get('validateLatency')
         } for account in self.accounts]
     
+    def _schedule(self) -> Optional[Dict]:
+        """使用调度策略从未被熔断的账号中选择，所有账号都被熔断时从全部账号中选择"""
+        if not self.accounts:
+            return None
+        breakers = CircuitBreakerRegistry.get_instance()
+        candidates = [account for account in self.accounts if breakers.is_available(account['name'])]
+        return self.scheduler.select(candidates or self.accounts, self)
+    
+    def account_weight(self, account: Dict) -> float:
+        """账号在加权调度中的权重: 账号上设置的weight，否则已登录的cookie为3，游客cookie为1"""
+        weight = account.get('weight')
+        if weight:
+            return weight
+        cookies = self._get_entry(account)['cookies']
+        return 3 if cookies.get('sessionid') or cookies.get('sessionid_ss') else 1
+    
+    def _select_account(self, name: str = None, track_load: bool = False) -> Optional[Dict]:
+        """按名称或调度策略选择账号，并更新使用时间
+        
+        track_load为True时在锁内把账号正在进行的请求数加1，紧接着的下一次选择就能看到，
+        请求结束后由调用方调用AccountLoad.end
+        """
+        with self._lock:
+            if name:
+                # 指定账号名
+                account = self._by_name.get(name)
+                if not account:
+                    logger.warning(f"账号 '{name}' 不存在")
+                    return None
+            else:
+                # 默认选择最近最少使用的账号（lastUsed最小的），跳过被熔断的账号
+                account = self._pop_available() if self.scheduler is None else self._schedule()
+                if not account:
+                    logger.warning("没有可用的账号")
+                    return None
+                logger.info(f"自动选择账号: {account['name']}")
+            
+            # 更新使用时间
+            self._touch(account)
+            if track_load:
+                AccountLoad.get_instance().begin(account['name'])
+            return account
+    
     def get_cookie(self, name: str = None) -> Optional[str]:
         """获取cookie
         
@@ -136,26 +324,37 @@ class AccountManager:
         Returns:
             cookie字符串，如果没有可用账号则返回None
         """
-        if not self.accounts:
-            logger.warning("没有可用的账号")
-            return None
-        
-        if name:
-            # 指定账号名
-            account = self.get_account_by_name(name)
-            if not account:
-                logger.warning(f"账号 '{name}' 不存在")
-                return None
-        else:
-            # 选择最近最少使用的账号（lastUsed最小的）
-            account = min(self.accounts, key=lambda x: x['lastUsed'])
-            logger.info(f"自动选择账号: {account['name']}")
-        
-        # 更新使用时间
-        account['lastUsed'] = int(time.time())
-        self._save_cookies()
+        account = self._select_account(name)
+        return account['cookie'] if account else None
+    
+    def get_cookie_entry(self, name: str = None, track_load: bool = False) -> Optional[Dict]:
+        """获取解析好的cookie条目
         
-        return account['cookie']
+        Args:
+            name: 账号名称，如果不指定则使用最近最少使用的账号
+            track_load: 是否在选择账号的同时记录一个正在进行的请求，见_select_account
+            
+        Returns:
+            {'name': 账号名, 'cookies': cookie字典, 'params': 设备参数}，如果没有可用账号则返回None。
+            条目按账号缓存，更新或删除账号时失效，调用方不要修改
+        """
+        account = self._select_account(name, track_load)
+        if not account:
+            return None
+        return self._get_entry(account)
+    
+    def _get_entry(self, account: Dict) -> Dict:
+        """账号解析好的cookie条目，按账号缓存"""
+        entry = self._entries.get(account['name'])
+        if entry is None:
+            cookie = account['cookie']
+            cookie_dict = self._cookies_str_to_dict(cookie)
+            entry = {'name': account['name'], 'cookies': cookie_dict, 'params': cookie_params(cookie_dict)}
+            with self._lock:
+                # 解析期间账号可能被更新或删除，只缓存仍然有效的结果
+                if self._by_name.get(account['name']) is account and account['cookie'] is cookie:
+                    self._entries[account['name']] = entry
+        return entry
     
     def get_cookie_dict(self, name: str = None) -> Optional[Dict]:
         """获取cookie字典格式
@@ -166,11 +365,49 @@ class AccountManager:
         Returns:
             cookie字典，如果没有可用账号则返回None
         """
-        cookie_str = self.get_cookie(name)
-        if not cookie_str:
+        entry = self.get_cookie_entry(name)
+        if not entry:
+            return None
+        
+        return dict(entry['cookies'])
+    
+    def peek_cookie_entry(self, name: str) -> Optional[Dict]:
+        """获取指定账号解析好的cookie条目，不更新使用时间，账号不存在时返回None"""
+        account = self._by_name.get(name)
+        if not account:
             return None
+        return self._get_entry(account)
+    
+    def peek_cookie_dict(self, name: str) -> Optional[Dict]:
+        """获取指定账号的cookie字典，不更新使用时间，用于检查cookie是否有效"""
+        entry = self.peek_cookie_entry(name)
+        return dict(entry['cookies']) if entry else None
+    
+    def record_validation(self, name: str, valid: bool, latency: float = None) -> bool:
+        """记录账号cookie的检查结果，检查未通过的账号交给熔断器暂停使用
         
-        return self._cookies_str_to_dict(cookie_str)
+        Args:
+            name: 账号名称
+            valid: cookie是否有效
+            latency: 检查耗时（秒）
+            
+        Returns:
+            账号不存在时返回False
+        """
+        with self._lock:
+            account = self._by_name.get(name)
+            if not account:
+                return False
+            account['lastValidated'] = int(time.time())
+            account['valid'] = valid
+            if latency is not None:
+                account['validateLatency'] = round(latency * 1000)
+            # 和lastUsed一样由后台线程写入文件
+            self._dirty = True
+        if not valid:
+            # 定期检查、批量测试和熔断器的检查都经过这里，恢复由熔断器的后台检查确认
+            CircuitBreakerRegistry.get_instance().trip(name)
+        return True
     
     def _cookies_str_to_dict(self, cookie_string: str) -> dict:
         """将cookie字符串转换为字典"""
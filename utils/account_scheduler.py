@@ -0,0 +1,171 @@
+"""
+账号调度
+记录每个账号正在进行的请求数和最近的请求耗时，自动选择账号时按调度策略分配：
+    lru             最近最少使用（默认，由AccountManager的堆实现）
+    round_robin     按账号顺序轮流使用
+    weighted        平滑加权轮询，已登录的cookie权重更高，也可以在账号上设置weight
+    least_inflight  正在进行的请求最少的账号
+    latency         按 最近耗时 * (正在进行的请求数 + 1) 选择最小的账号，避开变慢的账号
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional
+
+# 耗时的指数移动平均系数
+LATENCY_ALPHA = 0.3
+
+
+class AccountLoad:
+    """账号的负载统计"""
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self._stats: Dict[str, dict] = {}
+        self._stats_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> 'AccountLoad':
+        """获取单例实例"""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def _get(self, name: str) -> dict:
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = {'inFlight': 0, 'latency': None, 'requests': 0}
+        return stats
+
+    def begin(self, name: Optional[str]) -> float:
+        """开始一次请求，返回开始时间"""
+        if name:
+            with self._stats_lock:
+                self._get(name)['inFlight'] += 1
+        return time.monotonic()
+
+    def end(self, name: Optional[str], started: float):
+        """结束一次请求，更新耗时"""
+        if not name:
+            return
+        elapsed = time.monotonic() - started
+        with self._stats_lock:
+            stats = self._get(name)
+            stats['inFlight'] = max(0, stats['inFlight'] - 1)
+            stats['requests'] += 1
+            if stats['latency'] is None:
+                stats['latency'] = elapsed
+            else:
+                stats['latency'] += LATENCY_ALPHA * (elapsed - stats['latency'])
+
+    def in_flight(self, name: str) -> int:
+        stats = self._stats.get(name)
+        return stats['inFlight'] if stats else 0
+
+    def latency(self, name: str) -> Optional[float]:
+        stats = self._stats.get(name)
+        return stats['latency'] if stats else None
+
+    def reset(self, name: str):
+        with self._stats_lock:
+            self._stats.pop(name, None)
+
+    def stats(self) -> dict:
+        """每个账号的负载: {账号名: {inFlight, latencyMs, requests}}"""
+        with self._stats_lock:
+            return {name: {
+                'inFlight': stats['inFlight'],
+                'latencyMs': round(stats['latency'] * 1000, 1) if stats['latency'] is not None else None,
+                'requests': stats['requests']
+            } for name, stats in self._stats.items()}
+
+
+class Scheduler:
+    """调度策略，select在AccountManager的锁内调用"""
+
+    name = ''
+
+    def select(self, accounts: List[Dict], manager) -> Dict:
+        """从可用的账号中选择一个，accounts不为空"""
+        raise NotImplementedError
+
+
+class RoundRobinScheduler(Scheduler):
+    name = 'round_robin'
+
+    def __init__(self):
+        self._next = 0
+
+    def select(self, accounts, manager):
+        account = accounts[self._next % len(accounts)]
+        self._next = (self._next + 1) % len(accounts)
+        return account
+
+
+class WeightedScheduler(Scheduler):
+    """平滑加权轮询，权重为3的账号在每4次中被选中3次，并且不会连续集中在一起"""
+
+    name = 'weighted'
+
+    def __init__(self):
+        self._current: Dict[str, float] = {}
+
+    def select(self, accounts, manager):
+        total = 0
+        best = None
+        for account in accounts:
+            weight = manager.account_weight(account)
+            total += weight
+            current = self._current[account['name']] = self._current.get(account['name'], 0) + weight
+            if best is None or current > self._current[best['name']]:
+                best = account
+        self._current[best['name']] -= total
+        if len(self._current) > 2 * len(accounts):
+            # 清理已删除的账号
+            names = {account['name'] for account in accounts}
+            self._current = {name: value for name, value in self._current.items() if name in names}
+        return best
+
+
+class LeastInflightScheduler(Scheduler):
+    name = 'least_inflight'
+
+    def select(self, accounts, manager):
+        load = AccountLoad.get_instance()
+        return min(accounts, key=lambda account: (load.in_flight(account['name']), account['lastUsed']))
+
+
+class LatencyScheduler(Scheduler):
+    """没有耗时记录的账号优先，用来获得它的耗时"""
+
+    name = 'latency'
+
+    def select(self, accounts, manager):
+        load = AccountLoad.get_instance()
+
+        def score(account):
+            latency = load.latency(account['name']) or 0.0
+            return latency * (load.in_flight(account['name']) + 1), account['lastUsed']
+
+        return min(accounts, key=score)
+
+
+SCHEDULERS = {
+    'lru': None,
+    RoundRobinScheduler.name: RoundRobinScheduler,
+    WeightedScheduler.name: WeightedScheduler,
+    LeastInflightScheduler.name: LeastInflightScheduler,
+    LatencyScheduler.name: LatencyScheduler,
+}
+
+
+def create_scheduler(name: str) -> Optional[Scheduler]:
+    """按名称创建调度策略，lru返回None，由AccountManager使用堆选择"""
+    if name not in SCHEDULERS:
+        raise ValueError(f'未知的调度策略: {name}，可选: {", ".join(SCHEDULERS)}')
+    scheduler_cls = SCHEDULERS[name]
+    return scheduler_cls() if scheduler_cls else None
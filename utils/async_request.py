@@ -0,0 +1,248 @@
+"""
+asyncio版本的Request
+接口与utils.request.Request保持一致，网络相关的方法都改为协程：
+使用httpx.AsyncClient发送请求，重试时使用asyncio.sleep，签名等CPU计算放到线程池中执行，
+单个进程内可以同时挂起大量上游请求
+"""
+
+import asyncio
+import time
+import weakref
+
+import httpx
+from loguru import logger
+
+from utils.rate_limiter import RateLimiter
+from utils.request import Request
+from utils.single_flight import AsyncSingleFlight
+from utils.webid_cache import WebidCache
+
+
+class AsyncRequest(Request):
+    # 每个事件循环一个AsyncClient，AsyncClient的连接池不能跨事件循环使用
+    _clients = weakref.WeakKeyDictionary()
+    # 请求合并器同样按事件循环区分
+    _flights = weakref.WeakKeyDictionary()
+    # 后台刷新webid的任务
+    _webid_tasks = set()
+
+    @classmethod
+    def get_client(cls) -> httpx.AsyncClient:
+        """获取当前事件循环对应的AsyncClient"""
+        loop = asyncio.get_running_loop()
+        client = cls._clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                proxies=None,
+                timeout=httpx.Timeout(30.0, connect=10.0),  # 分别设置总超时和连接超时
+                verify=False,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=1000, max_keepalive_connections=100)  # 连接池限制
+            )
+            cls._clients[loop] = client
+        return client
+
+    @classmethod
+    def get_flight(cls) -> AsyncSingleFlight:
+        """获取当前事件循环对应的请求合并器"""
+        loop = asyncio.get_running_loop()
+        flight = cls._flights.get(loop)
+        if flight is None:
+            flight = cls._flights[loop] = AsyncSingleFlight()
+        return flight
+
+    @classmethod
+    def flight_stats(cls) -> dict:
+        """同步请求和各事件循环中请求合并统计的总和"""
+        stats = super().flight_stats()
+        for flight in list(cls._flights.values()):
+            for name, value in flight.stats().items():
+                stats[name] = stats.get(name, 0) + value
+        return stats
+
+    @classmethod
+    async def close_client(cls):
+        """关闭当前事件循环对应的AsyncClient"""
+        client = cls._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    async def _async_instance_entry(self) -> dict:
+        """_instance_entry的协程版本，首次加载cookie可能涉及文件IO，放到线程池中"""
+        if self._cookies_loaded:
+            return self._entry
+        return await asyncio.to_thread(self._instance_entry)
+
+    async def _async_call_entry(self, track_load: bool = False) -> dict:
+        """本次请求使用的cookie条目，只在本次调用中传递，await期间其他协程轮换账号不会影响它
+
+        轮换时账号管理器在内存中选择账号，直接在事件循环中执行，
+        记录正在进行的请求和返回条目之间没有await，请求被取消时不会漏掉结束的记录
+        """
+        if not self._rotates():
+            await self._async_instance_entry()
+        return self._call_entry(track_load)
+
+    async def get_params(self, params: dict) -> dict:
+        entry = await self._async_instance_entry()
+        return self._apply_params(params, await self.get_webid(entry), entry)
+
+    async def sign_many(self, uri: str, params_list: list) -> list:
+        """批量签名，签名计算在线程池中执行"""
+        entry = await self._async_instance_entry()
+        webid = await self.get_webid(entry)
+        return await asyncio.to_thread(self._sign_many, uri, params_list, webid, entry)
+
+    async def get_webid(self, entry: dict = None):
+        """从缓存读取webid，需要刷新时在当前事件循环中后台抓取首页"""
+        if self.WEBID:
+            return self.WEBID
+        if entry is None:
+            entry = await self._async_instance_entry()
+        cache = WebidCache.get_instance()
+        key = self._webid_key(entry)
+        webid, stale = cache.lookup(key)
+        if stale and cache.claim(key):
+            task = asyncio.ensure_future(self._refresh_webid(key, entry))
+            # 保留引用，避免任务未完成时被回收
+            self._webid_tasks.add(task)
+            task.add_done_callback(self._webid_tasks.discard)
+        return webid
+
+    async def _refresh_webid(self, key: str, entry: dict):
+        """使用缓存键对应账号的cookie抓取首页"""
+        webid = None
+        try:
+            text = await self.getHTML(self.WEBID_URL, max_retries=2, delay=0.5, entry=entry)  # 减少重试次数和延迟
+            webid = self._parse_webid(text)
+        except Exception as e:
+            logger.error(f'后台获取webid失败: {e}')
+        finally:
+            # 写入缓存文件，放到线程池中执行
+            await asyncio.to_thread(WebidCache.get_instance().finish, key, webid)
+
+    async def getHTML(self, url, max_retries=3, delay=1, entry: dict = None) -> str:
+        # 如果启用了轮换cookie，每次请求都使用新cookie
+        if entry is None:
+            entry = await self._async_call_entry()
+        cookies = entry['cookies']
+
+        headers = self.HEADERS.copy()
+        headers['sec-fetch-dest'] = 'document'
+
+        client = self.get_client()
+        policy = self._retry_policy()
+        policy.begin()
+        for attempt in range(max_retries):
+            try:
+                response = await client.get(url, headers=headers, cookies=cookies)
+                if response.status_code != 200 or response.text == '':
+                    logger.error(f'HTML请求失败, url: {url}, status: {response.status_code}, attempt: {attempt + 1}')
+                    # 只有429和5xx重试，200但响应为空通常是cookie或签名失效，重试也没有用
+                    wait = policy.delay_for_status(attempt, max_retries, delay, response.status_code)
+                    if wait is not None:
+                        await asyncio.sleep(wait)  # 指数退避加随机抖动
+                        continue
+                    return ''
+                return response.text
+            except (httpx.RemoteProtocolError, httpx.ConnectError, httpx.TimeoutException) as e:
+                logger.warning(f'HTML请求网络错误, url: {url}, error: {e}, attempt: {attempt + 1}')
+                wait = policy.next_delay(attempt, max_retries, delay, type(e).__name__)
+                if wait is not None:
+                    await asyncio.sleep(wait)  # 指数退避加随机抖动
+                    continue
+                logger.error(f'HTML请求最终失败, url: {url}, 共请求 {attempt + 1} 次')
+                return ''
+            except Exception as e:
+                logger.error(f'HTML请求未知错误, url: {url}, error: {e}')
+                return ''
+
+        return ''
+
+    async def getJSON(self, uri: str, params: dict, data: dict = None, live=None, max_retries=3, delay=1):
+        if data:
+            return await self._fetch_json(uri, params, data, live, max_retries, delay)
+
+        key = self._request_key(uri, params, live)
+        # 幂等的GET接口先查缓存，命中时跳过签名和网络请求
+        ttl, cached = self._cache_lookup(uri, key, live)
+        if cached is not None:
+            return cached
+        # 相同的请求正在进行时等待它的结果，不再重复签名和请求
+        result, shared = await self.get_flight().do(
+            key, self._fetch_and_cache, uri, params, live, max_retries, delay, key, ttl)
+        return self._copy_json(result) if shared else result
+
+    async def _fetch_and_cache(self, uri: str, params: dict, live, max_retries, delay, key: tuple, ttl):
+        result = await self._fetch_json(uri, params, None, live, max_retries, delay)
+        self._cache_store(key, ttl, result)
+        return result
+
+    async def _fetch_json(self, uri: str, params: dict, data: dict = None, live=None, max_retries=3, delay=1):
+        # 如果启用了轮换cookie，每次请求都使用新cookie，选择账号时已经记录为正在进行的请求
+        entry = await self._async_call_entry(track_load=True)
+
+        # 记录本次使用的账号的耗时和请求结果
+        account = entry['name']
+        started = time.monotonic()
+        # 请求被取消或者发出前出错时保持为None，不计入账号的失败
+        result = None
+        try:
+            result = await self._send_json(entry, uri, params, data, live, max_retries, delay)
+            return result
+        finally:
+            self._record_health(account, started, result)
+
+    async def _send_json(self, entry: dict, uri: str, params: dict, data: dict = None, live=None,
+                         max_retries=3, delay=1):
+        """使用entry中的cookie签名并发送请求，失败时按重试策略重试"""
+        url = f'{self.LIVE_HOST}{uri}' if live and not data else f'{self.HOST}{uri}'
+        webid = await self.get_webid(entry)
+        cookies = entry['cookies']
+        account_id = self._entry_id(entry)
+        # 签名是纯CPU计算，放到线程池中避免阻塞事件循环
+        params = await asyncio.to_thread(self._signed_params, uri, params, webid, entry)
+
+        # 每次请求使用独立的headers，避免并发的协程互相覆盖
+        headers = self._json_headers(uri, params, data)
+
+        client = self.get_client()
+        limiter = RateLimiter.get_instance()
+        policy = self._retry_policy()
+        policy.begin()
+        # 重试机制
+        for attempt in range(max_retries):
+            # 按账号和接口限速，等待时不阻塞事件循环
+            await limiter.async_acquire(account_id, uri)
+            try:
+                if data:
+                    response = await client.post(
+                        url, params=params, data=data, headers=headers, cookies=cookies)
+                else:
+                    response = await client.get(
+                        url, params=params, headers=headers, cookies=cookies)
+
+                if response.status_code != 200 or response.text == '':
+                    logger.error(f'JSON请求失败：url: {url}, status: {response.status_code}, attempt: {attempt + 1}')
+                    # 只有429和5xx重试，200但响应为空通常是cookie或签名失效，重试也没有用
+                    wait = policy.delay_for_status(attempt, max_retries, delay, response.status_code)
+                    if wait is not None:
+                        await asyncio.sleep(wait)  # 指数退避加随机抖动
+                        continue
+                    return {}
+
+                return response.json()
+
+            except (httpx.RemoteProtocolError, httpx.ConnectError, httpx.TimeoutException) as e:
+                logger.warning(f'JSON请求网络错误：url: {url}, error: {e}, attempt: {attempt + 1}')
+                wait = policy.next_delay(attempt, max_retries, delay, type(e).__name__)
+                if wait is not None:
+                    await asyncio.sleep(wait)  # 指数退避加随机抖动
+                    continue
+                logger.error(f'JSON请求最终失败：url: {url}, 共请求 {attempt + 1} 次')
+                return {}
+            except Exception as e:
+                logger.error(f'JSON请求未知错误：url: {url}, error: {e}')
+                return {}
+
+        return {}
@@ -0,0 +1,67 @@
+"""
+后台事件循环
+Flask默认为每个async视图新建一个事件循环，AsyncClient的连接池无法在请求之间复用。
+这里在后台线程中常驻一个事件循环，所有async视图都提交到这个循环上执行，
+工作线程只负责等待结果，上游请求在同一个事件循环里并发
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+
+
+class BackgroundLoop:
+    """常驻在后台线程中的事件循环"""
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name='async-runner', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    @classmethod
+    def get_instance(cls) -> 'BackgroundLoop':
+        """获取单例实例"""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def run(self, coro, timeout: float = None):
+        """在后台事件循环中执行协程并阻塞等待结果
+
+        协程在调用方的contextvars上下文中执行，因此可以访问Flask的request等上下文对象
+        """
+        if threading.current_thread() is self.thread:
+            raise RuntimeError('不能在后台事件循环线程中同步等待协程')
+
+        context = contextvars.copy_context()
+        future = concurrent.futures.Future()
+
+        def on_done(task: asyncio.Task):
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+
+        def start():
+            task = self.loop.create_task(coro, context=context)
+            task.add_done_callback(on_done)
+
+        self.loop.call_soon_threadsafe(start)
+        return future.result(timeout)
+
+
+def run_coroutine(coro, timeout: float = None):
+    """在后台事件循环中执行协程并返回结果"""
+    return BackgroundLoop.get_instance().run(coro, timeout)
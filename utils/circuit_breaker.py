@@ -0,0 +1,195 @@
+"""
+账号熔断
+按账号统计最近请求的失败率（请求失败、响应为空或status_code不为0都算失败），
+失败率过高时熔断该账号，轮换选择账号时跳过。熔断一段时间后进入半开状态，
+由后台线程用test_cookie的用户信息接口检查cookie，通过后恢复，否则继续熔断
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from loguru import logger
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def probe_account(name: str) -> Optional[bool]:
+    """检查账号的cookie是否仍然有效，账号已不存在时返回None"""
+    from utils.account_manager import AccountManager
+    from utils.cookies import test_cookie
+
+    manager = AccountManager.get_instance()
+    cookie_dict = manager.peek_cookie_dict(name)
+    if cookie_dict is None:
+        return None
+    started = time.monotonic()
+    valid = test_cookie(cookie_dict)
+    manager.record_validation(name, valid, time.monotonic() - started)
+    return valid
+
+
+class CircuitBreaker:
+    """单个账号的熔断器"""
+
+    __slots__ = ('state', 'results', 'opened_at', 'open_count')
+
+    def __init__(self, window: int):
+        self.state = CLOSED
+        self.results = deque(maxlen=window)  # 最近的请求结果，True为成功
+        self.opened_at = 0.0
+        self.open_count = 0  # 累计熔断次数
+
+    def failure_rate(self) -> float:
+        if not self.results:
+            return 0.0
+        return 1 - sum(self.results) / len(self.results)
+
+
+class CircuitBreakerRegistry:
+    """所有账号的熔断器"""
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, failure_threshold: float = 0.5, window: int = 20, min_requests: int = 5,
+                 open_seconds: float = 60, probe: Callable[[str], Optional[bool]] = probe_account):
+        """
+        Args:
+            failure_threshold: 最近window次请求中失败的比例达到该值时熔断
+            window: 统计的请求次数
+            min_requests: 请求次数少于该值时不熔断
+            open_seconds: 熔断后多久开始检查cookie
+            probe: 检查账号是否恢复的函数，返回True/False，账号不存在时返回None
+        """
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.min_requests = min_requests
+        self.open_seconds = open_seconds
+        self.probe = probe
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._breakers_lock = threading.Lock()
+        self._prober = None
+
+    @classmethod
+    def initialize(cls, **kwargs):
+        """初始化单例实例"""
+        cls._instance = cls(**kwargs)
+        return cls._instance
+
+    @classmethod
+    def get_instance(cls) -> 'CircuitBreakerRegistry':
+        """获取单例实例"""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def record(self, name: str, success: bool):
+        """记录账号的一次请求结果"""
+        with self._breakers_lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(self.window)
+            if breaker.state != CLOSED:
+                # 熔断期间正在进行的请求不影响状态
+                return
+            breaker.results.append(success)
+            if (success or len(breaker.results) < self.min_requests
+                    or breaker.failure_rate() < self.failure_threshold):
+                return
+            self._open(name, breaker, f'请求失败率 {breaker.failure_rate():.0%}')
+        self._ensure_prober()
+
+    def _open(self, name: str, breaker: CircuitBreaker, reason: str):
+        breaker.state = OPEN
+        breaker.opened_at = time.monotonic()
+        breaker.open_count += 1
+        logger.warning(f"账号 '{name}' {reason}，暂停使用")
+
+    def trip(self, name: str):
+        """直接熔断账号，用于定期检查发现cookie已失效的情况"""
+        with self._breakers_lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(self.window)
+            if breaker.state != CLOSED:
+                return
+            self._open(name, breaker, 'cookie检查未通过')
+        self._ensure_prober()
+
+    def is_available(self, name: str) -> bool:
+        """账号是否可以参与轮换"""
+        breaker = self._breakers.get(name)
+        return breaker is None or breaker.state == CLOSED
+
+    def state(self, name: str) -> str:
+        breaker = self._breakers.get(name)
+        return breaker.state if breaker else CLOSED
+
+    def reset(self, name: str):
+        """账号的cookie更新或账号被删除时清除记录"""
+        with self._breakers_lock:
+            self._breakers.pop(name, None)
+
+    def _ensure_prober(self):
+        """有账号被熔断时启动后台检查线程"""
+        with self._lock:
+            if self._prober is None:
+                self._prober = threading.Thread(target=self._probe_loop, name='account-prober', daemon=True)
+                self._prober.start()
+
+    def _probe_loop(self):
+        """定期检查熔断的账号，没有熔断的账号时退出，下次熔断时重新启动"""
+        while True:
+            time.sleep(min(max(self.open_seconds, 1), 10))
+            self.probe_due()
+            with self._lock, self._breakers_lock:
+                if all(breaker.state == CLOSED for breaker in self._breakers.values()):
+                    self._prober = None
+                    return
+
+    def probe_due(self):
+        """检查熔断时间已到的账号"""
+        now = time.monotonic()
+        with self._breakers_lock:
+            due = [name for name, breaker in self._breakers.items()
+                   if breaker.state == OPEN and now - breaker.opened_at >= self.open_seconds]
+            for name in due:
+                self._breakers[name].state = HALF_OPEN
+
+        for name in due:
+            try:
+                healthy = self.probe(name)
+            except Exception as e:
+                logger.error(f"检查账号 '{name}' 失败: {e}")
+                healthy = False
+            with self._breakers_lock:
+                breaker = self._breakers.get(name)
+                if breaker is None or breaker.state != HALF_OPEN:
+                    continue
+                if healthy is None:
+                    # 账号已被删除
+                    del self._breakers[name]
+                elif healthy:
+                    breaker.state = CLOSED
+                    breaker.results.clear()
+                    logger.success(f"账号 '{name}' 检查通过，恢复使用")
+                else:
+                    breaker.state = OPEN
+                    breaker.opened_at = time.monotonic()
+                    logger.warning(f"账号 '{name}' 检查未通过，继续暂停使用")
+
+    def stats(self) -> dict:
+        """熔断统计信息"""
+        with self._breakers_lock:
+            return {
+                'tracked': len(self._breakers),
+                'open': [name for name, b in self._breakers.items() if b.state == OPEN],
+                'halfOpen': [name for name, b in self._breakers.items() if b.state == HALF_OPEN],
+                'openCount': sum(b.open_count for b in self._breakers.values())
+            }
@@ -0,0 +1,114 @@
+"""
+账号cookie的定期检查
+后台线程按固定的间隔逐个检查账号的cookie（与test_cookie相同，请求用户信息接口），
+结果记录到账号上。每个账号在interval内最多检查一次，两次检查之间至少间隔spacing秒，
+检查未通过的账号交给熔断器暂停使用，恢复后由熔断器的后台检查重新启用
+"""
+
+import os
+import threading
+import time
+from typing import Optional
+
+from loguru import logger
+
+from utils.account_manager import AccountManager
+from utils.cookies import test_cookie
+
+
+class CookieSweeper:
+    """定期检查账号cookie是否有效"""
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, interval: float = None, spacing: float = None):
+        """
+        Args:
+            interval: 每个账号的检查间隔（秒），默认读取环境变量 DOUYIN_COOKIE_SWEEP_INTERVAL，否则为21600（6小时），0表示不检查
+            spacing: 两次检查之间的最小间隔（秒），默认读取环境变量 DOUYIN_COOKIE_SWEEP_SPACING，否则为10
+        """
+        if interval is None:
+            interval = float(os.environ.get('DOUYIN_COOKIE_SWEEP_INTERVAL', 21600))
+        if spacing is None:
+            spacing = float(os.environ.get('DOUYIN_COOKIE_SWEEP_SPACING', 10))
+        self.interval = interval
+        self.spacing = spacing
+        self.checked = 0
+        self.invalid = 0
+        self.last_checked = None  # 最近检查的账号
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def initialize(cls, interval: float = None, spacing: float = None):
+        """初始化单例实例并启动后台线程"""
+        if cls._instance is not None:
+            cls._instance.close()
+        cls._instance = cls(interval, spacing)
+        cls._instance.start()
+        return cls._instance
+
+    @classmethod
+    def get_instance(cls) -> 'CookieSweeper':
+        """获取单例实例，未初始化时不启动后台线程"""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls(interval=0)
+        return cls._instance
+
+    def start(self):
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._sweep_loop, name='cookie-sweeper', daemon=True)
+            self._thread.start()
+
+    def close(self):
+        self._stop_event.set()
+
+    def _sweep_loop(self):
+        while not self._stop_event.wait(max(self.spacing, 1)):
+            try:
+                self.sweep_once()
+            except Exception as e:
+                logger.error(f"检查账号cookie失败: {e}")
+
+    def next_due(self) -> Optional[str]:
+        """最久没有检查且已到检查时间的账号"""
+        now = time.time()
+        due = [account for account in AccountManager.get_instance().get_all_accounts()
+               if now - account['lastValidated'] >= self.interval]
+        if not due:
+            return None
+        return min(due, key=lambda account: account['lastValidated'])['name']
+
+    def sweep_once(self) -> Optional[str]:
+        """检查一个到期的账号，返回账号名称，没有到期的账号时返回None"""
+        name = self.next_due()
+        if name is None:
+            return None
+        manager = AccountManager.get_instance()
+        cookie_dict = manager.peek_cookie_dict(name)
+        if cookie_dict is None:
+            return None
+
+        started = time.monotonic()
+        valid = test_cookie(cookie_dict)
+        manager.record_validation(name, valid, time.monotonic() - started)
+        self.checked += 1
+        self.last_checked = name
+        if not valid:
+            # record_validation已经熔断了这个账号
+            self.invalid += 1
+            logger.warning(f"账号 '{name}' 的cookie已失效")
+        return name
+
+    def stats(self) -> dict:
+        """检查统计信息"""
+        return {
+            'interval': self.interval,
+            'running': self._thread is not None and not self._stop_event.is_set(),
+            'checked': self.checked,
+            'invalid': self.invalid,
+            'lastChecked': self.last_checked
+        }
@@ -9,6 +9,50 @@ import browser_cookie3
 from .util import save_json
 
 
+def _get_account_entry(name=None, track_load=False):
+    """从账号管理器获取cookie条目，账号管理器中没有账号时返回None"""
+    try:
+        from utils.account_manager import AccountManager
+        manager = AccountManager.get_instance()
+        if manager and hasattr(manager, 'accounts') and manager.accounts:
+            return manager.get_cookie_entry(name, track_load)
+        # 如果账号管理器中没有账号，不输出警告日志，直接尝试其他方式
+    except Exception as e:
+        # 减少日志输出，只在真正出错时记录
+        pass
+    return None
+
+
+def cookie_params(cookie_dict: dict) -> dict:
+    """从cookie中提取请求需要附带的设备参数"""
+    params = {}
+    if cookie_dict.get('msToken'):
+        params['msToken'] = cookie_dict['msToken']
+    params.update({
+        'screen_width': cookie_dict.get('dy_swidth', 2560),
+        'screen_height': cookie_dict.get('dy_sheight', 1440),
+        'cpu_core_num': cookie_dict.get('device_web_cpu_core', 24),
+        'device_memory': cookie_dict.get('device_web_memory_size', 8),
+        'verifyFp': cookie_dict.get('s_v_web_id', None),
+        'fp': cookie_dict.get('s_v_web_id', None),
+    })
+    return params
+
+
+def get_cookie_entry(cookie='', name=None, track_load=False) -> dict:
+    """获取cookie条目 {'name': 账号名, 'cookies': cookie字典, 'params': 设备参数}
+
+    参数同get_cookie_dict。从账号管理器获取的条目是缓存的解析结果，调用方不要修改。
+    track_load为True时选择账号的同时记录一个正在进行的请求，见AccountManager.get_cookie_entry
+    """
+    if not cookie:
+        entry = _get_account_entry(name, track_load)
+        if entry:
+            return entry
+    cookie_dict = _load_cookie_dict(cookie)
+    return {'name': None, 'cookies': cookie_dict, 'params': cookie_params(cookie_dict)}
+
+
 def get_cookie_dict(cookie='', name=None) -> dict:
     """获取cookie字典
     
@@ -18,18 +62,14 @@ def get_cookie_dict(cookie='', name=None) -> dict:
     """
     # 如果没有提供cookie，尝试从账号管理器获取
     if not cookie or cookie == '':
-        try:
-            from utils.account_manager import AccountManager
-            manager = AccountManager.get_instance()
-            if manager and hasattr(manager, 'accounts') and manager.accounts:
-                cookie_dict = manager.get_cookie_dict(name)
-                if cookie_dict:
-                    return cookie_dict
-            # 如果账号管理器中没有账号，不输出警告日志，直接尝试其他方式
-        except Exception as e:
-            # 减少日志输出，只在真正出错时记录
-            pass
-    
+        entry = _get_account_entry(name)
+        if entry:
+            return dict(entry['cookies'])
+    return _load_cookie_dict(cookie)
+
+
+def _load_cookie_dict(cookie='') -> dict:
+    """从cookie字符串、浏览器或config目录加载cookie字典"""
     # 原有的逻辑保持不变
     if cookie:
         # 自动读取的cookie有效期短，且不一定有效
@@ -68,41 +108,79 @@ def save_cookie(cookie: dict):
     save_json('config/cookie', cookie)
 
 
-def test_cookie(cookie):
-    """使用get_user_info_self API测试cookie是否有效"""
-    from utils.request import Request
-    
-    # 处理cookie格式
+def _parse_test_cookie(cookie):
+    """把test_cookie接收的cookie统一转换为字典，格式不正确时返回None"""
     if type(cookie) is dict:
-        cookie_dict = cookie
+        return cookie
     elif type(cookie) is str:
         # 假设传入的已经是解码后的cookie字符串
-        cookie_dict = cookies_str_to_dict(cookie)
-    else:
-        logger.error('cookie格式不正确')
+        return cookies_str_to_dict(cookie)
+    logger.error('cookie格式不正确')
+    return None
+
+
+def _is_logged_in(user_info) -> bool:
+    """检查get_user_info_self的返回结果"""
+    if user_info and 'user' in user_info and user_info['user']:
+        logger.success('cookie已登录')
+        return True
+    logger.error('cookie未登录或无效')
+    return False
+
+
+def _cookie_request(request_cls, cookie_dict):
+    """创建直接使用cookie字典的请求实例，不写入config目录，也不轮换到其他账号
+
+    仍然传入base64格式的cookie，缓存和请求合并按cookie区分
+    """
+    cookie = base64.b64encode(cookies_dict_to_str(cookie_dict).encode('utf-8')).decode('utf-8')
+    request_instance = request_cls(cookie=cookie, use_rotating_cookies=False)
+    request_instance.COOKIES = cookie_dict
+    request_instance._cookies_loaded = True
+    return request_instance
+
+
+def test_cookie(cookie):
+    """使用get_user_info_self API测试cookie是否有效"""
+    from utils.request import Request
+
+    cookie_dict = _parse_test_cookie(cookie)
+    if cookie_dict is None:
         return False
 
     try:
         # 创建Request实例并测试cookie
-        request_instance = Request(cookie=cookies_dict_to_str(cookie_dict))
+        request_instance = _cookie_request(Request, cookie_dict)
         url = '/aweme/v1/web/user/profile/self/'
         params = {}
         
         user_info = request_instance.getJSON(url, params)
         
         # 检查返回结果
-        if user_info and 'user' in user_info and user_info['user']:
-            logger.success('cookie已登录')
-            return True
-        else:
-            logger.error('cookie未登录或无效')
-            return False
+        return _is_logged_in(user_info)
             
     except Exception as e:
         logger.error(f'测试cookie时发生错误: {e}')
         return False
 
 
+async def async_test_cookie(cookie):
+    """test_cookie的协程版本，供async视图使用"""
+    from utils.async_request import AsyncRequest
+
+    cookie_dict = _parse_test_cookie(cookie)
+    if cookie_dict is None:
+        return False
+
+    try:
+        request_instance = _cookie_request(AsyncRequest, cookie_dict)
+        user_info = await request_instance.getJSON('/aweme/v1/web/user/profile/self/', {})
+        return _is_logged_in(user_info)
+    except Exception as e:
+        logger.error(f'测试cookie时发生错误: {e}')
+        return False
+
+
 def cookies_str_to_dict(cookie_string: str) -> dict:
     """将cookie字符串转换为字典（假设传入的是已解码的cookie字符串）"""
     if not cookie_string:
@@ -0,0 +1,208 @@
+"""
+分页遍历工具
+按接口返回的游标逐页请求，以生成器的方式逐条产出数据，调用方不需要把完整列表保存在内存中
+"""
+
+from loguru import logger
+
+FOLLOWING_LIST_URL = '/aweme/v1/web/user/following/list/'
+USER_POST_URL = '/aweme/v1/web/aweme/post/'
+
+
+class CrawlError(RuntimeError):
+    """分页请求失败"""
+
+
+def _following_list_params(user_id: str, sec_user_id: str, offset: int, count: int) -> dict:
+    return {
+        'user_id': user_id,
+        'sec_user_id': sec_user_id,
+        'count': str(count),
+        'offset': str(offset),
+        'max_time': '0',
+        'min_time': '0',
+        'source_type': '1',
+        'gps_access': '0',
+        'address_book_access': '0',
+        'is_top': '1',
+    }
+
+
+def _next_offset(page: dict, offset: int):
+    """根据当前页计算下一页的offset，没有下一页时返回None"""
+    followings = page.get('followings') or []
+    if not page.get('has_more') or not followings:
+        return None
+    next_offset = int(page.get('offset') or 0)
+    # 部分返回中的offset不前进，按已获取的数量计算
+    return next_offset if next_offset > offset else offset + len(followings)
+
+
+def _check_page(page: dict, description: str):
+    if not page or page.get('status_code') != 0:
+        status = page.get('status_code') if page else None
+        raise CrawlError(f'{description}, status_code: {status}')
+
+
+def iter_following_pages(request, user_id: str, sec_user_id: str, count: int = 20, max_pages: int = None):
+    """逐页获取关注列表，产出每一页的原始返回
+
+    Args:
+        request: Request实例
+        user_id: 用户uid
+        sec_user_id: 用户sec_uid
+        count: 每页数量
+        max_pages: 最多获取的页数，默认不限制
+    Raises:
+        CrawlError: 某一页请求失败
+    """
+    offset = 0
+    pages = 0
+    while offset is not None and (max_pages is None or pages < max_pages):
+        page = request.getJSON(FOLLOWING_LIST_URL, _following_list_params(user_id, sec_user_id, offset, count))
+        _check_page(page, f'获取关注列表失败, offset: {offset}')
+        pages += 1
+        logger.debug(f'关注列表第 {pages} 页, offset: {offset}, 数量: {len(page.get("followings") or [])}')
+        yield page
+        offset = _next_offset(page, offset)
+
+
+def iter_following_list(request, user_id: str, sec_user_id: str, count: int = 20, max_pages: int = None):
+    """逐个产出关注用户，参数同iter_following_pages"""
+    for page in iter_following_pages(request, user_id, sec_user_id, count, max_pages):
+        yield from page.get('followings') or []
+
+
+async def aiter_following_pages(request, user_id: str, sec_user_id: str, count: int = 20, max_pages: int = None):
+    """iter_following_pages的异步版本，request为AsyncRequest实例"""
+    offset = 0
+    pages = 0
+    while offset is not None and (max_pages is None or pages < max_pages):
+        page = await request.getJSON(FOLLOWING_LIST_URL, _following_list_params(user_id, sec_user_id, offset, count))
+        _check_page(page, f'获取关注列表失败, offset: {offset}')
+        pages += 1
+        logger.debug(f'关注列表第 {pages} 页, offset: {offset}, 数量: {len(page.get("followings") or [])}')
+        yield page
+        offset = _next_offset(page, offset)
+
+
+async def aiter_following_list(request, user_id: str, sec_user_id: str, count: int = 20, max_pages: int = None):
+    """iter_following_list的异步版本，request为AsyncRequest实例"""
+    async for page in aiter_following_pages(request, user_id, sec_user_id, count, max_pages):
+        for user in page.get('followings') or []:
+            yield user
+
+
+def trim_following_user(user: dict) -> dict:
+    """提取关注用户的基本信息"""
+    return {
+        'sec_uid': user.get('sec_uid', ''),
+        'uid': user.get('uid', ''),
+        'nickname': user.get('nickname', ''),
+        'avatar': user.get('avatar_thumb', {}).get('url_list', [''])[0] if user.get('avatar_thumb', {}).get('url_list') else '',
+        'unique_id': user.get('unique_id', ''),
+        'signature': user.get('signature', ''),
+        'aweme_count': user.get('aweme_count', 0),
+        'follower_count': user.get('follower_count', 0),
+        'following_count': user.get('following_count', 0)
+    }
+
+
+def _user_post_params(sec_user_id: str, max_cursor, count: int) -> dict:
+    return {
+        'sec_user_id': sec_user_id,
+        'count': str(count),
+        'max_cursor': str(max_cursor),
+        'locate_query': 'false',
+        'show_live_replay_strategy': '1',
+        'need_time_list': '0' if max_cursor else '1',  # 时间列表只在第一页需要
+        'time_list_query': '0',
+        'whale_cut_token': '',
+        'cut_version': '1',
+        'count_query': '1',
+        'publish_video_strategy_type': '2'
+    }
+
+
+def _next_cursor(page: dict, max_cursor):
+    """根据当前页计算下一页的max_cursor，没有下一页时返回None"""
+    next_cursor = page.get('max_cursor')
+    if not page.get('has_more') or not page.get('aweme_list') or not next_cursor:
+        return None
+    # 游标不变时停止，避免一直请求同一页
+    return None if str(next_cursor) == str(max_cursor) else next_cursor
+
+
+def _user_post_page_params(sec_user_id: str, max_cursor, count: int, pages: int, first_params: dict = None) -> dict:
+    params = _user_post_params(sec_user_id, max_cursor, count)
+    if first_params and pages == 0:
+        params.update(first_params)
+    return params
+
+
+def iter_user_post_pages(request, sec_user_id: str, count: int = 20, max_pages: int = None, max_cursor=0,
+                         first_params: dict = None):
+    """逐页获取用户作品列表，产出每一页的原始返回
+
+    Args:
+        request: Request实例
+        sec_user_id: 用户sec_uid
+        count: 每页数量
+        max_pages: 最多获取的页数，默认获取到最早的作品
+        max_cursor: 开始的游标，用于从上次中断的位置继续
+        first_params: 只用于第一页的参数，如locate_item_id、forward_end_cursor，之后按max_cursor翻页
+    Raises:
+        CrawlError: 某一页请求失败
+    """
+    pages = 0
+    while max_cursor is not None and (max_pages is None or pages < max_pages):
+        page = request.getJSON(USER_POST_URL, _user_post_page_params(sec_user_id, max_cursor, count, pages, first_params))
+        _check_page(page, f'获取作品列表失败, max_cursor: {max_cursor}')
+        pages += 1
+        logger.debug(f'作品列表第 {pages} 页, max_cursor: {max_cursor}, 数量: {len(page.get("aweme_list") or [])}')
+        yield page
+        max_cursor = _next_cursor(page, max_cursor)
+
+
+def iter_user_posts(request, sec_user_id: str, count: int = 20, max_pages: int = None, max_cursor=0,
+                    first_params: dict = None):
+    """逐个产出用户作品，参数同iter_user_post_pages"""
+    for page in iter_user_post_pages(request, sec_user_id, count, max_pages, max_cursor, first_params):
+        yield from page.get('aweme_list') or []
+
+
+async def aiter_user_post_pages(request, sec_user_id: str, count: int = 20, max_pages: int = None, max_cursor=0,
+                                first_params: dict = None):
+    """iter_user_post_pages的异步版本，request为AsyncRequest实例"""
+    pages = 0
+    while max_cursor is not None and (max_pages is None or pages < max_pages):
+        page = await request.getJSON(USER_POST_URL,
+                                     _user_post_page_params(sec_user_id, max_cursor, count, pages, first_params))
+        _check_page(page, f'获取作品列表失败, max_cursor: {max_cursor}')
+        pages += 1
+        logger.debug(f'作品列表第 {pages} 页, max_cursor: {max_cursor}, 数量: {len(page.get("aweme_list") or [])}')
+        yield page
+        max_cursor = _next_cursor(page, max_cursor)
+
+
+def merge_post_pages(pages: list) -> dict:
+    """把多页作品列表合并为一页的结构，has_more和max_cursor取最后一页，用于继续翻页"""
+    merged = dict(pages[-1])
+    merged['aweme_list'] = [aweme for page in pages for aweme in page.get('aweme_list') or []]
+    return merged
+
+
+def trim_video(aweme: dict) -> dict:
+    """提取作品的基本信息"""
+    return {
+        'videoId': aweme.get('aweme_id', ''),
+        'title': aweme.get('desc', ''),
+        'duration': aweme.get('duration', 0),
+        'cover': aweme.get('video', {}).get('cover', {}).get('url_list', [''])[0] if aweme.get('video', {}).get('cover', {}).get('url_list') else '',
+        'createTime': aweme.get('create_time', 0) * 1000,
+        'statistics': {
+            'digg_count': aweme.get('statistics', {}).get('digg_count', 0),
+            'comment_count': aweme.get('statistics', {}).get('comment_count', 0),
+            'share_count': aweme.get('statistics', {}).get('share_count', 0)
+        }
+    }
@@ -0,0 +1,159 @@
+"""
+上游请求限速
+每个账号一个令牌桶，部分接口再按 账号+接口 单独限速。
+令牌不足时调用方预约令牌并等待，请求被均匀地排队发出，而不是等到上游限流后再重试
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# 接口 -> (每秒请求数, 桶容量)，对每个账号单独生效，未列出的接口只受账号限速
+# 作品列表被关注用户视频接口并发请求，容量覆盖一次突发，之后每个账号每秒4个
+DEFAULT_URI_LIMITS = {
+    '/aweme/v1/web/aweme/post/': (4, 10),
+    '/aweme/v1/web/comment/list/': (2, 5),
+    '/aweme/v1/web/comment/list/reply/': (2, 5),
+    '/aweme/v1/web/general/search/single/': (0.5, 2),
+    '/aweme/v1/web/user/following/list/': (1, 3),
+    '/aweme/v1/web/user/follower/list/': (1, 3),
+}
+
+
+class TokenBucket:
+    """令牌桶，令牌可以预支，预支的部分由调用方等待补齐"""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated', 'lock')
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """取走一个令牌，返回需要等待的秒数"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def refund(self):
+        """归还一个没有用到的令牌"""
+        with self.lock:
+            self.tokens = min(self.burst, self.tokens + 1)
+
+
+class RateLimiter:
+    """按账号和接口限速"""
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, account_rate: float = None, account_burst: float = None, uri_limits: dict = None):
+        """
+        Args:
+            account_rate: 每个账号每秒请求数，默认读取环境变量 DOUYIN_ACCOUNT_RATE，否则为5，0表示不限速
+            account_burst: 账号令牌桶容量，默认读取环境变量 DOUYIN_ACCOUNT_BURST，否则为10
+            uri_limits: 接口 -> (每秒请求数, 桶容量)，默认使用DEFAULT_URI_LIMITS
+        """
+        if account_rate is None:
+            account_rate = float(os.environ.get('DOUYIN_ACCOUNT_RATE', 5))
+        if account_burst is None:
+            account_burst = float(os.environ.get('DOUYIN_ACCOUNT_BURST', 10))
+        self.account_rate = account_rate
+        self.account_burst = max(account_burst, 1)
+        self.uri_limits = dict(DEFAULT_URI_LIMITS if uri_limits is None else uri_limits)
+        self._buckets: Dict[Tuple[str, Optional[str]], TokenBucket] = {}
+        self._buckets_lock = threading.Lock()
+        self.acquired = 0
+        self.delayed = 0  # 需要等待的次数
+        self.wait_time = 0.0  # 累计等待的秒数
+
+    @classmethod
+    def initialize(cls, account_rate: float = None, account_burst: float = None, uri_limits: dict = None):
+        """初始化单例实例"""
+        cls._instance = cls(account_rate, account_burst, uri_limits)
+        return cls._instance
+
+    @classmethod
+    def get_instance(cls) -> 'RateLimiter':
+        """获取单例实例"""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @property
+    def enabled(self) -> bool:
+        return self.account_rate > 0
+
+    def _bucket(self, account: str, uri: Optional[str], rate: float, burst: float) -> TokenBucket:
+        key = (account, uri)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            with self._buckets_lock:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    bucket = self._buckets[key] = TokenBucket(rate, max(burst, 1))
+        return bucket
+
+    def reserve(self, account: str, uri: str) -> float:
+        """为一次请求预约账号和接口的令牌，返回需要等待的秒数"""
+        if not self.enabled:
+            return 0.0
+        delay = self._bucket(account, None, self.account_rate, self.account_burst).reserve()
+        limit = self.uri_limits.get(uri)
+        if limit:
+            delay = max(delay, self._bucket(account, uri, *limit).reserve())
+        with self._buckets_lock:
+            self.acquired += 1
+            if delay > 0:
+                self.delayed += 1
+                self.wait_time += delay
+        return delay
+
+    def acquire(self, account: str, uri: str):
+        """等待直到可以发送请求"""
+        delay = self.reserve(account, uri)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def async_acquire(self, account: str, uri: str):
+        """协程版本的acquire，等待时不阻塞事件循环，等待期间被取消时归还预约的令牌"""
+        delay = self.reserve(account, uri)
+        if delay > 0:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                self.refund(account, uri)
+                raise
+
+    def refund(self, account: str, uri: str):
+        """归还reserve预约的令牌，用于请求最终没有发出的情况"""
+        if not self.enabled:
+            return
+        self._bucket(account, None, self.account_rate, self.account_burst).refund()
+        limit = self.uri_limits.get(uri)
+        if limit:
+            self._bucket(account, uri, *limit).refund()
+
+    def stats(self) -> dict:
+        """限速统计信息"""
+        with self._buckets_lock:
+            return {
+                'enabled': self.enabled,
+                'accountRate': self.account_rate,
+                'buckets': len(self._buckets),
+                'acquired': self.acquired,
+                'delayed': self.delayed,
+                'waitSeconds': round(self.wait_time, 3)
+            }
@@ -7,25 +7,75 @@
 @Link    :   https://github.com/ShilongLee/Crawler/blob/main/service/douyin/logic/common.py
 @Desc    :   抖音sign
 '''
+import hashlib
 import os
 import random
 import re
+import threading
 import time
+from types import MappingProxyType
 from urllib.parse import quote
 
 # import requests
 
 import httpx
+import ujson as json
 from loguru import logger
 
-from utils.cookies import get_cookie_dict
+from utils import abogus
+from utils.account_manager import AccountManager
+from utils.account_scheduler import AccountLoad
+from utils.circuit_breaker import CircuitBreakerRegistry
+from utils.cookies import cookie_params, get_cookie_entry
 from utils.execjs_fix import execjs
+from utils.rate_limiter import RateLimiter
+from utils.response_cache import ResponseCache
+from utils.retry import RetryPolicy
+from utils.single_flight import SingleFlight
+from utils.sign_pool import SignWorkerPool
+from utils.webid_cache import WebidCache
+
+
+# 接口 -> referer模板，部分接口必须把referer改为当前请求页面的url，{参数名}会替换为请求参数的值
+REFERER_TEMPLATES = {
+    '/aweme/v1/web/aweme/related/': "https://www.douyin.com/video/{aweme_id}",
+    '/aweme/v1/web/comment/list/': "https://www.douyin.com/video/{aweme_id}",
+    '/aweme/v1/web/comment/list/reply/': "https://www.douyin.com/video/{item_id}",
+    '/aweme/v1/web/user/profile/other/': "https://www.douyin.com/user/{sec_user_id}?",
+    '/aweme/v1/web/aweme/post/': "https://www.douyin.com/user/{sec_user_id}?",
+    '/aweme/v1/web/im/spotlight/relation/': "https://www.douyin.com/user/",
+    '/aweme/v1/web/user/following/list/': "https://www.douyin.com/user/",
+    '/aweme/v1/web/user/follower/list/': "https://www.douyin.com/user/",
+    '/aweme/v1/web/aweme/favorite/': "https://www.douyin.com/user/",
+    '/aweme/v1/web/aweme/listcollection/': "https://www.douyin.com/user/self?from_tab_name=main&showTab=favorite_collection",
+    '/aweme/v1/web/music/listcollection/': "https://www.douyin.com/user/self?from_tab_name=main&showSubTab=music&showTab=favorite_collection",
+    '/aweme/v1/web/collects/video/list/': "https://www.douyin.com/user/self?from_tab_name=main&showSubTab=favorite_folder&showTab=favorite_collection",
+    '/aweme/v1/web/collects/list/': "https://www.douyin.com/user/self?from_tab_name=main&showSubTab=favorite_folder&showTab=favorite_collection",
+    '/aweme/v1/web/mix/listcollection/': "https://www.douyin.com/user/self?from_tab_name=main&showSubTab=favorite_folder&showTab=favorite_collection",
+    '/aweme/v1/web/series/collections': "https://www.douyin.com/user/self?from_tab_name=main&showSubTab=favorite_folder&showTab=favorite_collection",
+    '/aweme/v1/web/mix/list/': "https://www.douyin.com/user/",
+    '/aweme/v1/web/home/search/item/': "https://www.douyin.com/user/",
+    '/aweme/v1/web/seo/inner/link/': "https://www.douyin.com/user/"
+}
+
+
+def register_referer(uri: str, template: str):
+    """注册接口的referer模板，例如 register_referer('/aweme/v1/web/xxx/', 'https://www.douyin.com/video/{aweme_id}')"""
+    REFERER_TEMPLATES[uri] = template
+
+
+class _RefererParams(dict):
+    """格式化referer模板时，缺少的参数和原来的params.get一样替换为None"""
+
+    def __missing__(self, key):
+        return None
 
 
 class Request(object):
     HOST = 'https://www.douyin.com'
     LIVE_HOST = 'https://live.douyin.com'
-    PARAMS = {
+    # 基础参数和请求头是只读的，每次请求在副本上叠加各自的值，多线程共用实例时不会互相影响
+    PARAMS = MappingProxyType({
         'device_platform': 'webapp',
         'aid': '6383',
         'channel': 'channel_pc_web',
@@ -56,8 +106,8 @@ class Request(object):
         # 'fp': '', # from cookie s_v_web_id
         # 'msToken': '',  # from cookie msToken
         # 'a_bogus': '' # sign
-    }
-    HEADERS = {
+    })
+    HEADERS = MappingProxyType({
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36",
         "sec-fetch-site": "same-origin",
         "sec-fetch-mode": "cors",
@@ -72,11 +122,17 @@ class Request(object):
         "accept-language": "zh-CN,zh;q=0.9,en;q=0.8",
         "accept": "application/json, text/plain, */*",
         "dnt": "1",
-    }
+    })
     filepath = os.path.dirname(__file__)
-    SIGN = execjs.compile(
-        open(os.path.join(filepath, '../lib/douyin.js'), 'r', encoding='utf-8').read())
-    WEBID = ''
+    # 签名方式: python 纯Python实现; node 常驻node进程池; execjs 每次签名启动一个node进程
+    SIGN_ENGINE = os.environ.get('DOUYIN_SIGN_ENGINE', 'python')
+    SIGN = None  # execjs编译结果，首次使用时才编译
+    _sign_lock = threading.Lock()
+    WEBID = ''  # 固定使用的webid，为空时从WebidCache读取
+    WEBID_URL = 'https://www.douyin.com/?recommend=1'
+    _flight = SingleFlight()  # 合并同时进行的相同GET请求
+    retry_policy = None  # 为None时使用全局的RetryPolicy
+    _segment_cache = {}  # (UA, 设备参数) -> 固定参数编码后的查询字符串
     client = httpx.Client(
         proxies=None,
         timeout=httpx.Timeout(30.0, connect=10.0),  # 分别设置总超时和连接超时
@@ -85,144 +141,302 @@ class Request(object):
         limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)  # 连接池限制
     )
 
-    def __init__(self, cookie='', UA='', use_rotating_cookies=True):
+    def __init__(self, cookie='', UA='', use_rotating_cookies=True, account_name=None):
         self._cookie = cookie
+        self._bound_name = account_name  # cookie所属的账号，由RequestManager的账号实例池传入
         self._cookies_loaded = False
         self.COOKIES = {}  # 初始化为空，延迟加载
         self.use_rotating_cookies = use_rotating_cookies  # 是否使用轮换cookie
-        self._current_request_rotated = False  # 标记当前请求是否已经轮换过cookie
         
         if UA:  # 如果需要访问搜索页面源码等内容，需要提供cookie对应的UA
             version = UA.split(' Chrome/')[1].split(' ')[0]
             _version = version.split('.')[0]
-            self.HEADERS.update({
+            # 在实例上保存新的副本，不修改类上的基础值
+            self.HEADERS = MappingProxyType({
+                **self.HEADERS,
                 "User-Agent": UA,  # 主要是这个
                 "sec-ch-ua": f'"Chromium";v="{_version}", "Not(A:Brand";v="24", "Google Chrome";v="{_version}"',
             })
-            self.PARAMS.update({
+            self.PARAMS = MappingProxyType({
+                **self.PARAMS,
                 "browser_version": version,
                 "engine_version": version,  # 主要是这个
             })
     
+    @property
+    def COOKIES(self) -> dict:
+        return self._entry['cookies']
+
+    @COOKIES.setter
+    def COOKIES(self, cookies: dict):
+        # cookie、设备参数和账号名保存在同一个条目中整体替换，并发读取时不会拿到不一致的组合
+        self._entry = {'name': self._bound_name, 'cookies': cookies, 'params': cookie_params(cookies)}
+
+    @property
+    def _account_name(self) -> str:
+        """实例自身的cookie所属的账号，不是来自账号管理器也没有指定账号时为None"""
+        return self._entry['name']
+
     def _ensure_cookies_loaded(self, force_reload=False):
-        """确保cookies已经加载
+        """确保实例自身的cookies已经加载
         
         Args:
-            force_reload: 是否强制重新加载cookie（用于轮换cookie）
+            force_reload: 是否强制重新加载cookie
         """
-        # 如果需要轮换cookie，但当前请求已经轮换过，则不再轮换
-        if force_reload and self._current_request_rotated:
-            force_reload = False
-            
         if not self._cookies_loaded or force_reload:
+            if self._bound_name:
+                # 账号实例池中的实例直接使用账号管理器解析好的条目，与轮换选择的账号共用限速、
+                # webid缓存键和健康统计，不再解析cookie字符串，也不写入config目录
+                entry = AccountManager.get_instance().peek_cookie_entry(self._bound_name)
+                if entry is None:
+                    entry = {'name': self._bound_name, 'cookies': {}, 'params': cookie_params({})}
             # 如果没有提供cookie，获取最近未使用的cookie
-            if not self._cookie:
-                self.COOKIES = get_cookie_dict()
-                # logger.debug("获取最近未使用的cookie")
+            elif not self._cookie:
+                entry = get_cookie_entry()
             else:
-                self.COOKIES = get_cookie_dict(self._cookie)
-                # logger.debug("使用提供的cookie")
+                entry = get_cookie_entry(self._cookie)
+            # 账号管理器中的cookie和设备参数都是预先解析好的，这里不再解析字符串
+            self._entry = entry
             self._cookies_loaded = True
-            if force_reload:
-                self._current_request_rotated = True
+
+    def _instance_entry(self) -> dict:
+        """实例自身的cookie条目 {'name', 'cookies', 'params'}，供get_params、sign_many等不经过请求流程的方法使用"""
+        self._ensure_cookies_loaded()
+        return self._entry
+
+    def _rotates(self) -> bool:
+        """没有指定cookie且启用了轮换时，每次请求都从账号管理器选择账号"""
+        return self.use_rotating_cookies and not self._cookie
+
+    def _call_entry(self, track_load: bool = False) -> dict:
+        """本次请求使用的cookie条目
+
+        轮换cookie时每次选择新的账号，条目只在本次调用中传递，不写回实例，
+        同一个实例被多个线程共用时，cookie、设备参数和账号不会互相串用。
+        track_load为True时记录一个正在进行的请求，轮换时在账号管理器选择账号的锁内记录，
+        请求结束后由_record_health结束
+        """
+        if self._rotates():
+            return get_cookie_entry(track_load=track_load)
+        entry = self._instance_entry()
+        if track_load:
+            AccountLoad.get_instance().begin(entry['name'])
+        return entry
+
+    def _entry_id(self, entry: dict) -> str:
+        """条目对应的账号，不是来自账号管理器时使用cookie的摘要，用于限速和webid缓存"""
+        return entry['name'] or self._account_key()
 
     def get_sign(self, uri: str, params: dict) -> dict:
-        query = '&'.join([f'{k}={quote(str(v))}' for k, v in params.items()])
-        call_name = 'sign_datail'
+        query = self._encode_query(params)
+        return self._call_sign(self._sign_call_name(uri), query)
+
+    def sign_many(self, uri: str, params_list: list) -> list:
+        """批量签名，适合预先签好大量分页请求
+
+        Args:
+            uri: 接口路径，同一批次共用
+            params_list: 每个请求自己的参数
+
+        Returns:
+            与params_list等长的列表，每项为补全公共参数并带上a_bogus的新参数字典
+        """
+        entry = self._instance_entry()
+        return self._sign_many(uri, params_list, self.get_webid(entry), entry)
+
+    def _sign_many(self, uri: str, params_list: list, webid: str, entry: dict = None) -> list:
+        entry = entry or self._instance_entry()
+        signed = [self._apply_and_encode(dict(params), webid, entry) for params in params_list]
+        signed_params = [params for params, _ in signed]
+        queries = [query for _, query in signed]
+        call_name = self._sign_call_name(uri)
+        if self.SIGN_ENGINE == 'python':
+            arguments = abogus.ARGUMENTS_REPLY if call_name == 'sign_reply' else abogus.ARGUMENTS_DETAIL
+            a_bogus_list = abogus.sign_many(queries, self.HEADERS.get("User-Agent"), arguments)
+        else:
+            a_bogus_list = [self._call_sign(call_name, query) for query in queries]
+        for params, a_bogus in zip(signed_params, a_bogus_list):
+            params["a_bogus"] = a_bogus
+        return signed_params
+
+    @staticmethod
+    def _encode_query(params: dict) -> str:
+        return '&'.join([f'{k}={quote(str(v))}' for k, v in params.items()])
+
+    def _query_segments(self, entry: dict) -> tuple:
+        """固定参数编码后的查询字符串: (固定参数的键, PARAMS部分, cookie附加参数部分)
+
+        PARAMS和设备参数对同一个UA和账号不变，编码结果按 (UA, 设备参数) 缓存，
+        每次请求只需要编码调用方的参数、msToken和webid
+        """
+        device_params = entry['params']
+        key = (self.HEADERS['User-Agent'],) + tuple(
+            (k, v) for k, v in device_params.items() if k != 'msToken')
+        segments = self._segment_cache.get(key)
+        if segments is None:
+            # 与_apply_params的顺序一致: PARAMS(被设备参数覆盖)、msToken、其他设备参数、webid
+            static = {k: device_params.get(k, v) for k, v in self.PARAMS.items()}
+            extra = {k: v for k, v in device_params.items() if k not in static and k != 'msToken'}
+            keys = frozenset(static).union(extra, ('msToken', 'webid', 'a_bogus'))
+            segments = (keys, self._encode_query(static), self._encode_query(extra))
+            if len(self._segment_cache) >= 1024:
+                self._segment_cache.clear()
+            self._segment_cache[key] = segments
+        return segments
+
+    def _apply_and_encode(self, params: dict, webid: str, entry: dict = None) -> tuple:
+        """补全参数并生成签名用的查询字符串，返回 (参数, 查询字符串)"""
+        entry = entry or self._instance_entry()
+        keys, static_query, extra_query = self._query_segments(entry)
+        if not keys.isdisjoint(params):
+            # 调用方覆盖了公共参数，顺序会变化，完整编码
+            params = self._apply_params(params, webid, entry)
+            return params, self._encode_query(params)
+
+        parts = [self._encode_query(params)] if params else []
+        params = self._apply_params(params, webid, entry)
+        parts.append(static_query)
+        parts.append(f"msToken={quote(str(params['msToken']))}")
+        if extra_query:
+            parts.append(extra_query)
+        parts.append(f'webid={quote(str(webid))}')
+        return params, '&'.join(parts)
+
+    @staticmethod
+    def _sign_call_name(uri: str) -> str:
         if 'reply' in uri:
-            call_name = 'sign_reply'
-        a_bogus = self.SIGN.call(
-            call_name, query, self.HEADERS.get("User-Agent"))
+            return 'sign_reply'
+        return 'sign_datail'
+
+    def _call_sign(self, call_name: str, query: str) -> str:
+        if self.SIGN_ENGINE == 'python':
+            a_bogus = getattr(abogus, call_name)(query, self.HEADERS.get("User-Agent"))
+        elif self.SIGN_ENGINE == 'execjs':
+            a_bogus = self.get_execjs_sign().call(
+                call_name, query, self.HEADERS.get("User-Agent"))
+        else:
+            a_bogus = SignWorkerPool.get_instance().sign(
+                call_name, query, self.HEADERS.get("User-Agent"))
         return a_bogus
 
+    @classmethod
+    def get_execjs_sign(cls):
+        """延迟编译douyin.js，只在使用execjs签名时才需要"""
+        if cls.SIGN is None:
+            with cls._sign_lock:
+                if cls.SIGN is None:
+                    with open(os.path.join(cls.filepath, '../lib/douyin.js'), 'r', encoding='utf-8') as f:
+                        cls.SIGN = execjs.compile(f.read())
+        return cls.SIGN
+
     def get_params(self, params: dict) -> dict:
-        # 只确保cookies已加载，不在这里强制重新加载
-        self._ensure_cookies_loaded()
-        
+        entry = self._instance_entry()
+        return self._apply_params(params, self.get_webid(entry), entry)
+
+    def _apply_params(self, params: dict, webid: str, entry: dict = None) -> dict:
+        """补全公共参数以及从cookie中读取的设备参数"""
+        device_params = (entry or self._instance_entry())['params']
         params.update(self.PARAMS)
-        params['msToken'] = self.get_ms_token()
-        params['screen_width'] = self.COOKIES.get('dy_swidth', 2560)
-        params['screen_height'] = self.COOKIES.get('dy_sheight', 1440)
-        params['cpu_core_num'] = self.COOKIES.get('device_web_cpu_core', 24)
-        params['device_memory'] = self.COOKIES.get('device_web_memory_size', 8)
-        params['verifyFp'] = self.COOKIES.get('s_v_web_id', None)
-        params['fp'] = self.COOKIES.get('s_v_web_id', None)
-        params['webid'] = self.get_webid()
+        # cookie中没有msToken时每次请求随机生成
+        params['msToken'] = device_params.get('msToken') or self._random_ms_token()
+        params.update(device_params)
+        params['webid'] = webid
         return params
 
-    def get_webid(self):
-        if not self.WEBID:
-            try:
-                url = 'https://www.douyin.com/?recommend=1'
-                text = self.getHTML(url, max_retries=2, delay=0.5)  # 减少重试次数和延迟
-                if text:
-                    pattern = r'\\"user_unique_id\\":\\"(\d+)\\"'
-                    match = re.search(pattern, text)
-                    if match:
-                        self.WEBID = match.group(1)
-                        # logger.debug(f'成功获取webid: {self.WEBID}')
-                    else:
-                        logger.warning('未能从页面中解析到webid')
-                else:
-                    logger.warning('获取webid页面内容为空')
-                
-                # 如果仍然没有webid，使用默认值或随机生成
-                if not self.WEBID:
-                    self.WEBID = str(random.randint(1000000000000000000, 9999999999999999999))
-                    logger.info(f'使用随机生成的webid: {self.WEBID}')
-            except Exception as e:
-                logger.error(f'获取webid时发生错误: {e}')
-                # 使用随机webid作为fallback
-                self.WEBID = str(random.randint(1000000000000000000, 9999999999999999999))
-                logger.info(f'获取webid失败，使用随机webid: {self.WEBID}')
-        
-        return self.WEBID
+    def _signed_params(self, uri: str, params: dict, webid: str, entry: dict = None) -> dict:
+        """补全参数并计算a_bogus"""
+        params, query = self._apply_and_encode(params, webid, entry)
+        params["a_bogus"] = self._call_sign(self._sign_call_name(uri), query)
+        return params
+
+    def get_webid(self, entry: dict = None):
+        """从缓存读取webid，没有缓存或快过期时在后台线程中抓取首页
+
+        Args:
+            entry: 使用的cookie条目，默认为实例自身的cookie
+        """
+        if self.WEBID:
+            return self.WEBID
+        # 先确定账号再计算缓存键，后台抓取也使用同一个条目，
+        # 轮换cookie时不会用其他账号的cookie抓取并写到这个账号的键下
+        entry = entry or self._instance_entry()
+        cache = WebidCache.get_instance()
+        key = self._webid_key(entry)
+        webid, stale = cache.lookup(key)
+        if stale:
+            cache.refresh(key, lambda: self._fetch_webid(entry))
+        return webid
+
+    def _webid_key(self, entry: dict = None) -> str:
+        """webid缓存键，按账号和UA区分"""
+        return WebidCache.make_key(self._entry_id(entry or self._instance_entry()), self.HEADERS['User-Agent'])
+
+    def _fetch_webid(self, entry: dict) -> str:
+        text = self.getHTML(self.WEBID_URL, max_retries=2, delay=0.5, entry=entry)  # 减少重试次数和延迟
+        return self._parse_webid(text)
+
+    @staticmethod
+    def _parse_webid(text: str) -> str:
+        """从首页源码中解析webid，解析不到时返回空字符串"""
+        webid = ''
+        if text:
+            pattern = r'\\"user_unique_id\\":\\"(\d+)\\"'
+            match = re.search(pattern, text)
+            if match:
+                webid = match.group(1)
+                # logger.debug(f'成功获取webid: {webid}')
+            else:
+                logger.warning('未能从页面中解析到webid')
+        else:
+            logger.warning('获取webid页面内容为空')
+        return webid
+
+    @staticmethod
+    def _random_webid() -> str:
+        return WebidCache.random_webid()
 
     def get_ms_token(self, randomlength=120):
         """
         返回cookie中的msToken或随机字符串
         """
-        # 只确保cookies已加载，不在这里强制重新加载
-        self._ensure_cookies_loaded()
-        
-        ms_token = self.COOKIES.get('msToken', None)
-        if not ms_token:
-            ms_token = ''
-            base_str = 'ABCDEFGHIGKLMNOPQRSTUVWXYZabcdefghigklmnopqrstuvwxyz0123456789='
-            length = len(base_str) - 1
-            for _ in range(randomlength):
-                ms_token += base_str[random.randint(0, length)]
-        return ms_token
-
-    def getHTML(self, url, max_retries=3, delay=1) -> str:
-        # 重置当前请求的轮换标记
-        self._current_request_rotated = False
-        
+        return self._instance_entry()['cookies'].get('msToken') or self._random_ms_token(randomlength)
+
+    @staticmethod
+    def _random_ms_token(randomlength=120) -> str:
+        base_str = 'ABCDEFGHIGKLMNOPQRSTUVWXYZabcdefghigklmnopqrstuvwxyz0123456789='
+        length = len(base_str) - 1
+        return ''.join(base_str[random.randint(0, length)] for _ in range(randomlength))
+
+    def getHTML(self, url, max_retries=3, delay=1, entry: dict = None) -> str:
         # 如果启用了轮换cookie，每次请求都使用新cookie
-        if self.use_rotating_cookies and not self._cookie:
-            self._ensure_cookies_loaded(force_reload=True)
-        else:
-            self._ensure_cookies_loaded()  # 确保cookies已加载
+        if entry is None:
+            entry = self._call_entry()
+        cookies = entry['cookies']
         
         headers = self.HEADERS.copy()
         headers['sec-fetch-dest'] = 'document'
         
+        policy = self._retry_policy()
+        policy.begin()
         for attempt in range(max_retries):
             try:
-                response = self.client.get(url, headers=headers, cookies=self.COOKIES)
+                response = self.client.get(url, headers=headers, cookies=cookies)
                 if response.status_code != 200 or response.text == '':
                     logger.error(f'HTML请求失败, url: {url}, status: {response.status_code}, attempt: {attempt + 1}')
-                    if attempt < max_retries - 1:
-                        time.sleep(delay * (attempt + 1))  # 递增延迟
+                    # 只有429和5xx重试，200但响应为空通常是cookie或签名失效，重试也没有用
+                    wait = policy.delay_for_status(attempt, max_retries, delay, response.status_code)
+                    if wait is not None:
+                        time.sleep(wait)  # 指数退避加随机抖动
                         continue
                     return ''
                 return response.text
             except (httpx.RemoteProtocolError, httpx.ConnectError, httpx.TimeoutException) as e:
                 logger.warning(f'HTML请求网络错误, url: {url}, error: {e}, attempt: {attempt + 1}')
-                if attempt < max_retries - 1:
-                    time.sleep(delay * (attempt + 1))  # 递增延迟
+                wait = policy.next_delay(attempt, max_retries, delay, type(e).__name__)
+                if wait is not None:
+                    time.sleep(wait)  # 指数退避加随机抖动
                     continue
-                logger.error(f'HTML请求最终失败, url: {url}, 已重试 {max_retries} 次')
+                logger.error(f'HTML请求最终失败, url: {url}, 共请求 {attempt + 1} 次')
                 return ''
             except Exception as e:
                 logger.error(f'HTML请求未知错误, url: {url}, error: {e}')
@@ -230,71 +444,150 @@ class Request(object):
         
         return ''
 
+    @staticmethod
+    def _referer_for(uri: str, params: dict):
+        """部分接口必须把referer改为当前请求页面的url，其他接口返回None"""
+        template = REFERER_TEMPLATES.get(uri)
+        if template is None or '{' not in template:
+            return template
+        return template.format_map(_RefererParams(params))
+
+    def _json_headers(self, uri: str, params: dict, data: dict = None) -> dict:
+        """本次请求使用的headers: 基础请求头加上接口相关的值"""
+        headers = self.HEADERS.copy()
+        # 部分接口必须更改referer的值为当前请求页面的url
+        referer = self._referer_for(uri, params)
+        if referer is not None:
+            headers['referer'] = referer
+        if data:
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+            # headers["Bd-Ticket-Guard-Client-Data"] = self.COOKIES.get("bd_ticket_guard_client_data", None)
+            # headers["Bd-Ticket-Guard-Web-Version"] = '1'
+            # headers["Bd-Ticket-Guard-Version"] = '2'
+            # headers["Bd-Ticket-Guard-Iteration-Version"] = '1'
+            headers["X-Secsdk-Csrf-Token"] = ''
+        return headers
+
+    def _retry_policy(self) -> RetryPolicy:
+        """重试策略，实例或子类可以通过retry_policy属性指定自己的策略"""
+        return self.retry_policy or RetryPolicy.get_instance()
+
+    def _account_key(self) -> str:
+        """区分缓存所属的账号，使用轮换cookie的实例共用同一个键"""
+        if not self._cookie:
+            return ''
+        return hashlib.md5(self._cookie.encode('utf-8')).hexdigest()
+
+    def _request_key(self, uri: str, params: dict, live=None) -> tuple:
+        """相同的key对应相同的上游GET请求: (地址, 排序后的参数, 账号)"""
+        host = self.LIVE_HOST if live else self.HOST
+        return ResponseCache.make_key(f'{host}{uri}', params, self._account_key())
+
+    @staticmethod
+    def _cache_lookup(uri: str, key: tuple, live=None):
+        """查询响应缓存，返回 (有效期, 缓存结果)，不缓存的接口有效期为None"""
+        cache = ResponseCache.get_instance()
+        ttl = None if live else cache.ttl_for(uri)
+        return ttl, cache.get(key) if ttl else None
+
+    @staticmethod
+    def _cache_store(key, ttl, result):
+        """只缓存成功的响应"""
+        if ttl and isinstance(result, dict) and result and result.get('status_code', 0) == 0:
+            ResponseCache.get_instance().set(key, result, ttl)
+
+    @classmethod
+    def flight_stats(cls) -> dict:
+        """请求合并统计"""
+        return cls._flight.stats()
+
+    @staticmethod
+    def _record_health(account: str, started: float, result):
+        """记录账号管理器中账号的请求耗时和结果，失败率过高的账号会被熔断
+
+        result为None表示没有得到上游的响应（调用方取消、生成器关闭或签名等本地错误），
+        只结束正在进行的请求计数，不计入熔断统计；网络错误由_send_json返回空字典，仍然算作失败
+        """
+        if not account:
+            return
+        AccountLoad.get_instance().end(account, started)
+        if result is None:
+            return
+        success = isinstance(result, dict) and bool(result) and result.get('status_code', 0) == 0
+        CircuitBreakerRegistry.get_instance().record(account, success)
+
+    @staticmethod
+    def _copy_json(result):
+        """复制共享的响应，避免调用方互相影响"""
+        return json.loads(json.dumps(result))
+
     def getJSON(self, uri: str, params: dict, data: dict = None, live=None, max_retries=3, delay=1):
-        # 重置当前请求的轮换标记
-        self._current_request_rotated = False
-        
-        # 如果启用了轮换cookie，每次请求都使用新cookie
-        if self.use_rotating_cookies and not self._cookie:
-            self._ensure_cookies_loaded(force_reload=True)
-        else:
-            self._ensure_cookies_loaded()  # 确保cookies已加载
+        if data:
+            return self._fetch_json(uri, params, data, live, max_retries, delay)
+
+        key = self._request_key(uri, params, live)
+        # 幂等的GET接口先查缓存，命中时跳过签名和网络请求
+        ttl, cached = self._cache_lookup(uri, key, live)
+        if cached is not None:
+            return cached
+        # 相同的请求正在进行时等待它的结果，不再重复签名和请求
+        result, shared = self._flight.do(key, self._fetch_and_cache, uri, params, live, max_retries, delay, key, ttl)
+        return self._copy_json(result) if shared else result
+
+    def _fetch_and_cache(self, uri: str, params: dict, live, max_retries, delay, key: tuple, ttl):
+        result = self._fetch_json(uri, params, None, live, max_retries, delay)
+        self._cache_store(key, ttl, result)
+        return result
+
+    def _fetch_json(self, uri: str, params: dict, data: dict = None, live=None, max_retries=3, delay=1):
+        # 如果启用了轮换cookie，每次请求都使用新cookie，选择账号时已经记录为正在进行的请求
+        entry = self._call_entry(track_load=True)
         
+        # 记录本次使用的账号的耗时和请求结果
+        account = entry['name']
+        started = time.monotonic()
+        # 请求被取消或者发出前出错时保持为None，不计入账号的失败
+        result = None
+        try:
+            result = self._send_json(entry, uri, params, data, live, max_retries, delay)
+            return result
+        finally:
+            self._record_health(account, started, result)
+
+    def _send_json(self, entry: dict, uri: str, params: dict, data: dict = None, live=None, max_retries=3, delay=1):
+        """使用entry中的cookie签名并发送请求，失败时按重试策略重试"""
         url = f'{self.HOST}{uri}'
         live_url = f'{self.LIVE_HOST}{uri}'
-        params = self.get_params(params)
-        params["a_bogus"] = self.get_sign(uri, params)
-
-        # 这个接口必须更改referer的值为当前请求页面的url
-        referer_map = {
-            '/aweme/v1/web/aweme/related/': f"https://www.douyin.com/video/{params.get('aweme_id')}",
-            '/aweme/v1/web/comment/list/': f"https://www.douyin.com/video/{params.get('aweme_id')}",
-            '/aweme/v1/web/comment/list/reply/': f"https://www.douyin.com/video/{params.get('item_id')}",
-            '/aweme/v1/web/user/profile/other/': f"https://www.douyin.com/user/{params.get('sec_user_id')}?",
-            '/aweme/v1/web/aweme/post/': f"https://www.douyin.com/user/{params.get('sec_user_id')}?",
-            '/aweme/v1/web/im/spotlight/relation/': f"https://www.douyin.com/user/",
-            '/aweme/v1/web/user/following/list/': f"https://www.douyin.com/user/",
-            '/aweme/v1/web/user/follower/list/': f"https://www.douyin.com/user/",
-            '/aweme/v1/web/aweme/favorite/': f"https://www.douyin.com/user/",
-            '/aweme/v1/web/aweme/listcollection/': f"https://www.douyin.com/user/self?from_tab_name=main&showTab=favorite_collection",
-            '/aweme/v1/web/music/listcollection/': f"https://www.douyin.com/user/self?from_tab_name=main&showSubTab=music&showTab=favorite_collection",
-            '/aweme/v1/web/collects/video/list/': f"https://www.douyin.com/user/self?from_tab_name=main&showSubTab=favorite_folder&showTab=favorite_collection",
-            '/aweme/v1/web/collects/list/': f"https://www.douyin.com/user/self?from_tab_name=main&showSubTab=favorite_folder&showTab=favorite_collection",
-            '/aweme/v1/web/mix/listcollection/': f"https://www.douyin.com/user/self?from_tab_name=main&showSubTab=favorite_folder&showTab=favorite_collection",
-            '/aweme/v1/web/series/collections': f"https://www.douyin.com/user/self?from_tab_name=main&showSubTab=favorite_folder&showTab=favorite_collection",
-            '/aweme/v1/web/mix/list/': f"https://www.douyin.com/user/",
-            '/aweme/v1/web/home/search/item/': f"https://www.douyin.com/user/",
-            '/aweme/v1/web/seo/inner/link/': f"https://www.douyin.com/user/"
-        }
-        for pattern, referer_value in referer_map.items():
-            if pattern == uri:
-                self.HEADERS['referer'] = referer_value
-                break
-        
+        params = self._signed_params(uri, params, self.get_webid(entry), entry)
+
+        headers = self._json_headers(uri, params, data)
+        cookies = entry['cookies']
+        account_id = self._entry_id(entry)
+
+        limiter = RateLimiter.get_instance()
+        policy = self._retry_policy()
+        policy.begin()
         # 重试机制
         for attempt in range(max_retries):
+            # 按账号和接口限速，令牌不足时排队等待
+            limiter.acquire(account_id, uri)
             try:
                 if data:
-                    bd_client_data = self.COOKIES.get("bd_ticket_guard_client_data", None)
-                    self.HEADERS["Content-Type"] = "application/x-www-form-urlencoded"
-                    # self.HEADERS["Bd-Ticket-Guard-Client-Data"] = bd_client_data
-                    # self.HEADERS["Bd-Ticket-Guard-Web-Version"] = '1'
-                    # self.HEADERS["Bd-Ticket-Guard-Version"] = '2'
-                    # self.HEADERS["Bd-Ticket-Guard-Iteration-Version"] = '1'
-                    self.HEADERS["X-Secsdk-Csrf-Token"] = ''
                     response = self.client.post(
-                        url, params=params, data=data, headers=self.HEADERS, cookies=self.COOKIES)
+                        url, params=params, data=data, headers=headers, cookies=cookies)
                 elif live:
                     response = self.client.get(
-                        live_url, params=params, headers=self.HEADERS, cookies=self.COOKIES)
+                        live_url, params=params, headers=headers, cookies=cookies)
                 else:
                     response = self.client.get(
-                        url, params=params, headers=self.HEADERS, cookies=self.COOKIES)
+                        url, params=params, headers=headers, cookies=cookies)
                 
                 if response.status_code != 200 or response.text == '':
                     logger.error(f'JSON请求失败：url: {url}, status: {response.status_code}, attempt: {attempt + 1}')
-                    if attempt < max_retries - 1:
-                        time.sleep(delay * (attempt + 1))  # 递增延迟
+                    # 只有429和5xx重试，200但响应为空通常是cookie或签名失效，重试也没有用
+                    wait = policy.delay_for_status(attempt, max_retries, delay, response.status_code)
+                    if wait is not None:
+                        time.sleep(wait)  # 指数退避加随机抖动
                         continue
                     return {}
                 
@@ -302,10 +595,11 @@ class Request(object):
                 
             except (httpx.RemoteProtocolError, httpx.ConnectError, httpx.TimeoutException) as e:
                 logger.warning(f'JSON请求网络错误：url: {url}, error: {e}, attempt: {attempt + 1}')
-                if attempt < max_retries - 1:
-                    time.sleep(delay * (attempt + 1))  # 递增延迟
+                wait = policy.next_delay(attempt, max_retries, delay, type(e).__name__)
+                if wait is not None:
+                    time.sleep(wait)  # 指数退避加随机抖动
                     continue
-                logger.error(f'JSON请求最终失败：url: {url}, 已重试 {max_retries} 次')
+                logger.error(f'JSON请求最终失败：url: {url}, 共请求 {attempt + 1} 次')
                 return {}
             except Exception as e:
                 logger.error(f'JSON请求未知错误：url: {url}, error: {e}')
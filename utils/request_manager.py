@@ -3,14 +3,29 @@
 支持多账号管理
 """
 
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from utils.account_manager import AccountManager
 from utils.request import Request
 from typing import Dict, Optional
 
 
 class RequestManager:
-    """请求管理器，管理不同账号的请求实例"""
+    """请求管理器，管理不同账号的请求实例
+    
+    按账号缓存常驻的Request实例，保留webid、解析好的cookie等状态，
+    实例数量有上限，长时间未使用的实例会被淘汰，账号cookie变化时重新创建
+    """
     
     _instances: Dict[str, Request] = {}
+    # (Request类, 账号名) -> [实例, 创建时的cookie, 最后使用时间]，按最近使用排序
+    _account_pool: OrderedDict = OrderedDict()
+    _pool_lock = threading.Lock()
+    max_pool_size = int(os.environ.get('DOUYIN_REQUEST_POOL_SIZE', 256))
+    idle_timeout = float(os.environ.get('DOUYIN_REQUEST_IDLE_TIMEOUT', 600))
     
     @classmethod
     def get_request(cls, cookie: str = '', UA: str = '', use_rotating_cookies: bool = False) -> Request:
@@ -45,10 +60,67 @@ class RequestManager:
         """
         return cls.get_request(cookie='', UA=UA, use_rotating_cookies=True)
     
+    @classmethod
+    def get_account_request(cls, account_name: str, request_cls=Request) -> Optional[Request]:
+        """获取账号对应的常驻请求实例
+        
+        Args:
+            account_name: 账号名称
+            request_cls: Request或AsyncRequest
+            
+        Returns:
+            请求实例，账号不存在时返回None
+        """
+        cookie = AccountManager.get_instance().get_cookie(account_name)
+        if not cookie:
+            return None
+        
+        key = (request_cls, account_name)
+        now = time.monotonic()
+        with cls._pool_lock:
+            cls._evict_idle(now)
+            slot = cls._account_pool.get(key)
+            if slot is not None and slot[1] == cookie:
+                slot[2] = now
+                cls._account_pool.move_to_end(key)
+                return slot[0]
+        
+        # 首次使用或者账号的cookie已更新，在锁外创建新实例，cookie条目取自账号管理器
+        instance = request_cls(cookie=cookie, use_rotating_cookies=False, account_name=account_name)
+        with cls._pool_lock:
+            slot = cls._account_pool.get(key)
+            if slot is not None and slot[1] == cookie:
+                # 其他线程已经创建了相同的实例
+                instance = slot[0]
+            else:
+                slot = [instance, cookie, now]
+                cls._account_pool[key] = slot
+            slot[2] = now
+            cls._account_pool.move_to_end(key)
+            while len(cls._account_pool) > cls.max_pool_size:
+                cls._account_pool.popitem(last=False)
+            return instance
+    
+    @classmethod
+    def _evict_idle(cls, now: float):
+        """淘汰长时间未使用的实例，池按最近使用排序，只需从头部检查"""
+        while cls._account_pool:
+            key, slot = next(iter(cls._account_pool.items()))
+            if now - slot[2] < cls.idle_timeout:
+                break
+            del cls._account_pool[key]
+    
+    @classmethod
+    def pool_size(cls) -> int:
+        """当前常驻的账号实例数"""
+        return len(cls._account_pool)
+    
     @classmethod
     def clear_instances(cls):
         """清理所有实例"""
         cls._instances.clear()
+        with cls._pool_lock:
+            cls._account_pool.clear()
     
     @classmethod
     def get_default_request(cls) -> Request:
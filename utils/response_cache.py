@@ -0,0 +1,119 @@
+"""
+上游接口响应缓存
+只缓存幂等的GET接口，按接口配置不同的有效期，超出容量时淘汰最久未使用的条目。
+命中缓存时不需要签名也不需要发送请求
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import ujson as json
+
+# 接口 -> 缓存有效期（秒），未列出的接口不缓存
+DEFAULT_TTLS = {
+    '/aweme/v1/web/emoji/list': 3600,
+    '/aweme/v1/web/home/channel/setting/': 3600,
+    '/aweme/v1/web/seo/inner/link/': 600,
+    '/aweme/v1/web/hot/search/list/': 60,
+    '/aweme/v1/web/aweme/detail/': 60,
+}
+
+
+class ResponseCache:
+    """带有效期的LRU缓存"""
+
+    _instance = None
+    _max_size = None
+    _lock = threading.Lock()
+
+    def __init__(self, max_size: int = None, ttls: dict = None):
+        """
+        Args:
+            max_size: 最多缓存的条目数，默认读取环境变量 DOUYIN_CACHE_SIZE，否则为1024，0表示关闭缓存
+            ttls: 接口 -> 有效期（秒），默认使用DEFAULT_TTLS
+        """
+        if max_size is None:
+            max_size = int(os.environ.get('DOUYIN_CACHE_SIZE', 1024))
+        self.max_size = max_size
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self._entries = OrderedDict()  # key -> (过期时间, 序列化后的响应)
+        self._entries_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def initialize(cls, max_size: int = None, ttls: dict = None):
+        """初始化单例实例"""
+        cls._instance = cls(max_size, ttls)
+        cls._max_size = max_size
+        return cls._instance
+
+    @classmethod
+    def get_instance(cls) -> 'ResponseCache':
+        """获取单例实例"""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls(cls._max_size)
+        return cls._instance
+
+    def ttl_for(self, uri: str) -> Optional[float]:
+        """接口的缓存有效期，不缓存的接口返回None"""
+        if self.max_size <= 0:
+            return None
+        return self.ttls.get(uri)
+
+    @staticmethod
+    def make_key(uri: str, params: dict, account: str = '') -> tuple:
+        """缓存键: (接口, 排序后的参数, 账号)"""
+        return uri, tuple(sorted((str(k), str(v)) for k, v in params.items())), account
+
+    def get(self, key: tuple):
+        """读取缓存，未命中或已过期时返回None，每次返回独立的对象"""
+        with self._entries_lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                payload = entry[1]
+            else:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+        return json.loads(payload)
+
+    def set(self, key: tuple, value, ttl: float):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        if self.max_size <= 0:
+            return
+        # 保存序列化后的结果，避免调用方修改返回值影响缓存内容
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._entries_lock:
+            self._entries[key] = (time.monotonic() + ttl, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """清空缓存"""
+        with self._entries_lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """缓存统计信息"""
+        with self._entries_lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxSize': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hitRate': round(self.hits / total, 4) if total else 0.0
+            }
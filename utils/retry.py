@@ -0,0 +1,121 @@
+"""
+上游请求的重试策略
+只在网络错误和可重试的状态码（429、5xx）时重试，等待时间为指数退避加全抖动。
+所有请求共用一个重试预算：每个新请求存入一部分额度，每次重试消耗1，
+上游大面积故障时重试次数被限制在请求量的一定比例内，不会成倍放大流量
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+class RetryPolicy:
+    """指数退避+全抖动，带进程级重试预算"""
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, budget_ratio: float = None, min_per_second: float = 1.0,
+                 max_budget: float = 20.0, max_delay: float = 30.0,
+                 retryable_status: frozenset = RETRYABLE_STATUS):
+        """
+        Args:
+            budget_ratio: 每个新请求存入的重试额度，默认读取环境变量 DOUYIN_RETRY_BUDGET_RATIO，否则为0.2，
+                即重试次数最多约为请求数的20%
+            min_per_second: 每秒固定补充的额度，保证请求量很小时也能重试
+            max_budget: 额度上限
+            max_delay: 单次等待的上限（秒）
+            retryable_status: 可以重试的HTTP状态码
+        """
+        if budget_ratio is None:
+            budget_ratio = float(os.environ.get('DOUYIN_RETRY_BUDGET_RATIO', 0.2))
+        self.budget_ratio = budget_ratio
+        self.min_per_second = min_per_second
+        self.max_budget = max_budget
+        self.max_delay = max_delay
+        self.retryable_status = retryable_status
+        self._budget = max_budget
+        self._updated = time.monotonic()
+        self._budget_lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.exhausted = 0  # 因预算不足放弃重试的次数
+        self.reasons = {}  # 重试原因 -> 次数
+
+    @classmethod
+    def initialize(cls, budget_ratio: float = None, **kwargs):
+        """初始化单例实例"""
+        cls._instance = cls(budget_ratio, **kwargs)
+        return cls._instance
+
+    @classmethod
+    def get_instance(cls) -> 'RetryPolicy':
+        """获取单例实例"""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def _refill(self, deposit: float = 0.0):
+        now = time.monotonic()
+        self._budget = min(self.max_budget,
+                           self._budget + (now - self._updated) * self.min_per_second + deposit)
+        self._updated = now
+
+    def begin(self):
+        """开始一个新请求，存入重试额度"""
+        with self._budget_lock:
+            self.requests += 1
+            self._refill(self.budget_ratio)
+
+    def is_retryable_status(self, status_code: int) -> bool:
+        return status_code in self.retryable_status
+
+    def backoff(self, attempt: int, delay: float) -> float:
+        """第attempt次失败后的等待时间: [0, min(上限, delay * 2^attempt)] 内均匀随机"""
+        return random.uniform(0, min(self.max_delay, delay * (2 ** attempt)))
+
+    def next_delay(self, attempt: int, max_retries: int, delay: float, reason) -> Optional[float]:
+        """第attempt次（从0开始）请求失败后，返回重试前需要等待的秒数，不再重试时返回None
+
+        Args:
+            attempt: 已失败的请求序号
+            max_retries: 最多请求的次数
+            delay: 退避的基础时间（秒）
+            reason: 失败原因，状态码或者异常名称，用于统计
+        """
+        if attempt >= max_retries - 1:
+            return None
+        with self._budget_lock:
+            self._refill()
+            if self._budget < 1:
+                self.exhausted += 1
+                return None
+            self._budget -= 1
+            self.retries += 1
+            self.reasons[str(reason)] = self.reasons.get(str(reason), 0) + 1
+        return self.backoff(attempt, delay)
+
+    def delay_for_status(self, attempt: int, max_retries: int, delay: float, status_code: int) -> Optional[float]:
+        """响应状态码异常时的重试等待时间，不可重试的状态码（包括200但响应为空）返回None"""
+        if not self.is_retryable_status(status_code):
+            return None
+        return self.next_delay(attempt, max_retries, delay, status_code)
+
+    def stats(self) -> dict:
+        """重试统计信息"""
+        with self._budget_lock:
+            self._refill()
+            return {
+                'requests': self.requests,
+                'retries': self.retries,
+                'exhausted': self.exhausted,
+                'budget': round(self._budget, 2),
+                'reasons': dict(self.reasons)
+            }
@@ -0,0 +1,198 @@
+"""
+Node.js签名进程池
+每个常驻的node进程只加载一次douyin.js，通过管道按行接收签名任务，
+避免execjs每次签名都重新启动node并重新解析整个js文件
+"""
+
+import atexit
+import itertools
+import os
+import queue
+import shutil
+import subprocess
+import threading
+
+import ujson as json
+from loguru import logger
+
+LIB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib')
+
+
+class SignError(RuntimeError):
+    """签名失败"""
+
+
+class SignTimeoutError(SignError):
+    """签名超时"""
+
+
+class _SignWorker:
+    """单个node签名进程"""
+
+    def __init__(self, index: int, node: str, js_path: str):
+        self.index = index
+        self.node = node
+        self.js_path = js_path
+        self.proc = None
+        self._responses = None
+        self._ids = itertools.count(1)
+        self.start()
+
+    def start(self):
+        """启动node进程以及读取stdout的线程"""
+        self.proc = subprocess.Popen(
+            [self.node, os.path.join(LIB_PATH, 'sign_worker.js'), self.js_path],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            encoding='utf-8',
+            bufsize=1,
+        )
+        # 每个进程一个独立的响应队列，重启后旧线程写入的是旧队列，不会串包
+        responses = queue.Queue()
+        self._responses = responses
+        threading.Thread(target=self._read_loop, args=(self.proc, responses),
+                         name=f'sign-worker-{self.index}', daemon=True).start()
+
+    @staticmethod
+    def _read_loop(proc, responses: queue.Queue):
+        try:
+            for line in proc.stdout:
+                responses.put(line)
+        except Exception:
+            pass
+        finally:
+            # None表示进程已退出
+            responses.put(None)
+
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def stop(self):
+        if self.proc is None:
+            return
+        try:
+            self.proc.kill()
+            self.proc.wait(timeout=1)
+        except Exception:
+            pass
+        self.proc = None
+
+    def restart(self):
+        logger.warning(f'重启签名进程 #{self.index}')
+        self.stop()
+        self.start()
+
+    def call(self, fn: str, args: list, timeout: float):
+        """发送一个任务并等待结果
+
+        Raises:
+            SignTimeoutError: 超时未返回
+            BrokenPipeError: 进程已退出
+            SignError: js执行出错
+        """
+        job_id = next(self._ids)
+        self.proc.stdin.write(json.dumps({'id': job_id, 'fn': fn, 'args': args}) + '\n')
+        self.proc.stdin.flush()
+
+        while True:
+            try:
+                line = self._responses.get(timeout=timeout)
+            except queue.Empty:
+                raise SignTimeoutError(f'签名进程 #{self.index} 超过 {timeout} 秒未返回')
+            if line is None:
+                raise BrokenPipeError(f'签名进程 #{self.index} 已退出')
+            reply = json.loads(line)
+            if reply.get('id') != job_id:
+                continue
+            if 'error' in reply:
+                raise SignError(reply['error'])
+            return reply.get('result')
+
+
+class SignWorkerPool:
+    """node签名进程池
+
+    Args:
+        size: 进程数，默认读取环境变量 DOUYIN_SIGN_WORKERS，否则取 min(4, CPU核数)
+        timeout: 单次签名的超时时间（秒），超时的进程会被杀掉并重启
+        js_path: 签名脚本路径，默认 lib/douyin.js
+        node: node可执行文件路径
+    """
+
+    _instance = None
+    _size = None
+    _timeout = None
+    _lock = threading.Lock()
+
+    def __init__(self, size: int = None, timeout: float = None, js_path: str = None, node: str = None):
+        self.size = size or int(os.environ.get('DOUYIN_SIGN_WORKERS', 0)) or min(4, os.cpu_count() or 1)
+        self.timeout = timeout or float(os.environ.get('DOUYIN_SIGN_TIMEOUT', 5))
+        self.js_path = os.path.abspath(js_path or os.path.join(LIB_PATH, 'douyin.js'))
+        self.node = node or shutil.which('node') or shutil.which('nodejs')
+        if not self.node:
+            raise SignError('未找到node运行时，无法启动签名进程池')
+
+        self._idle = queue.Queue()
+        self._workers = []
+        for index in range(self.size):
+            worker = _SignWorker(index, self.node, self.js_path)
+            self._workers.append(worker)
+            self._idle.put(worker)
+        self._closed = False
+        logger.info(f'签名进程池已启动，进程数: {self.size}')
+
+    @classmethod
+    def initialize(cls, size: int = None, timeout: float = None):
+        """设置进程池参数，实际进程在第一次签名时才启动"""
+        if cls._instance is not None:
+            cls._instance.shutdown()
+            cls._instance = None
+        cls._size = size
+        cls._timeout = timeout
+
+    @classmethod
+    def get_instance(cls) -> 'SignWorkerPool':
+        """获取单例实例"""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls(cls._size, cls._timeout)
+                    atexit.register(cls._instance.shutdown)
+        return cls._instance
+
+    def call(self, fn: str, *args):
+        """在空闲进程上执行js函数，进程崩溃时重启并重试一次"""
+        if self._closed:
+            raise SignError('签名进程池已关闭')
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise SignTimeoutError(f'等待空闲签名进程超过 {self.timeout} 秒')
+
+        try:
+            for attempt in range(2):
+                if not worker.alive():
+                    worker.restart()
+                try:
+                    return worker.call(fn, list(args), self.timeout)
+                except SignTimeoutError:
+                    # 卡住的进程无法继续使用，直接重启
+                    worker.restart()
+                    raise
+                except (BrokenPipeError, OSError, ValueError) as e:
+                    logger.warning(f'签名进程 #{worker.index} 异常: {e}, attempt: {attempt + 1}')
+                    worker.restart()
+            raise SignError(f'签名进程 #{worker.index} 连续崩溃')
+        finally:
+            self._idle.put(worker)
+
+    def sign(self, call_name: str, query: str, user_agent: str) -> str:
+        """计算a_bogus，call_name为 sign_datail 或 sign_reply"""
+        return self.call(call_name, query, user_agent)
+
+    def shutdown(self):
+        """关闭所有node进程"""
+        self._closed = True
+        for worker in self._workers:
+            worker.stop()
+
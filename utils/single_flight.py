@@ -0,0 +1,123 @@
+"""
+请求合并
+相同key的调用同时进行时只执行一次，其他调用等待并共享同一个结果。
+用于合并并发的相同上游请求，减少签名计算和上游的限流压力
+"""
+
+import asyncio
+import threading
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error', 'dups')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.dups = 0
+
+
+class SingleFlight:
+    """线程版本的请求合并"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0  # 实际执行的次数
+        self.shared = 0  # 等待并共享结果的次数
+
+    def do(self, key, fn, *args, **kwargs):
+        """执行fn，相同key正在执行时等待其结果
+
+        Returns:
+            (结果, 是否与其他调用共享)，共享的结果在修改前需要先复制
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.dups += 1
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result, call.dups > 0
+
+    def stats(self) -> dict:
+        return {
+            'inFlight': len(self._calls),
+            'executed': self.executed,
+            'shared': self.shared
+        }
+
+
+class AsyncSingleFlight:
+    """协程版本的请求合并，只能在同一个事件循环中使用"""
+
+    def __init__(self):
+        self._calls = {}  # key -> [task, 调用数, 仍在等待的调用数]
+        self.executed = 0
+        self.shared = 0
+        self.cancelled = 0  # 所有等待者都被取消而中止的请求数
+
+    async def do(self, key, fn, *args, **kwargs):
+        """执行协程函数fn，返回值同SingleFlight.do
+
+        实际请求在独立的task中执行，某个调用方被取消不会影响其他等待者，
+        最后一个等待者也被取消时中止实际请求，不再继续请求上游
+        """
+        call = self._calls.get(key)
+        if call is not None:
+            call[1] += 1
+            self.shared += 1
+        else:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            call = [task, 1, 0]
+            self._calls[key] = call
+            self.executed += 1
+            task.add_done_callback(lambda _: self._forget(key, call))
+
+        call[2] += 1
+        try:
+            result = await asyncio.shield(call[0])
+        except asyncio.CancelledError:
+            if call[2] == 1 and not call[0].done():
+                # 之后相同key的调用重新发起请求，不等待正在取消的task
+                self._forget(key, call)
+                call[0].cancel()
+                self.cancelled += 1
+            raise
+        finally:
+            call[2] -= 1
+        return result, call[1] > 1
+
+    def _forget(self, key, call: list):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        return {
+            'inFlight': len(self._calls),
+            'executed': self.executed,
+            'shared': self.shared,
+            'cancelled': self.cancelled
+        }
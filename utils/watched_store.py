@@ -0,0 +1,134 @@
+"""
+已观看视频存储
+使用sqlite保存 (user_account, video_id) 的已看记录，主键即索引，
+百万级记录下单次查询仍然只是一次B树查找。
+开启WAL后读写互不阻塞，每个线程使用独立的连接
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional, Set
+
+from loguru import logger
+
+# sqlite单条语句的参数数量有上限，IN查询和批量写入按块执行
+CHUNK_SIZE = 500
+
+
+class WatchedStore:
+    """已观看视频存储"""
+
+    _instance = None
+    _data_path = None
+
+    def __init__(self, data_path: str = 'data'):
+        self.data_path = data_path
+        self.db_file = os.path.join(data_path, 'watched.db')
+        self._local = threading.local()
+        os.makedirs(data_path, exist_ok=True)
+        self._create_table()
+
+    @classmethod
+    def initialize(cls, data_path: str = 'data'):
+        """初始化单例实例"""
+        cls._instance = cls(data_path)
+        cls._data_path = data_path
+        return cls._instance
+
+    @classmethod
+    def get_instance(cls) -> 'WatchedStore':
+        """获取单例实例"""
+        if cls._instance is None:
+            cls._instance = cls(cls._data_path or 'data')
+        return cls._instance
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """获取当前线程的连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _create_table(self):
+        conn = self._get_connection()
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS watched_videos (
+                    user_account TEXT NOT NULL,
+                    video_id TEXT NOT NULL,
+                    watched_time INTEGER NOT NULL,
+                    PRIMARY KEY (user_account, video_id)
+                ) WITHOUT ROWID
+            ''')
+
+    @staticmethod
+    def _account_key(user_account: Optional[str]) -> str:
+        # 未指定账号时记录到默认账号下
+        return user_account or ''
+
+    def mark_watched(self, user_account: Optional[str], video_id: str, watched_time: int = None) -> int:
+        """标记单个视频为已看，返回记录的观看时间（毫秒）"""
+        return self.mark_many_watched(user_account, [video_id], watched_time)
+
+    def mark_many_watched(self, user_account: Optional[str], video_ids: Iterable[str], watched_time: int = None) -> int:
+        """批量标记视频为已看，在一个事务中分块写入，返回记录的观看时间（毫秒）"""
+        watched_time = watched_time or int(time.time() * 1000)
+        account = self._account_key(user_account)
+        rows = [(account, str(video_id), watched_time) for video_id in video_ids]
+
+        conn = self._get_connection()
+        with conn:
+            for i in range(0, len(rows), CHUNK_SIZE):
+                conn.executemany(
+                    'INSERT OR REPLACE INTO watched_videos (user_account, video_id, watched_time) VALUES (?, ?, ?)',
+                    rows[i:i + CHUNK_SIZE]
+                )
+        logger.debug(f'账号 {account or "default"} 标记 {len(rows)} 个视频已看')
+        return watched_time
+
+    def get_watched_ids(self, user_account: Optional[str], video_ids: Iterable[str]) -> Set[str]:
+        """返回video_ids中已看过的视频id集合"""
+        account = self._account_key(user_account)
+        video_ids = list(dict.fromkeys(str(video_id) for video_id in video_ids if video_id))
+
+        watched = set()
+        conn = self._get_connection()
+        for i in range(0, len(video_ids), CHUNK_SIZE):
+            chunk = video_ids[i:i + CHUNK_SIZE]
+            placeholders = ','.join('?' * len(chunk))
+            cursor = conn.execute(
+                f'SELECT video_id FROM watched_videos WHERE user_account = ? AND video_id IN ({placeholders})',
+                [account, *chunk]
+            )
+            watched.update(row[0] for row in cursor)
+        return watched
+
+    def is_watched(self, user_account: Optional[str], video_id: str) -> bool:
+        """检查单个视频是否已看"""
+        return bool(self.get_watched_ids(user_account, [video_id]))
+
+    def filter_unwatched(self, user_account: Optional[str], aweme_list: List[dict], key: str = 'aweme_id') -> List[dict]:
+        """从接口返回的aweme_list中过滤出未看的视频，保持原有顺序"""
+        watched = self.get_watched_ids(user_account, (aweme.get(key) for aweme in aweme_list))
+        return [aweme for aweme in aweme_list if str(aweme.get(key)) not in watched]
+
+    def count(self, user_account: Optional[str] = None) -> int:
+        """已看记录数，不指定账号时统计全部"""
+        conn = self._get_connection()
+        if user_account is None:
+            return conn.execute('SELECT COUNT(*) FROM watched_videos').fetchone()[0]
+        return conn.execute(
+            'SELECT COUNT(*) FROM watched_videos WHERE user_account = ?', (user_account,)
+        ).fetchone()[0]
+
+    def close(self):
+        """关闭当前线程的连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,164 @@
+"""
+webid缓存
+webid需要从抖音首页源码中解析，按账号和UA缓存到 data/webid.json，重启后继续使用。
+请求时只读取缓存：没有缓存时先返回随机webid，由后台线程抓取首页得到真实webid，
+快过期时同样在后台刷新，请求的耗时不包含抓取首页
+"""
+
+import hashlib
+import os
+import queue
+import random
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+import ujson as json
+from loguru import logger
+
+# 超过有效期的这个比例后开始在后台刷新
+REFRESH_RATIO = 0.8
+
+
+class WebidCache:
+    """按 账号+UA 缓存webid"""
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, data_path: str = None, ttl: float = None, retry_interval: float = 60):
+        """
+        Args:
+            data_path: 数据目录，为None时只在内存中缓存
+            ttl: webid有效期（秒），默认读取环境变量 DOUYIN_WEBID_TTL，否则为1天
+            retry_interval: 抓取失败后再次尝试的间隔（秒）
+        """
+        if ttl is None:
+            ttl = float(os.environ.get('DOUYIN_WEBID_TTL', 86400))
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self.cache_file = os.path.join(data_path, 'webid.json') if data_path else None
+        # key -> {'webid': webid, 'time': 获取时间}，随机生成的webid获取时间为0
+        self._entries = {}
+        self._attempts = {}  # key -> 上次开始抓取的时间
+        self._pending = set()  # 正在抓取的key
+        self._entries_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+        self._load()
+
+    @classmethod
+    def initialize(cls, data_path: str = None, ttl: float = None):
+        """初始化单例实例"""
+        cls._instance = cls(data_path, ttl)
+        return cls._instance
+
+    @classmethod
+    def get_instance(cls) -> 'WebidCache':
+        """获取单例实例，未初始化时只在内存中缓存"""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @staticmethod
+    def make_key(account: str, user_agent: str) -> str:
+        """缓存键: 账号|UA的md5"""
+        return f"{account}|{hashlib.md5(user_agent.encode('utf-8')).hexdigest()}"
+
+    @staticmethod
+    def random_webid() -> str:
+        return str(random.randint(1000000000000000000, 9999999999999999999))
+
+    def _load(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+            logger.info(f"加载了 {len(self._entries)} 个webid缓存")
+        except Exception as e:
+            logger.error(f"加载webid缓存失败: {e}")
+            self._entries = {}
+
+    def _save(self):
+        """只保存真实的webid，先写临时文件再替换"""
+        if not self.cache_file or not os.path.isdir(os.path.dirname(self.cache_file) or '.'):
+            return
+        with self._entries_lock:
+            entries = {key: entry for key, entry in self._entries.items() if entry['time']}
+        tmp_file = f'{self.cache_file}.tmp'
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            logger.error(f"保存webid缓存失败: {e}")
+
+    def lookup(self, key: str) -> Tuple[str, bool]:
+        """读取webid，不会发起网络请求
+
+        Returns:
+            (webid, 是否需要刷新)，没有缓存时返回新生成的随机webid，之后的调用返回同一个值直到刷新成功
+        """
+        now = time.time()
+        with self._entries_lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {'webid': self.random_webid(), 'time': 0}
+            stale = now - entry['time'] >= self.ttl * REFRESH_RATIO
+            if stale:
+                # 正在抓取或者刚失败过的不重复刷新
+                stale = key not in self._pending and now - self._attempts.get(key, 0) >= self.retry_interval
+            return entry['webid'], stale
+
+    def claim(self, key: str) -> bool:
+        """标记key正在刷新，已经在刷新时返回False"""
+        with self._entries_lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+            self._attempts[key] = time.time()
+            return True
+
+    def finish(self, key: str, webid: Optional[str]):
+        """结束刷新，抓取到webid时写入缓存并保存"""
+        with self._entries_lock:
+            self._pending.discard(key)
+            if webid:
+                self._entries[key] = {'webid': webid, 'time': time.time()}
+        if webid:
+            self._save()
+
+    def refresh(self, key: str, fetcher: Callable[[], Optional[str]]):
+        """在后台线程中调用fetcher抓取webid"""
+        if not self.claim(key):
+            return
+        self._ensure_worker()
+        self._queue.put((key, fetcher))
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='webid-refresh', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            key, fetcher = self._queue.get()
+            webid = None
+            try:
+                webid = fetcher()
+            except Exception as e:
+                logger.error(f"后台获取webid失败: {e}")
+            finally:
+                self.finish(key, webid)
+
+    def get(self, key: str) -> Optional[str]:
+        """读取已缓存的webid，不生成随机值"""
+        with self._entries_lock:
+            entry = self._entries.get(key)
+            return entry['webid'] if entry else None